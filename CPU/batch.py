@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# batch.py
+# run many programs through RV32ISim on a process pool, one JSON line each
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from riv32 import ENGINES, DMEM_SIZE, load_program
+from mmio import Console
+
+PROGRAM_EXTS = (".hex", ".bin", ".elf", ".ckpt")
+
+def list_programs(target):
+    # a directory (every program file in it, sorted) or a manifest with one
+    # path per line, relative to the manifest; '#' starts a comment
+    if os.path.isdir(target):
+        names = sorted(n for n in os.listdir(target) if n.endswith(PROGRAM_EXTS))
+        return [os.path.join(target, n) for n in names]
+    base = os.path.dirname(os.path.abspath(target))
+    paths = []
+    with open(target) as f:
+        for line in f:
+            s = line.split("#", 1)[0].strip()
+            if s: paths.append(os.path.join(base, s))
+    return paths
+
+def run_program(path, opts):
+    t0 = time.perf_counter()
+    console = Console(capture=True)
+    rec = {"program": path}
+    try:
+        sim = load_program(path, console=console, **opts)
+        steps = sim.run()
+        rec.update(pc=sim.pc, regs=sim.reg[:], steps=steps,
+                   halt=sim.halt_reason or "max-steps", exit_code=sim.exit_code)
+    except Exception as e:
+        rec.update(pc=None, regs=None, steps=None, halt="error", error=f"{type(e).__name__}: {e}")
+    # one byte per char, so non-ASCII output survives the JSON round trip
+    rec["output"] = console.getvalue().decode("latin-1")
+    rec["wall"] = round(time.perf_counter() - t0, 6)
+    return rec
+
+def run_batch(paths, opts, jobs=None):
+    # results come back in input order whatever order the workers finish in
+    if jobs == 1:
+        for p in paths:
+            yield run_program(p, opts)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        yield from ex.map(run_program, paths, [opts] * len(paths), chunksize=8)
+
+def main():
+    ap = argparse.ArgumentParser(description="Run many RV32I programs, one JSON line per program")
+    ap.add_argument("target", help="directory of .hex/.bin/.elf programs or .ckpt checkpoints, or a manifest file")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--max-steps", type=int, default=1000)
+    ap.add_argument("--engine", choices=ENGINES, default="interp")
+    ap.add_argument("--dmem-size", type=lambda s: int(s, 0), default=DMEM_SIZE)
+    args = ap.parse_args()
+    opts = dict(max_steps=args.max_steps, engine=args.engine, dmem_size=args.dmem_size)
+    for rec in run_batch(list_programs(args.target), opts, args.jobs):
+        sys.stdout.write(json.dumps(rec) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# checkpoint.py
+# RV32ISim snapshots: architectural state, the (possibly self-modified)
+# code image and every byte of data memory, so a long run can be resumed
+# or forked from a warm point. Memory is cut into 4 KiB chunks; all-zero
+# chunks are not stored and identical chunks are stored once. Decode and
+# translation caches are not saved, they refill on first execution.
+#
+# layout (little-endian):
+#   "RVCK", u32 version, u32 meta length, meta JSON (padded to 4 bytes),
+#   u32 reg[32], u32 freg[32], u32 imem[n_imem], u32 chunk ids[n_ids],
+#   chunk data
+
+import sys
+import json
+import array
+from memory import PAGE_BITS, PAGE_SIZE
+
+MAGIC = b"RVCK"
+VERSION = 2
+NO_CHUNK = 0xFFFFFFFF  # an all-zero chunk
+
+def _words(data):
+    words = array.array("I")
+    words.frombytes(data)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words
+
+def _le(words):
+    words = array.array("I", words)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words.tobytes()
+
+def dumps(sim):
+    mem = sim.dmem
+    areas = [("flat", mem.base, mem.view)]
+    areas += [("region", start, view) for start, _, view in mem.regions]
+    areas += [("page", n << PAGE_BITS, memoryview(p)) for n, p in sorted(mem.pages.items())]
+    chunks = {}
+    ids = array.array("I")
+    layout = []
+    for kind, addr, view in areas:
+        area_ids = []
+        for off in range(0, len(view), PAGE_SIZE):
+            c = bytes(view[off:off + PAGE_SIZE])
+            if c.count(0) == len(c):
+                area_ids.append(NO_CHUNK)
+            else:
+                area_ids.append(chunks.setdefault(c.ljust(PAGE_SIZE, b"\0"), len(chunks)))
+        if kind == "page" and all(i == NO_CHUNK for i in area_ids):
+            continue
+        layout.append([kind, addr, len(view)])
+        ids.extend(area_ids)
+    meta = dict(pc=sim.pc, fcsr=sim.fcsr, steps=sim.steps, halted=sim.halted, halt_reason=sim.halt_reason,
+                exit_code=sim.exit_code, imem_base=sim.imem_base, n_imem=len(sim.imem),
+                areas=layout, n_ids=len(ids), n_chunks=len(chunks))
+    head = json.dumps(meta).encode()
+    head += b" " * (-len(head) % 4)
+    parts = [MAGIC, VERSION.to_bytes(4, "little"), len(head).to_bytes(4, "little"), head,
+             _le(sim.reg), _le(sim.freg), _le(sim.imem), _le(ids)]
+    parts.extend(chunks)  # insertion order == chunk id
+    return b"".join(parts)
+
+def save_checkpoint(sim, path):
+    with open(path, "wb") as f:
+        f.write(dumps(sim))
+
+class Snapshot:
+    __slots__ = ("meta", "reg", "freg", "imem", "ids", "chunks")
+
+    def __init__(self, meta, reg, freg, imem, ids, chunks):
+        self.meta = meta
+        self.reg = reg
+        self.freg = freg
+        self.imem = imem
+        self.ids = ids
+        self.chunks = chunks  # view of n_chunks * PAGE_SIZE bytes
+
+    def restore(self, sim):
+        # sim was built from self.imem with a flat region of the saved size
+        m = self.meta
+        sim.reg[:] = self.reg
+        sim.freg[:] = self.freg
+        sim.fcsr = m["fcsr"]
+        sim.pc = m["pc"]
+        sim.steps = m["steps"]
+        sim.halted = m["halted"]
+        sim.halt_reason = m["halt_reason"]
+        sim.exit_code = m["exit_code"]
+        k = 0
+        for kind, addr, length in m["areas"]:
+            if kind == "flat":
+                buf = sim.dmem.view
+            else:
+                buf = bytearray(length)
+            for off in range(0, length, PAGE_SIZE):
+                cid = self.ids[k]
+                k += 1
+                if cid != NO_CHUNK:
+                    n = min(PAGE_SIZE, length - off)
+                    buf[off:off + n] = self.chunks[cid * PAGE_SIZE:cid * PAGE_SIZE + n]
+            if kind == "region":
+                sim.dmem.map(addr, buf)
+            elif kind == "page":
+                sim.dmem.pages[addr >> PAGE_BITS] = buf
+
+def read_checkpoint(image):
+    # image: any buffer holding the whole file (e.g. riv32.map_image)
+    view = memoryview(image).cast("B")
+    if len(view) < 12 or bytes(view[:4]) != MAGIC:
+        raise ValueError("not an RV32ISim checkpoint")
+    version = int.from_bytes(view[4:8], "little")
+    if version != VERSION:
+        raise ValueError(f"unsupported checkpoint version {version}")
+    pos = 12 + int.from_bytes(view[8:12], "little")
+    meta = json.loads(bytes(view[12:pos]))
+    fields = []
+    for n in (32, 32, meta["n_imem"], meta["n_ids"]):
+        fields.append(_words(view[pos:pos + 4 * n]))
+        pos += 4 * n
+    chunks = view[pos:pos + meta["n_chunks"] * PAGE_SIZE]
+    if len(chunks) != meta["n_chunks"] * PAGE_SIZE:
+        raise ValueError("truncated checkpoint")
+    reg, freg, imem, ids = fields
+    return Snapshot(meta, list(reg), list(freg), imem, ids, chunks)
@@ -0,0 +1,43 @@
+# elfload.py
+# just enough ELF32 to run RISC-V toolchain output: the header, and the
+# PT_LOAD entries of the program header table
+
+import struct
+
+EM_RISCV = 243
+ET_EXEC  = 2
+PT_LOAD  = 1
+PF_X     = 1
+
+class Segment:
+    __slots__ = ("vaddr", "memsz", "flags", "data")
+
+    def __init__(self, vaddr, memsz, flags, data):
+        self.vaddr = vaddr
+        self.memsz = memsz
+        self.flags = flags
+        self.data = data  # file bytes (filesz); the rest up to memsz is .bss
+
+def read_elf32(image):
+    # image: any buffer holding the whole file; segment data are views into it
+    view = memoryview(image).cast("B")
+    if len(view) < 52 or bytes(view[:4]) != b"\x7fELF":
+        raise ValueError("not an ELF file")
+    if view[4] != 1 or view[5] != 1:
+        raise ValueError("need a 32-bit little-endian ELF")
+    (e_type, e_machine, _, e_entry, e_phoff, _, _, _,
+     e_phentsize, e_phnum) = struct.unpack_from("<HHIIIIIHHH", view, 16)
+    if e_machine != EM_RISCV:
+        raise ValueError(f"not a RISC-V ELF (e_machine={e_machine})")
+    if e_type != ET_EXEC:
+        raise ValueError(f"not an executable ELF (e_type={e_type})")
+    segments = []
+    for i in range(e_phnum):
+        (p_type, p_offset, p_vaddr, _, p_filesz, p_memsz,
+         p_flags, _) = struct.unpack_from("<IIIIIIII", view, e_phoff + i * e_phentsize)
+        if p_type != PT_LOAD or p_memsz == 0:
+            continue
+        if p_offset + p_filesz > len(view) or p_filesz > p_memsz:
+            raise ValueError(f"bad PT_LOAD segment at 0x{p_vaddr:08X}")
+        segments.append(Segment(p_vaddr, p_memsz, p_flags, view[p_offset:p_offset + p_filesz]))
+    return e_entry, segments
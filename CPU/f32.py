@@ -0,0 +1,199 @@
+# f32.py
+# float32 arithmetic on raw uint32 bit patterns for RV32ISim's F extension.
+# Same results and flags as the Midterm fpu.FPU (round-to-nearest-even,
+# canonical NaN out, invalid on any NaN in, underflow on tiny results),
+# computed on native ints instead of bit lists. Every op returns
+# (bits, fflags) with the fflags bits as in fcsr.
+
+NX = 0x01  # inexact
+UF = 0x02  # underflow
+OF = 0x04  # overflow
+DZ = 0x08  # divide by zero
+NV = 0x10  # invalid
+
+CANON_NAN = 0x7FC00000
+INF = 0x7F800000
+SIGN = 0x80000000
+
+def is_nan(x):
+    return (x & 0x7FFFFFFF) > INF
+
+def is_snan(x):
+    return is_nan(x) and not x & 0x00400000
+
+def _unpack(x):
+    # (unbiased exponent, 24-bit significand); subnormals use -126
+    e = (x >> 23) & 0xFF
+    f = x & 0x7FFFFF
+    if e == 0:
+        return -126, f
+    return e - 127, f | 0x800000
+
+def _rne(sig, n):
+    # drop the low n bits of sig, round to nearest even
+    kept = sig >> n
+    rest = sig & ((1 << n) - 1)
+    half = 1 << (n - 1)
+    if rest > half or (rest == half and kept & 1):
+        kept += 1
+    return kept, rest != 0
+
+def _pack(sign, e, sig, width):
+    # sig: width bits with the leading 1 at the top, worth 2**e
+    sign <<= 31
+    eb = e + 127
+    if eb <= 0:
+        # a carry into bit 23 lands in the exponent field as 1
+        kept, nx = _rne(sig, width - 24 + 1 - eb)
+        return sign | kept, UF | (NX if nx else 0)
+    kept, nx = _rne(sig, width - 24)
+    if kept >> 24:
+        kept >>= 1
+        eb += 1
+    if eb >= 255:
+        return sign | INF, OF | NX
+    return sign | (eb << 23) | (kept & 0x7FFFFF), NX if nx else 0
+
+def _shr_sticky(m, d):
+    if d >= m.bit_length():
+        return 1 if m else 0
+    return (m >> d) | (1 if m & ((1 << d) - 1) else 0)
+
+def add(a, b, sub=0):
+    sa = a >> 31
+    sb = (b >> 31) ^ sub
+    if is_nan(a) or is_nan(b):
+        return CANON_NAN, NV
+    ainf = (a & 0x7FFFFFFF) == INF
+    binf = (b & 0x7FFFFFFF) == INF
+    if ainf and binf and sa != sb:
+        return CANON_NAN, NV
+    if ainf: return (sa << 31) | INF, 0
+    if binf: return (sb << 31) | INF, 0
+    ea, ma = _unpack(a)
+    eb, mb = _unpack(b)
+    ma <<= 3
+    mb <<= 3
+    if ea > eb:
+        mb = _shr_sticky(mb, ea - eb)
+        e = ea
+    else:
+        ma = _shr_sticky(ma, eb - ea)
+        e = eb
+    if sa == sb:
+        m, sign = ma + mb, sa
+    elif ma >= mb:
+        m, sign = ma - mb, sa
+    else:
+        m, sign = mb - ma, sb
+    if m == 0:
+        return ((sa & sb) << 31), 0
+    k = 28 - m.bit_length()
+    return _pack(sign, e + 1 - k, m << k, 28)
+
+def sub(a, b):
+    return add(a, b, 1)
+
+def mul(a, b):
+    sign = (a ^ b) >> 31
+    if is_nan(a) or is_nan(b):
+        return CANON_NAN, NV
+    a &= 0x7FFFFFFF
+    b &= 0x7FFFFFFF
+    if (a == INF and b == 0) or (b == INF and a == 0):
+        return CANON_NAN, NV
+    if a == INF or b == INF:
+        return (sign << 31) | INF, 0
+    if a == 0 or b == 0:
+        return sign << 31, 0
+    ea, ma = _unpack(a)
+    eb, mb = _unpack(b)
+    p = ma * mb
+    k = 48 - p.bit_length()
+    return _pack(sign, ea + eb + 1 - k, p << k, 48)
+
+# conversions; rm is the RISC-V rounding-mode field (RNE/RTZ/RDN/RUP/RMM)
+
+def _round_int(neg, mag, n, rm):
+    # mag / 2**n rounded to an integer magnitude under rm
+    if n <= 0:
+        return mag << -n, False
+    q = mag >> n
+    rest = mag & ((1 << n) - 1)
+    if rest == 0:
+        return q, False
+    half = 1 << (n - 1)
+    if rm == 0b000: q += rest > half or (rest == half and q & 1)
+    elif rm == 0b010: q += neg
+    elif rm == 0b011: q += not neg
+    elif rm == 0b100: q += rest >= half
+    return q, True
+
+def to_int(x, signed, rm):
+    # FCVT.W.S / FCVT.WU.S: out-of-range and NaN saturate with NV
+    lo, hi = (-(1 << 31), (1 << 31) - 1) if signed else (0, 0xFFFFFFFF)
+    if is_nan(x):
+        return hi & 0xFFFFFFFF, NV
+    neg = x >> 31
+    if (x & 0x7FFFFFFF) == INF:
+        return (lo if neg else hi) & 0xFFFFFFFF, NV
+    e, m = _unpack(x)
+    q, nx = _round_int(neg, m, 23 - e, rm)
+    v = -q if neg else q
+    if v < lo or v > hi:
+        return (lo if neg else hi) & 0xFFFFFFFF, NV
+    return v & 0xFFFFFFFF, NX if nx else 0
+
+def from_int(v, signed):
+    # FCVT.S.W / FCVT.S.WU, rounded to nearest even
+    neg = 0
+    if signed and v & SIGN:
+        neg, v = 1, (-v) & 0xFFFFFFFF
+    if v == 0:
+        return 0, 0
+    w = v.bit_length()
+    return _pack(neg, w - 1, v << (32 - w), 32)
+
+# compares, min/max, sign injection, classify
+
+def _key(x):
+    # total order on non-NaN patterns with -0 == +0
+    return -(x & 0x7FFFFFFF) if x & SIGN else x
+
+def feq(a, b):
+    if is_nan(a) or is_nan(b):
+        return 0, NV if is_snan(a) or is_snan(b) else 0
+    return int(_key(a) == _key(b)), 0
+
+def flt(a, b):
+    if is_nan(a) or is_nan(b):
+        return 0, NV
+    return int(_key(a) < _key(b)), 0
+
+def fle(a, b):
+    if is_nan(a) or is_nan(b):
+        return 0, NV
+    return int(_key(a) <= _key(b)), 0
+
+def fmin(a, b, want_max=False):
+    flags = NV if is_snan(a) or is_snan(b) else 0
+    if is_nan(a) and is_nan(b): return CANON_NAN, flags
+    if is_nan(a): return b, flags
+    if is_nan(b): return a, flags
+    ka, kb = _key(a), _key(b)
+    if ka == kb:
+        # -0 is below +0
+        return ((a | b) if not want_max else (a & b)), flags
+    return (a if (ka < kb) != want_max else b), flags
+
+def fclass(x):
+    sign = x >> 31
+    e = (x >> 23) & 0xFF
+    f = x & 0x7FFFFF
+    if e == 0xFF:
+        if f == 0: return 1 << 0 if sign else 1 << 7
+        return 1 << 9 if f & 0x00400000 else 1 << 8
+    if e == 0:
+        if f == 0: return 1 << 3 if sign else 1 << 4
+        return 1 << 2 if sign else 1 << 5
+    return 1 << 1 if sign else 1 << 6
@@ -0,0 +1,124 @@
+# memory.py
+# byte-addressed little-endian memory for RV32ISim: one contiguous bytearray
+# region (the fast path) plus 4 KiB pages allocated on first write for
+# every other address. Unwritten bytes read as 0. map() can attach any
+# writable buffer (e.g. a copy-on-write mmap of an image file) in place of
+# or next to the flat region, and add_device() an mmio.Device.
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+class Memory:
+    def __init__(self, base, size):
+        self.base = base
+        self.size = size
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.pages = {}
+        self.regions = []  # (start, end, view) attached with map()
+        self.devices = []  # (start, end, device) attached with add_device()
+
+    def add_device(self, addr, size, dev):
+        end = addr + size
+        for start, stop, _ in self.devices:
+            if addr < stop and start < end:
+                raise ValueError(f"device at 0x{addr:08X} overlaps the device at 0x{start:08X}")
+        self.devices.append((addr, end, dev))
+        self._route()
+
+    def _route(self):
+        # devices are normally outside the flat region and only looked up on
+        # the slow path; if the region grows over one, check devices first
+        lo, hi = self.base, self.base + self.size
+        if any(start < hi and lo < end for start, end, _ in self.devices):
+            self.load = self._load_io_first
+            self.store = self._store_io_first
+        else:
+            self.__dict__.pop("load", None)
+            self.__dict__.pop("store", None)
+
+    def _load_io_first(self, addr, nbytes):
+        for start, end, dev in self.devices:
+            if start <= addr < end:
+                return dev.read(addr - start, nbytes)
+        return Memory.load(self, addr, nbytes)
+
+    def _store_io_first(self, addr, data, nbytes):
+        for start, end, dev in self.devices:
+            if start <= addr < end:
+                dev.write(addr - start, data, nbytes)
+                return
+        Memory.store(self, addr, data, nbytes)
+
+    def flush_devices(self):
+        for _, _, dev in self.devices:
+            dev.flush()
+
+    def map(self, addr, buf):
+        view = memoryview(buf).cast("B")
+        if addr == self.base:
+            # becomes the fast-path region; anything past it falls to pages
+            self.buf = buf
+            self.view = view
+            self.size = len(view)
+            self._route()
+        else:
+            self.regions.append((addr, addr + len(view), view))
+
+    def load(self, addr, nbytes):
+        off = addr - self.base
+        if 0 <= off <= self.size - nbytes:
+            return int.from_bytes(self.view[off:off + nbytes], "little")
+        for start, end, dev in self.devices:
+            if start <= addr < end:
+                return dev.read(addr - start, nbytes)
+        return int.from_bytes(self.read(addr, nbytes), "little")
+
+    def store(self, addr, data, nbytes):
+        off = addr - self.base
+        if 0 <= off <= self.size - nbytes:
+            self.view[off:off + nbytes] = (data & ((1 << (8 * nbytes)) - 1)).to_bytes(nbytes, "little")
+            return
+        for start, end, dev in self.devices:
+            if start <= addr < end:
+                dev.write(addr - start, data, nbytes)
+                return
+        self.write(addr, (data & ((1 << (8 * nbytes)) - 1)).to_bytes(nbytes, "little"))
+
+    # bulk access, split at region/page boundaries
+    def read(self, addr, n):
+        out = bytearray()
+        while n > 0:
+            view, off, chunk = self._span(addr, n, create=False)
+            out += view[off:off + chunk] if view is not None else bytes(chunk)
+            addr = (addr + chunk) & 0xFFFFFFFF
+            n -= chunk
+        return bytes(out)
+
+    def write(self, addr, data):
+        data = memoryview(data).cast("B")
+        pos = 0
+        while pos < len(data):
+            view, off, chunk = self._span(addr, len(data) - pos, create=True)
+            view[off:off + chunk] = data[pos:pos + chunk]
+            addr = (addr + chunk) & 0xFFFFFFFF
+            pos += chunk
+
+    def _span(self, addr, n, create):
+        # the largest run at addr (at most n bytes) that lives in one backing
+        # buffer: (view or None, offset in it, length)
+        off = addr - self.base
+        if 0 <= off < self.size:
+            return self.view, off, min(n, self.size - off)
+        for start, end, view in self.regions:
+            if start <= addr < end:
+                return view, addr - start, min(n, end - addr)
+        chunk = min(n, PAGE_SIZE - (addr & PAGE_MASK), 0x100000000 - addr)
+        for start in [self.base] + [r[0] for r in self.regions]:
+            if addr < start < addr + chunk:
+                chunk = start - addr
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is None and create:
+            page = self.pages[addr >> PAGE_BITS] = bytearray(PAGE_SIZE)
+        return page, addr & PAGE_MASK, chunk
@@ -0,0 +1,74 @@
+# mmio.py
+# memory-mapped devices for RV32ISim. A device claims an address range with
+# Memory.add_device(); loads and stores that miss the flat data region are
+# checked against those ranges before falling through to sparse pages, so
+# ordinary memory traffic never pays for them.
+
+import io
+import sys
+
+class Device:
+    # offsets are relative to the device's base address
+    def read(self, off, nbytes):
+        return 0
+
+    def write(self, off, data, nbytes):
+        pass
+
+    def flush(self):
+        pass
+
+class Console(Device):
+    # transmit register: the low byte of every store is one output byte.
+    # Bytes are buffered and written out on newline, when bufsize is
+    # reached, or on flush() (the simulator flushes when run() returns).
+    def __init__(self, out=None, bufsize=4096, capture=False):
+        self.out = io.BytesIO() if capture else out
+        self.bufsize = bufsize
+        self.buf = bytearray()
+
+    def write(self, off, data, nbytes):
+        b = data & 0xFF
+        self.buf.append(b)
+        if b == 0x0A or len(self.buf) >= self.bufsize:
+            self.flush()
+
+    def flush(self):
+        if not self.buf:
+            return
+        if self.out is not None:
+            self.out.write(self.buf)
+        else:
+            # keep ordering with anything already printed (e.g. --trace)
+            sys.stdout.flush()
+            raw = getattr(sys.stdout, "buffer", None)
+            if raw is not None:
+                raw.write(self.buf)
+                raw.flush()
+            else:
+                # text-only stdout (StringIO, notebooks): one char per byte
+                sys.stdout.write(self.buf.decode("latin-1"))
+        self.buf.clear()
+
+    def getvalue(self):
+        self.flush()
+        return self.out.getvalue()
+
+class CycleCounter(Device):
+    # read-only 64-bit count of retired instructions (lo word, then hi word)
+    def __init__(self, sim):
+        self.sim = sim
+
+    def read(self, off, nbytes):
+        count = self.sim.steps
+        return (count >> (8 * off)) & ((1 << (8 * nbytes)) - 1)
+
+class ExitCode(Device):
+    # a store halts the simulator with the stored value as its exit code
+    def __init__(self, sim):
+        self.sim = sim
+
+    def write(self, off, data, nbytes):
+        self.sim.exit_code = data & 0xFFFFFFFF
+        self.sim.halted = True
+        self.sim.halt_reason = "exit"
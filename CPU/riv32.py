@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 import sys
+import mmap
+import array
 import argparse
+import f32
+from memory import Memory
+from elfload import read_elf32, PF_X
+from mmio import Console, CycleCounter, ExitCode
+from checkpoint import read_checkpoint, save_checkpoint, MAGIC as CKPT_MAGIC
+from tracebuf import TraceBuffer, format_text, TR_RD, TR_LOAD, TR_STORE
 
 OPC_LOAD   = 0b0000011
 OPC_STORE  = 0b0100011
@@ -11,9 +19,20 @@ OPC_JAL    = 0b1101111
 OPC_JALR   = 0b1100111
 OPC_LUI    = 0b0110111
 OPC_AUIPC  = 0b0010111
+OPC_LOAD_FP  = 0b0000111
+OPC_STORE_FP = 0b0100111
+OPC_OP_FP  = 0b1010011
+OPC_SYSTEM = 0b1110011
+
+CSR_FFLAGS = 0x001
+CSR_FRM    = 0x002
+CSR_FCSR   = 0x003
 
 DMEM_BASE  = 0x00010000
 MMIO_TX    = 0x00020000
+MMIO_CYCLE = 0x00020008
+MMIO_EXIT  = 0x00020010
+DMEM_SIZE  = MMIO_TX - DMEM_BASE
 
 def sext(value, bits):
     sign = 1 << (bits - 1)
@@ -45,151 +64,919 @@ def J_imm(instr):
     imm = (imm20 << 20) | (imm19_12 << 12) | (imm11 << 11) | (imm10_1 << 1)
     return sext(imm, 21)
 
+ENGINES = ("interp", "table", "jit")
+MAX_BLOCK = 64
+
+def decode(instr):
+    # split a raw word into its fields once; the immediate is already
+    # resolved for the instruction's format
+    instr &= 0xFFFFFFFF
+    opcode = instr & 0x7F
+    rd = (instr >> 7) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    rs1 = (instr >> 15) & 0x1F
+    rs2 = (instr >> 20) & 0x1F
+    funct7 = (instr >> 25) & 0x7F
+    if opcode in (OPC_OPIMM, OPC_LOAD, OPC_JALR, OPC_LOAD_FP, OPC_SYSTEM): imm = I_imm(instr)
+    elif opcode in (OPC_STORE, OPC_STORE_FP): imm = S_imm(instr)
+    elif opcode == OPC_BRANCH: imm = B_imm(instr)
+    elif opcode == OPC_JAL: imm = J_imm(instr)
+    elif opcode in (OPC_LUI, OPC_AUIPC): imm = U_imm(instr)
+    else: imm = 0
+    return opcode, rd, funct3, rs1, rs2, funct7, imm
+
+OPCODE_CLASS = {
+    OPC_LOAD: "LOAD", OPC_STORE: "STORE", OPC_OPIMM: "OP-IMM", OPC_OP: "OP",
+    OPC_BRANCH: "BRANCH", OPC_JAL: "JAL", OPC_JALR: "JALR", OPC_LUI: "LUI", OPC_AUIPC: "AUIPC",
+    OPC_LOAD_FP: "LOAD-FP", OPC_STORE_FP: "STORE-FP", OPC_OP_FP: "OP-FP", OPC_SYSTEM: "SYSTEM",
+}
+
+# opcodes whose rd field names a destination register
+WRITES_RD = frozenset((OPC_LOAD, OPC_OPIMM, OPC_OP, OPC_JAL, OPC_JALR, OPC_LUI, OPC_AUIPC, OPC_SYSTEM))
+
+_OP_NAMES = {
+    (0b000, 0x00): "add", (0b000, 0x20): "sub", (0b001, 0x00): "sll", (0b010, 0x00): "slt",
+    (0b011, 0x00): "sltu", (0b100, 0x00): "xor", (0b101, 0x00): "srl", (0b101, 0x20): "sra",
+    (0b110, 0x00): "or", (0b111, 0x00): "and",
+    (0b000, 0x01): "mul", (0b001, 0x01): "mulh", (0b010, 0x01): "mulhsu", (0b011, 0x01): "mulhu",
+    (0b100, 0x01): "div", (0b101, 0x01): "divu", (0b110, 0x01): "rem", (0b111, 0x01): "remu",
+}
+_OPIMM_NAMES = ("addi", "slli", "slti", "sltiu", "xori", "srli", "ori", "andi")
+_LOAD_NAMES = ("lb", "lh", "lw", None, "lbu", "lhu", None, None)
+_STORE_NAMES = ("sb", "sh", "sw", None, None, None, None, None)
+_BRANCH_NAMES = ("beq", "bne", None, None, "blt", "bge", "bltu", "bgeu")
+_CSR_NAMES = (None, "csrrw", "csrrs", "csrrc", None, "csrrwi", "csrrsi", "csrrci")
+# OP-FP by funct7: (name per funct3 or rs2, operand registers)
+_OPFP_NAMES = {
+    0x00: (("fadd.s",), "fff"), 0x04: (("fsub.s",), "fff"), 0x08: (("fmul.s",), "fff"),
+    0x10: (("fsgnj.s", "fsgnjn.s", "fsgnjx.s"), "fff"), 0x14: (("fmin.s", "fmax.s"), "fff"),
+    0x50: (("fle.s", "flt.s", "feq.s"), "xff"), 0x60: (("fcvt.w.s", "fcvt.wu.s"), "xf"),
+    0x68: (("fcvt.s.w", "fcvt.s.wu"), "fx"), 0x70: (("fmv.x.w", "fclass.s"), "xf"),
+    0x78: (("fmv.w.x",), "fx"),
+}
+
+# RV32M on uint32 register values. Division truncates toward zero; x/0
+# gives all ones and x%0 gives x; -2**31 / -1 wraps to -2**31 with remainder 0.
+
+def _div(a, b):
+    if b == 0: return 0xFFFFFFFF
+    a = (a ^ 0x80000000) - 0x80000000
+    b = (b ^ 0x80000000) - 0x80000000
+    q = abs(a) // abs(b)
+    return (-q if (a < 0) != (b < 0) else q) & 0xFFFFFFFF
+
+def _rem(a, b):
+    if b == 0: return a
+    a = (a ^ 0x80000000) - 0x80000000
+    r = abs(a) % abs((b ^ 0x80000000) - 0x80000000)
+    return (-r if a < 0 else r) & 0xFFFFFFFF
+
+def mext(funct3, a, b):
+    if funct3 == 0b000: return (a * b) & 0xFFFFFFFF
+    if funct3 == 0b001: return (((a ^ 0x80000000) - 0x80000000) * ((b ^ 0x80000000) - 0x80000000) >> 32) & 0xFFFFFFFF
+    if funct3 == 0b010: return (((a ^ 0x80000000) - 0x80000000) * b >> 32) & 0xFFFFFFFF
+    if funct3 == 0b011: return (a * b) >> 32
+    if funct3 == 0b100: return _div(a, b)
+    if funct3 == 0b101: return a // b if b else 0xFFFFFFFF
+    if funct3 == 0b110: return _rem(a, b)
+    return a % b if b else a
+
+def disasm(instr):
+    opcode, rd, funct3, rs1, rs2, funct7, imm = decode(instr)
+    name = None
+    if opcode == OPC_OP:
+        name = _OP_NAMES.get((funct3, funct7))
+        if name: return f"{name} x{rd}, x{rs1}, x{rs2}"
+    elif opcode == OPC_OPIMM:
+        name = _OPIMM_NAMES[funct3]
+        if funct3 == 0b101 and funct7 == 0x20: name = "srai"
+        if funct3 in (0b001, 0b101): return f"{name} x{rd}, x{rs1}, {imm & 0x1F}"
+        return f"{name} x{rd}, x{rs1}, {imm}"
+    elif opcode == OPC_LOAD:
+        name = _LOAD_NAMES[funct3]
+        if name: return f"{name} x{rd}, {imm}(x{rs1})"
+    elif opcode == OPC_STORE:
+        name = _STORE_NAMES[funct3]
+        if name: return f"{name} x{rs2}, {imm}(x{rs1})"
+    elif opcode == OPC_BRANCH:
+        name = _BRANCH_NAMES[funct3]
+        if name: return f"{name} x{rs1}, x{rs2}, {imm:+d}"
+    elif opcode == OPC_JAL:
+        return f"jal x{rd}, {imm:+d}"
+    elif opcode == OPC_JALR:
+        return f"jalr x{rd}, {imm}(x{rs1})"
+    elif opcode == OPC_LUI:
+        return f"lui x{rd}, 0x{imm >> 12:X}"
+    elif opcode == OPC_AUIPC:
+        return f"auipc x{rd}, 0x{imm >> 12:X}"
+    elif opcode == OPC_LOAD_FP and funct3 == 0b010:
+        return f"flw f{rd}, {imm}(x{rs1})"
+    elif opcode == OPC_STORE_FP and funct3 == 0b010:
+        return f"fsw f{rs2}, {imm}(x{rs1})"
+    elif opcode == OPC_OP_FP and funct7 in _OPFP_NAMES:
+        names, regs = _OPFP_NAMES[funct7]
+        sel = rs2 if funct7 in (0x60, 0x68) else funct3
+        if sel < len(names):
+            ops = [f"{kind}{n}" for kind, n in zip(regs, (rd, rs1, rs2))]
+            return f"{names[sel]} " + ", ".join(ops)
+    elif opcode == OPC_SYSTEM:
+        if funct3 == 0: return "ebreak" if imm & 1 else "ecall"
+        name = _CSR_NAMES[funct3]
+        if name:
+            src = str(rs1) if funct3 & 0b100 else f"x{rs1}"
+            return f"{name} x{rd}, 0x{imm & 0xFFF:03X}, {src}"
+    return f".word 0x{instr & 0xFFFFFFFF:08X}"
+
 class RV32ISim:
-    def __init__(self, imem_words, max_steps=1000, trace=False):
+    def __init__(self, imem_words, max_steps=1000, trace=False, engine="interp", dmem_size=DMEM_SIZE,
+                 imem_base=0, console=None, profile=False, tracer=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Bad engine: {engine}")
         self.reg = [0] * 32
-        self.pc  = 0
+        self.freg = [0] * 32  # float32 bit patterns
+        self.fcsr = 0         # frm in bits 7:5, accrued fflags in 4:0
+        self.pc  = imem_base
         self.imem = imem_words[:]
-        self.dmem = {}
+        self.imem_base = imem_base
+        self.code_end = imem_base + len(self.imem) * 4
+        self.dmem = Memory(DMEM_BASE, dmem_size)
+        self.console = console if console is not None else Console()
+        self.dmem.add_device(MMIO_TX, 4, self.console)
+        self.dmem.add_device(MMIO_CYCLE, 8, CycleCounter(self))
+        self.dmem.add_device(MMIO_EXIT, 4, ExitCode(self))
         self.max_steps = max_steps
         self.trace = trace
         self.halted = False
+        self.halt_reason = None
+        self.exit_code = None
+        self.steps = 0
+        self.engine = engine
+        # decoded records, one slot per imem word, filled on first execution:
+        # (handler, rd, rs1, rs2, imm, funct3, funct7, instr)
+        self.icache = [None] * len(self.imem)
+        # jit engine: start pc -> (fn, ninstr), and imem index -> block starts
+        self.blocks = {}
+        self.block_owners = {}
+        self.code_gen = 0
+        self.profile = Profile(len(self.imem)) if profile else None
+        self.tracer = tracer  # a tracebuf.TraceBuffer, or None
+
+    def decode_at(self, index):
+        instr = self.imem[index] & 0xFFFFFFFF
+        opcode, rd, funct3, rs1, rs2, funct7, imm = decode(instr)
+        if opcode == OPC_JAL and rd == 0 and imm == 0:
+            handler = RV32ISim._x_halt
+        else:
+            handler = self.HANDLERS.get(opcode, RV32ISim._x_nop)
+            if self.engine == "table":
+                handler = _table_handler(opcode, funct3, funct7) or handler
+        d = (handler, rd, rs1, rs2, imm, funct3, funct7, instr)
+        self.icache[index] = d
+        return d
+
+    def write_code(self, addr, data, nbytes):
+        # keep imem coherent with stores that land in the code region
+        for i in range(nbytes):
+            index = (addr + i - self.imem_base) >> 2
+            if 0 <= index < len(self.imem):
+                shift = ((addr + i) & 3) * 8
+                byte = (data >> (8 * i)) & 0xFF
+                self.imem[index] = (self.imem[index] & ~(0xFF << shift) | (byte << shift)) & 0xFFFFFFFF
+                self.invalidate(index)
+
+    def invalidate(self, index):
+        self.icache[index] = None
+        self.code_gen += 1
+        for start in self.block_owners.pop(index, ()):
+            self.blocks.pop(start, None)
+
+    def run(self):
+        # runs up to max_steps more steps; self.steps keeps the running total
+        start = self.steps
+        limit = start + self.max_steps
+        try:
+            if self.tracer is not None:
+                self._run_traced(limit)
+            elif self.profile is not None:
+                self._run_profiled(limit)
+            elif self.engine == "jit" and not self.trace:
+                self._run_blocks(limit)
+            else:
+                while not self.halted and self.steps < limit:
+                    self.step()
+                    self.steps += 1
+        finally:
+            self.dmem.flush_devices()
+            if self.tracer is not None:
+                self.tracer.flush()
+        return self.steps - start
+
+    def _run_blocks(self, limit):
+        # a block only runs when it fits in the remaining budget, so the step
+        # count matches the interpreter exactly; the tail is single-stepped
+        blocks = self.blocks
+        reg = self.reg
+        while not self.halted and self.steps < limit:
+            b = blocks.get(self.pc)
+            if b is None:
+                b = translate_block(self, self.pc)
+            fn, n = b
+            if fn is None or n > limit - self.steps:
+                self.step()
+                self.steps += 1
+                continue
+            self.pc, n = fn(self, reg, self.dmem.load, self.store)
+            self.steps += n
+
+    def _run_profiled(self, limit):
+        # one step at a time under any engine, two counter bumps per step
+        counts = self.profile.counts
+        jumps = self.profile.jumps
+        base = self.imem_base
+        n = len(self.imem)
+        while not self.halted and self.steps < limit:
+            pc = self.pc
+            self.step()
+            self.steps += 1
+            index = (pc - base) >> 2
+            if 0 <= index < n:
+                counts[index] += 1
+                if self.pc != pc + 4:
+                    jumps[index] += 1
+
+    def _run_traced(self, limit):
+        # one step at a time under any engine; what the instruction wrote is
+        # read back from reg after it retires, addresses are computed before
+        record = self.tracer.record
+        reg = self.reg
+        base = self.imem_base
+        n = len(self.imem)
+        prof = self.profile
+        while not self.halted and self.steps < limit:
+            pc = self.pc
+            index = (pc - base) >> 2
+            if pc & 3 or not 0 <= index < n:
+                self.step()
+                self.steps += 1
+                continue
+            d = self.icache[index] or self.decode_at(index)
+            instr = d[7]
+            opcode = instr & 0x7F
+            info = value = addr = 0
+            if opcode == OPC_STORE:
+                addr = (reg[d[2]] + d[4]) & 0xFFFFFFFF
+                value = reg[d[3]] & ((1 << (8 << (d[5] & 3))) - 1)
+                info = TR_STORE
+            elif opcode == OPC_STORE_FP:
+                addr = (reg[d[2]] + d[4]) & 0xFFFFFFFF
+                value = self.freg[d[3]]
+                info = TR_STORE
+            elif opcode == OPC_LOAD or opcode == OPC_LOAD_FP:
+                addr = (reg[d[2]] + d[4]) & 0xFFFFFFFF
+                info = TR_LOAD
+            self.step()
+            self.steps += 1
+            if d[1] and opcode in WRITES_RD:
+                info |= TR_RD | d[1]
+                value = reg[d[1]]
+            record(pc, instr, info, value, addr)
+            if prof is not None:
+                prof.counts[index] += 1
+                if self.pc != pc + 4:
+                    prof.jumps[index] += 1
 
     def step(self):
         if self.pc % 4 != 0:
             raise RuntimeError(f"PC not aligned: 0x{self.pc:08X}")
-        index = self.pc // 4
+        index = (self.pc - self.imem_base) >> 2
         if index < 0 or index >= len(self.imem):
             self.halted = True
+            self.halt_reason = "pc-out-of-range"
             return
-        instr = self.imem[index] & 0xFFFFFFFF
-        opcode = instr & 0x7F
-        rd = (instr >> 7) & 0x1F
-        funct3 = (instr >> 12) & 0x7
-        rs1 = (instr >> 15) & 0x1F
-        rs2 = (instr >> 20) & 0x1F
-        funct7 = (instr >> 25) & 0x7F
-        funct7b5 = (instr >> 30) & 0x1
-        r = self.reg
-        pc_next = (self.pc + 4) & 0xFFFFFFFF
+        d = self.icache[index]
+        if d is None:
+            d = self.decode_at(index)
+        pc_next = d[0](self, d)
+        if pc_next is None:
+            return
+        self.pc = pc_next & 0xFFFFFFFF
+        self.reg[0] = 0
+        if self.trace:
+            print(f"[0x{self.pc:08X}] instr=0x{d[7]:08X}")
 
-        def wreg(dest, val):
-            if dest != 0:
-                self.reg[dest] = val & 0xFFFFFFFF
+    def _x_halt(self, d):
+        if self.trace:
+            print(f"[0x{self.pc:08X}] 0000006F (JAL x0, 0) → HALT LOOP detected, stopping.")
+        self.halted = True
+        self.halt_reason = "halt-loop"
+        return None
 
-        if opcode == OPC_JAL and rd == 0 and J_imm(instr) == 0:
-            if self.trace:
-                print(f"[0x{self.pc:08X}] 0000006F (JAL x0, 0) → HALT LOOP detected, stopping.")
-            self.halted = True
-            return
+    def _x_nop(self, d):
+        return self.pc + 4
+
+    def _x_op(self, d):
+        _, rd, rs1, rs2, _, funct3, funct7, _ = d
+        r = self.reg
+        a = r[rs1]; b = r[rs2]
+        funct7b5 = (funct7 >> 5) & 1
+        if funct7 == 0b0000001: y = mext(funct3, a, b)
+        elif funct3 == 0b000: y = ((a - b) if funct7b5 else (a + b)) & 0xFFFFFFFF
+        elif funct3 == 0b111: y = a & b if not funct7b5 else 0
+        elif funct3 == 0b110: y = a | b if not funct7b5 else 0
+        elif funct3 == 0b100: y = a ^ b if not funct7b5 else 0
+        elif funct3 == 0b001: y = (a << (b & 0x1F)) & 0xFFFFFFFF if not funct7b5 else 0
+        elif funct3 == 0b101:
+            sh = (b & 0x1F)
+            if funct7b5 == 0: y = (a >> sh)
+            else: y = ((a & 0xFFFFFFFF) >> sh) if (a & 0x80000000) == 0 else ((0xFFFFFFFF << (32 - sh)) | ((a & 0xFFFFFFFF) >> sh))
+        elif funct3 == 0b010:
+            y = 1 if ((a ^ 0x80000000) < (b ^ 0x80000000)) else 0
+        else:
+            y = 1 if (a & 0xFFFFFFFF) < (b & 0xFFFFFFFF) else 0
+        if rd: r[rd] = y & 0xFFFFFFFF
+        return self.pc + 4
 
-        if opcode == OPC_OP:
-            a = r[rs1]; b = r[rs2]
-            if (funct3, funct7b5) == (0b000, 0): y = (a + b) & 0xFFFFFFFF
-            elif (funct3, funct7b5) == (0b000, 1): y = (a - b) & 0xFFFFFFFF
-            elif (funct3, funct7b5) == (0b111, 0): y = a & b
-            elif (funct3, funct7b5) == (0b110, 0): y = a | b
-            elif (funct3, funct7b5) == (0b100, 0): y = a ^ b
-            elif (funct3, funct7b5) == (0b001, 0): y = (a << (b & 0x1F)) & 0xFFFFFFFF
-            elif (funct3, funct7b5) == (0b101, 0): y = (a >> (b & 0x1F))
-            elif (funct3, funct7b5) == (0b101, 1):
-                sh = (b & 0x1F)
-                y = ((a & 0xFFFFFFFF) >> sh) if (a & 0x80000000) == 0 else ((0xFFFFFFFF << (32 - sh)) | ((a & 0xFFFFFFFF) >> sh))
-            elif funct3 == 0b010:
-                y = 1 if ((a ^ 0x80000000) < (b ^ 0x80000000)) else 0
-            elif funct3 == 0b011:
-                y = 1 if (a & 0xFFFFFFFF) < (b & 0xFFFFFFFF) else 0
-            else: y = 0
-            wreg(rd, y)
-
-        elif opcode == OPC_OPIMM:
-            a = r[rs1]; imm = I_imm(instr)
-            if funct3 == 0b000: y = (a + imm) & 0xFFFFFFFF
-            elif funct3 == 0b111: y = a & imm
-            elif funct3 == 0b110: y = a | imm
-            elif funct3 == 0b100: y = a ^ imm
-            elif funct3 == 0b001: y = (a << (imm & 0x1F)) & 0xFFFFFFFF
-            elif funct3 == 0b101:
-                shamt = imm & 0x1F
-                if funct7b5 == 0: y = (a & 0xFFFFFFFF) >> shamt
-                else:
-                    if a & 0x80000000: y = ((a & 0xFFFFFFFF) >> shamt) | (0xFFFFFFFF << (32 - shamt))
-                    else: y = (a & 0xFFFFFFFF) >> shamt
-            elif funct3 == 0b010:
-                y = 1 if ((a ^ 0x80000000) < (imm ^ 0x80000000)) else 0
-            elif funct3 == 0b011:
-                y = 1 if (a & 0xFFFFFFFF) < (imm & 0xFFFFFFFF) else 0
-            else: y = 0
-            wreg(rd, y)
-
-        elif opcode == OPC_LOAD:
-            imm = I_imm(instr)
-            addr = (r[rs1] + imm) & 0xFFFFFFFF
-            if funct3 == 0b000:
-                val = self.dmem.get(addr, 0) & 0xFF
-                if val & 0x80: val |= 0xFFFFFF00
-            elif funct3 == 0b001:
-                val = ((self.dmem.get(addr, 0) & 0xFF) | ((self.dmem.get(addr + 1, 0) & 0xFF) << 8))
-                if val & 0x8000: val |= 0xFFFF0000
-            elif funct3 == 0b010:
-                val = ((self.dmem.get(addr, 0) & 0xFF) | ((self.dmem.get(addr + 1, 0) & 0xFF) << 8) | ((self.dmem.get(addr + 2, 0) & 0xFF) << 16) | ((self.dmem.get(addr + 3, 0) & 0xFF) << 24))
-            elif funct3 == 0b100:
-                val = self.dmem.get(addr, 0) & 0xFF
-            elif funct3 == 0b101:
-                val = ((self.dmem.get(addr, 0) & 0xFF) | ((self.dmem.get(addr + 1, 0) & 0xFF) << 8))
+    def _x_opimm(self, d):
+        _, rd, rs1, _, imm, funct3, funct7, _ = d
+        r = self.reg
+        a = r[rs1]
+        if funct3 == 0b000: y = (a + imm) & 0xFFFFFFFF
+        elif funct3 == 0b111: y = a & imm
+        elif funct3 == 0b110: y = a | imm
+        elif funct3 == 0b100: y = a ^ imm
+        elif funct3 == 0b001: y = (a << (imm & 0x1F)) & 0xFFFFFFFF
+        elif funct3 == 0b101:
+            shamt = imm & 0x1F
+            if (funct7 >> 5) & 1 == 0: y = (a & 0xFFFFFFFF) >> shamt
             else:
-                val = 0
-            wreg(rd, val)
-
-        elif opcode == OPC_STORE:
-            imm = S_imm(instr)
-            addr = (r[rs1] + imm) & 0xFFFFFFFF
-            data = r[rs2]
-            if addr == MMIO_TX:
-                sys.stdout.write(chr(data & 0xFF))
-                sys.stdout.flush()
-            elif funct3 == 0b000:
-                self.dmem[addr] = data & 0xFF
-            elif funct3 == 0b001:
-                self.dmem[addr] = data & 0xFF
-                self.dmem[addr + 1] = (data >> 8) & 0xFF
-            elif funct3 == 0b010:
-                self.dmem[addr] = data & 0xFF
-                self.dmem[addr + 1] = (data >> 8) & 0xFF
-                self.dmem[addr + 2] = (data >> 16) & 0xFF
-                self.dmem[addr + 3] = (data >> 24) & 0xFF
-
-        elif opcode == OPC_BRANCH:
-            offset = B_imm(instr)
-            take = False
-            if funct3 == 0b000: take = (r[rs1] == r[rs2])
-            elif funct3 == 0b001: take = (r[rs1] != r[rs2])
-            if take: pc_next = (self.pc + offset) & 0xFFFFFFFF
-
-        elif opcode == OPC_JAL:
-            offset = J_imm(instr)
-            wreg(rd, self.pc + 4)
-            pc_next = (self.pc + offset) & 0xFFFFFFFF
-
-        elif opcode == OPC_JALR:
-            imm = I_imm(instr)
-            t = (r[rs1] + imm) & 0xFFFFFFFF
-            wreg(rd, self.pc + 4)
-            pc_next = t & ~1
-
-        elif opcode == OPC_LUI:
-            imm = U_imm(instr)
-            wreg(rd, imm)
-
-        elif opcode == OPC_AUIPC:
-            imm = U_imm(instr)
-            val = (self.pc + imm) & 0xFFFFFFFF
-            wreg(rd, val)
+                if a & 0x80000000: y = ((a & 0xFFFFFFFF) >> shamt) | (0xFFFFFFFF << (32 - shamt))
+                else: y = (a & 0xFFFFFFFF) >> shamt
+        elif funct3 == 0b010:
+            y = 1 if ((a ^ 0x80000000) < ((imm & 0xFFFFFFFF) ^ 0x80000000)) else 0
+        else:
+            y = 1 if (a & 0xFFFFFFFF) < (imm & 0xFFFFFFFF) else 0
+        if rd: r[rd] = y & 0xFFFFFFFF
+        return self.pc + 4
 
-        self.pc = pc_next & 0xFFFFFFFF
-        self.reg[0] = 0
-        if self.trace:
-            print(f"[0x{self.pc:08X}] instr=0x{instr:08X}")
+    def _x_load(self, d):
+        _, rd, rs1, _, imm, funct3, _, _ = d
+        addr = (self.reg[rs1] + imm) & 0xFFFFFFFF
+        mem = self.dmem
+        if funct3 == 0b000:
+            val = mem.load(addr, 1)
+            if val & 0x80: val |= 0xFFFFFF00
+        elif funct3 == 0b001:
+            val = mem.load(addr, 2)
+            if val & 0x8000: val |= 0xFFFF0000
+        elif funct3 == 0b010:
+            val = mem.load(addr, 4)
+        elif funct3 == 0b100:
+            val = mem.load(addr, 1)
+        elif funct3 == 0b101:
+            val = mem.load(addr, 2)
+        else:
+            val = 0
+        if rd: self.reg[rd] = val & 0xFFFFFFFF
+        return self.pc + 4
+
+    def _x_store(self, d):
+        _, _, rs1, rs2, imm, funct3, _, _ = d
+        if funct3 <= 0b010:
+            self.store((self.reg[rs1] + imm) & 0xFFFFFFFF, self.reg[rs2], 1 << funct3)
+        return self.pc + 4
+
+    def load(self, addr, nbytes):
+        return self.dmem.load(addr, nbytes)
+
+    def store(self, addr, data, nbytes):
+        self.dmem.store(addr, data, nbytes)
+        if addr < self.code_end and addr + nbytes > self.imem_base:
+            self.write_code(addr, data, nbytes)
+
+    def _x_branch(self, d):
+        _, _, rs1, rs2, imm, funct3, _, _ = d
+        r = self.reg
+        take = False
+        if funct3 == 0b000: take = (r[rs1] == r[rs2])
+        elif funct3 == 0b001: take = (r[rs1] != r[rs2])
+        elif funct3 == 0b100: take = (r[rs1] ^ 0x80000000) < (r[rs2] ^ 0x80000000)
+        elif funct3 == 0b101: take = (r[rs1] ^ 0x80000000) >= (r[rs2] ^ 0x80000000)
+        elif funct3 == 0b110: take = r[rs1] < r[rs2]
+        elif funct3 == 0b111: take = r[rs1] >= r[rs2]
+        if take: return (self.pc + imm) & 0xFFFFFFFF
+        return self.pc + 4
+
+    def _x_jal(self, d):
+        rd = d[1]
+        if rd: self.reg[rd] = (self.pc + 4) & 0xFFFFFFFF
+        return (self.pc + d[4]) & 0xFFFFFFFF
+
+    def _x_jalr(self, d):
+        _, rd, rs1, _, imm, _, _, _ = d
+        t = (self.reg[rs1] + imm) & 0xFFFFFFFF
+        if rd: self.reg[rd] = (self.pc + 4) & 0xFFFFFFFF
+        return t & ~1
+
+    def _x_lui(self, d):
+        if d[1]: self.reg[d[1]] = d[4]
+        return self.pc + 4
+
+    def _x_auipc(self, d):
+        if d[1]: self.reg[d[1]] = (self.pc + d[4]) & 0xFFFFFFFF
+        return self.pc + 4
+
+    # F extension: f32 kernels on raw bit patterns; every op only rounds to
+    # nearest even, except FCVT.W[U].S which honours its rm field
+    def _x_flw(self, d):
+        _, rd, rs1, _, imm, funct3, _, _ = d
+        if funct3 == 0b010:
+            self.freg[rd] = self.dmem.load((self.reg[rs1] + imm) & 0xFFFFFFFF, 4)
+        return self.pc + 4
+
+    def _x_fsw(self, d):
+        _, _, rs1, rs2, imm, funct3, _, _ = d
+        if funct3 == 0b010:
+            self.store((self.reg[rs1] + imm) & 0xFFFFFFFF, self.freg[rs2], 4)
+        return self.pc + 4
+
+    def _x_opfp(self, d):
+        _, rd, rs1, rs2, _, funct3, funct7, _ = d
+        fr = self.freg
+        a = fr[rs1]; b = fr[rs2]
+        y = x = None  # result for f[rd] / x[rd]
+        flags = 0
+        if funct7 == 0x00: y, flags = f32.add(a, b)
+        elif funct7 == 0x04: y, flags = f32.sub(a, b)
+        elif funct7 == 0x08: y, flags = f32.mul(a, b)
+        elif funct7 == 0x10:
+            if funct3 == 0b000: y = (a & 0x7FFFFFFF) | (b & 0x80000000)
+            elif funct3 == 0b001: y = (a & 0x7FFFFFFF) | (~b & 0x80000000)
+            elif funct3 == 0b010: y = a ^ (b & 0x80000000)
+        elif funct7 == 0x14 and funct3 <= 0b001: y, flags = f32.fmin(a, b, funct3 == 0b001)
+        elif funct7 == 0x50:
+            if funct3 == 0b010: x, flags = f32.feq(a, b)
+            elif funct3 == 0b001: x, flags = f32.flt(a, b)
+            elif funct3 == 0b000: x, flags = f32.fle(a, b)
+        elif funct7 == 0x60 and rs2 <= 1:
+            rm = (self.fcsr >> 5) & 7 if funct3 == 0b111 else funct3
+            x, flags = f32.to_int(a, rs2 == 0, rm)
+        elif funct7 == 0x68 and rs2 <= 1: y, flags = f32.from_int(self.reg[rs1], rs2 == 0)
+        elif funct7 == 0x70:
+            if funct3 == 0b000: x = a
+            elif funct3 == 0b001: x = f32.fclass(a)
+        elif funct7 == 0x78 and funct3 == 0b000: y = self.reg[rs1]
+        if y is not None: fr[rd] = y
+        if x is not None and rd: self.reg[rd] = x
+        self.fcsr |= flags
+        return self.pc + 4
+
+    def _x_system(self, d):
+        # CSR access to fflags/frm/fcsr; ECALL/EBREAK and other CSRs are no-ops
+        _, rd, rs1, _, imm, funct3, _, _ = d
+        csr = imm & 0xFFF
+        if funct3 & 0b011 == 0 or csr not in (CSR_FFLAGS, CSR_FRM, CSR_FCSR):
+            return self.pc + 4
+        fcsr = self.fcsr
+        old = fcsr & 0x1F if csr == CSR_FFLAGS else (fcsr >> 5) & 7 if csr == CSR_FRM else fcsr
+        src = rs1 if funct3 & 0b100 else self.reg[rs1]
+        op = funct3 & 0b011
+        new = src if op == 0b01 else old | src if op == 0b10 else old & ~src
+        if csr == CSR_FFLAGS: self.fcsr = (fcsr & ~0x1F) | (new & 0x1F)
+        elif csr == CSR_FRM: self.fcsr = (fcsr & 0x1F) | ((new & 7) << 5)
+        else: self.fcsr = new & 0xFF
+        if rd: self.reg[rd] = old
+        return self.pc + 4
+
+    HANDLERS = {
+        OPC_OP: _x_op, OPC_OPIMM: _x_opimm, OPC_LOAD: _x_load, OPC_STORE: _x_store,
+        OPC_BRANCH: _x_branch, OPC_JAL: _x_jal, OPC_JALR: _x_jalr,
+        OPC_LUI: _x_lui, OPC_AUIPC: _x_auipc,
+        OPC_LOAD_FP: _x_flw, OPC_STORE_FP: _x_fsw, OPC_OP_FP: _x_opfp, OPC_SYSTEM: _x_system,
+    }
+
+# table engine: one handler per (opcode, funct3, funct7) key, resolved once
+# in decode_at; None is a wildcard for fields that belong to the immediate.
+# Encodings without an entry fall back to the interp handler for the opcode.
+
+def _t_add(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] + r[d[3]]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_sub(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] - r[d[3]]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_sll(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] << (r[d[3]] & 0x1F)) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_slt(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = 1 if (r[d[2]] ^ 0x80000000) < (r[d[3]] ^ 0x80000000) else 0
+    return sim.pc + 4
+
+def _t_sltu(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = 1 if r[d[2]] < r[d[3]] else 0
+    return sim.pc + 4
+
+def _t_xor(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] ^ r[d[3]]
+    return sim.pc + 4
+
+def _t_srl(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] >> (r[d[3]] & 0x1F)
+    return sim.pc + 4
+
+def _t_sra(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (sext(r[d[2]], 32) >> (r[d[3]] & 0x1F)) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_or(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] | r[d[3]]
+    return sim.pc + 4
+
+def _t_and(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] & r[d[3]]
+    return sim.pc + 4
+
+def _t_mul(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] * r[d[3]]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_mulh(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (sext(r[d[2]], 32) * sext(r[d[3]], 32) >> 32) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_mulhsu(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (sext(r[d[2]], 32) * r[d[3]] >> 32) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_mulhu(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] * r[d[3]]) >> 32
+    return sim.pc + 4
+
+def _t_div(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = _div(r[d[2]], r[d[3]])
+    return sim.pc + 4
+
+def _t_divu(sim, d):
+    r = sim.reg
+    b = r[d[3]]
+    if d[1]: r[d[1]] = r[d[2]] // b if b else 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_rem(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = _rem(r[d[2]], r[d[3]])
+    return sim.pc + 4
+
+def _t_remu(sim, d):
+    r = sim.reg
+    b = r[d[3]]
+    if d[1]: r[d[1]] = r[d[2]] % b if b else r[d[2]]
+    return sim.pc + 4
+
+def _t_addi(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_slti(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = 1 if (r[d[2]] ^ 0x80000000) < ((d[4] & 0xFFFFFFFF) ^ 0x80000000) else 0
+    return sim.pc + 4
+
+def _t_sltiu(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = 1 if r[d[2]] < (d[4] & 0xFFFFFFFF) else 0
+    return sim.pc + 4
+
+def _t_xori(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] ^ d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_ori(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] | d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_andi(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] & d[4] & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_slli(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (r[d[2]] << (d[4] & 0x1F)) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_srli(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = r[d[2]] >> (d[4] & 0x1F)
+    return sim.pc + 4
+
+def _t_srai(sim, d):
+    r = sim.reg
+    if d[1]: r[d[1]] = (sext(r[d[2]], 32) >> (d[4] & 0x1F)) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_lb(sim, d):
+    val = sim.dmem.load((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, 1)
+    if d[1]: sim.reg[d[1]] = (val ^ 0x80) - 0x80 & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_lbu(sim, d):
+    val = sim.dmem.load((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, 1)
+    if d[1]: sim.reg[d[1]] = val
+    return sim.pc + 4
+
+def _t_lh(sim, d):
+    val = sim.dmem.load((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, 2)
+    if d[1]: sim.reg[d[1]] = (val ^ 0x8000) - 0x8000 & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_lhu(sim, d):
+    val = sim.dmem.load((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, 2)
+    if d[1]: sim.reg[d[1]] = val
+    return sim.pc + 4
+
+def _t_lw(sim, d):
+    val = sim.dmem.load((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, 4)
+    if d[1]: sim.reg[d[1]] = val
+    return sim.pc + 4
+
+def _t_sb(sim, d):
+    sim.store((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, sim.reg[d[3]], 1)
+    return sim.pc + 4
+
+def _t_sh(sim, d):
+    sim.store((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, sim.reg[d[3]], 2)
+    return sim.pc + 4
+
+def _t_sw(sim, d):
+    sim.store((sim.reg[d[2]] + d[4]) & 0xFFFFFFFF, sim.reg[d[3]], 4)
+    return sim.pc + 4
+
+def _t_beq(sim, d):
+    r = sim.reg
+    if r[d[2]] == r[d[3]]: return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_bne(sim, d):
+    r = sim.reg
+    if r[d[2]] != r[d[3]]: return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_blt(sim, d):
+    r = sim.reg
+    if (r[d[2]] ^ 0x80000000) < (r[d[3]] ^ 0x80000000): return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_bge(sim, d):
+    r = sim.reg
+    if (r[d[2]] ^ 0x80000000) >= (r[d[3]] ^ 0x80000000): return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_bltu(sim, d):
+    r = sim.reg
+    if r[d[2]] < r[d[3]]: return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+def _t_bgeu(sim, d):
+    r = sim.reg
+    if r[d[2]] >= r[d[3]]: return (sim.pc + d[4]) & 0xFFFFFFFF
+    return sim.pc + 4
+
+DISPATCH = {
+    (OPC_OP, 0b000, 0x00): _t_add,   (OPC_OP, 0b000, 0x20): _t_sub,
+    (OPC_OP, 0b001, 0x00): _t_sll,   (OPC_OP, 0b010, 0x00): _t_slt,
+    (OPC_OP, 0b011, 0x00): _t_sltu,  (OPC_OP, 0b100, 0x00): _t_xor,
+    (OPC_OP, 0b101, 0x00): _t_srl,   (OPC_OP, 0b101, 0x20): _t_sra,
+    (OPC_OP, 0b110, 0x00): _t_or,    (OPC_OP, 0b111, 0x00): _t_and,
+    (OPC_OP, 0b000, 0x01): _t_mul,   (OPC_OP, 0b001, 0x01): _t_mulh,
+    (OPC_OP, 0b010, 0x01): _t_mulhsu, (OPC_OP, 0b011, 0x01): _t_mulhu,
+    (OPC_OP, 0b100, 0x01): _t_div,   (OPC_OP, 0b101, 0x01): _t_divu,
+    (OPC_OP, 0b110, 0x01): _t_rem,   (OPC_OP, 0b111, 0x01): _t_remu,
+    (OPC_OPIMM, 0b000, None): _t_addi,  (OPC_OPIMM, 0b010, None): _t_slti,
+    (OPC_OPIMM, 0b011, None): _t_sltiu, (OPC_OPIMM, 0b100, None): _t_xori,
+    (OPC_OPIMM, 0b110, None): _t_ori,   (OPC_OPIMM, 0b111, None): _t_andi,
+    (OPC_OPIMM, 0b001, 0x00): _t_slli,
+    (OPC_OPIMM, 0b101, 0x00): _t_srli,  (OPC_OPIMM, 0b101, 0x20): _t_srai,
+    (OPC_LOAD, 0b000, None): _t_lb,     (OPC_LOAD, 0b100, None): _t_lbu,
+    (OPC_LOAD, 0b001, None): _t_lh,     (OPC_LOAD, 0b101, None): _t_lhu,
+    (OPC_LOAD, 0b010, None): _t_lw,
+    (OPC_STORE, 0b000, None): _t_sb,    (OPC_STORE, 0b001, None): _t_sh,
+    (OPC_STORE, 0b010, None): _t_sw,
+    (OPC_BRANCH, 0b000, None): _t_beq,  (OPC_BRANCH, 0b001, None): _t_bne,
+    (OPC_BRANCH, 0b100, None): _t_blt,  (OPC_BRANCH, 0b101, None): _t_bge,
+    (OPC_BRANCH, 0b110, None): _t_bltu, (OPC_BRANCH, 0b111, None): _t_bgeu,
+    (OPC_JAL, None, None): RV32ISim._x_jal,
+    (OPC_JALR, 0b000, None): RV32ISim._x_jalr,
+    (OPC_LUI, None, None): RV32ISim._x_lui,
+    (OPC_AUIPC, None, None): RV32ISim._x_auipc,
+}
+
+# jit engine: straight-line runs of table-engine instructions are turned into
+# one generated Python function per basic block, with registers held in
+# locals. A block ends at a BRANCH/JAL/JALR, before the halt loop, or before
+# anything without a DISPATCH entry (those are single-stepped).
+
+_BIN_OPS = {
+    _t_add: "({a} + {b}) & 0xFFFFFFFF",
+    _t_sub: "({a} - {b}) & 0xFFFFFFFF",
+    _t_sll: "({a} << ({b} & 0x1F)) & 0xFFFFFFFF",
+    _t_slt: "1 if ({a} ^ 0x80000000) < ({b} ^ 0x80000000) else 0",
+    _t_sltu: "1 if {a} < {b} else 0",
+    _t_xor: "{a} ^ {b}",
+    _t_srl: "{a} >> ({b} & 0x1F)",
+    _t_sra: "((({a} ^ 0x80000000) - 0x80000000) >> ({b} & 0x1F)) & 0xFFFFFFFF",
+    _t_or: "{a} | {b}",
+    _t_and: "{a} & {b}",
+    _t_mul: "({a} * {b}) & 0xFFFFFFFF",
+    _t_mulh: "((({a} ^ 0x80000000) - 0x80000000) * (({b} ^ 0x80000000) - 0x80000000) >> 32) & 0xFFFFFFFF",
+    _t_mulhsu: "((({a} ^ 0x80000000) - 0x80000000) * {b} >> 32) & 0xFFFFFFFF",
+    _t_mulhu: "({a} * {b}) >> 32",
+    _t_div: "_div({a}, {b})",
+    _t_divu: "({a} // {b} if {b} else 0xFFFFFFFF)",
+    _t_rem: "_rem({a}, {b})",
+    _t_remu: "({a} % {b} if {b} else {a})",
+}
+
+_IMM_OPS = {
+    _t_addi: lambda imm: "({a} + %d) & 0xFFFFFFFF" % imm,
+    _t_slti: lambda imm: "1 if ({a} ^ 0x80000000) < %d else 0" % ((imm & 0xFFFFFFFF) ^ 0x80000000),
+    _t_sltiu: lambda imm: "1 if {a} < %d else 0" % (imm & 0xFFFFFFFF),
+    _t_xori: lambda imm: "{a} ^ %d" % (imm & 0xFFFFFFFF),
+    _t_ori: lambda imm: "{a} | %d" % (imm & 0xFFFFFFFF),
+    _t_andi: lambda imm: "{a} & %d" % (imm & 0xFFFFFFFF),
+    _t_slli: lambda imm: "({a} << %d) & 0xFFFFFFFF" % (imm & 0x1F),
+    _t_srli: lambda imm: "{a} >> %d" % (imm & 0x1F),
+    _t_srai: lambda imm: "((({a} ^ 0x80000000) - 0x80000000) >> %d) & 0xFFFFFFFF" % (imm & 0x1F),
+}
+
+# handler -> (bytes, sign bit or 0)
+_LOADS = {_t_lb: (1, 0x80), _t_lh: (2, 0x8000), _t_lw: (4, 0), _t_lbu: (1, 0), _t_lhu: (2, 0)}
+_STORES = {_t_sb: 1, _t_sh: 2, _t_sw: 4}
+_BRANCHES = {
+    _t_beq: "{a} == {b}",
+    _t_bne: "{a} != {b}",
+    _t_blt: "({a} ^ 0x80000000) < ({b} ^ 0x80000000)",
+    _t_bge: "({a} ^ 0x80000000) >= ({b} ^ 0x80000000)",
+    _t_bltu: "{a} < {b}",
+    _t_bgeu: "{a} >= {b}",
+}
+
+def _table_handler(opcode, funct3, funct7):
+    return (DISPATCH.get((opcode, funct3, funct7))
+            or DISPATCH.get((opcode, funct3, None))
+            or DISPATCH.get((opcode, None, None)))
+
+_NO_BLOCK = (None, 0)
+
+def translate_block(sim, pc):
+    start = index = (pc - sim.imem_base) >> 2
+    if pc % 4 != 0 or index < 0 or index >= len(sim.imem):
+        return _NO_BLOCK
+    body = []
+    used = set()
+    written = set()
+    exit_pc = None
+
+    def x(n):
+        if n == 0: return "0"
+        used.add(n)
+        return f"x{n}"
+
+    def xw(n):
+        used.add(n); written.add(n)
+        return f"x{n}"
+
+    while index < len(sim.imem) and index - start < MAX_BLOCK:
+        opcode, rd, funct3, rs1, rs2, funct7, imm = decode(sim.imem[index])
+        if opcode == OPC_JAL and rd == 0 and imm == 0:
+            break
+        h = _table_handler(opcode, funct3, funct7)
+        if h is None:
+            break
+        ipc = sim.imem_base + index * 4
+        n = index - start + 1
+        index += 1
+        if h in _BIN_OPS:
+            if rd: body.append(f"{xw(rd)} = " + _BIN_OPS[h].format(a=x(rs1), b=x(rs2)))
+        elif h in _IMM_OPS:
+            if rd: body.append(f"{xw(rd)} = " + _IMM_OPS[h](imm).format(a=x(rs1)))
+        elif h in _LOADS:
+            nbytes, sign = _LOADS[h]
+            # the load may hit the cycle counter, which must read the steps
+            # retired before it, as under the interpreter
+            body.append(f"sim.steps = s0 + {n - 1}")
+            val = f"ld(({x(rs1)} + {imm}) & 0xFFFFFFFF, {nbytes})"
+            if sign: val = f"(({val} ^ {sign}) - {sign}) & 0xFFFFFFFF"
+            body.append(f"{xw(rd)} = {val}" if rd else val)
+        elif h in _STORES:
+            body.append(f"st(({x(rs1)} + {imm}) & 0xFFFFFFFF, {x(rs2)}, {_STORES[h]})")
+            # a store into code or to the exit device ends the block
+            body.append("if sim.code_gen != gen or sim.halted:")
+            body.append(f"    @WB@return {ipc + 4}, {n}")
+        elif h is RV32ISim._x_lui:
+            if rd: body.append(f"{xw(rd)} = {imm & 0xFFFFFFFF}")
+        elif h is RV32ISim._x_auipc:
+            if rd: body.append(f"{xw(rd)} = {(ipc + imm) & 0xFFFFFFFF}")
+        elif h is RV32ISim._x_jal:
+            if rd: body.append(f"{xw(rd)} = {(ipc + 4) & 0xFFFFFFFF}")
+            exit_pc = f"{(ipc + imm) & 0xFFFFFFFF}"
+            break
+        elif h is RV32ISim._x_jalr:
+            body.append(f"t = ({x(rs1)} + {imm}) & 0xFFFFFFFE")
+            if rd: body.append(f"{xw(rd)} = {(ipc + 4) & 0xFFFFFFFF}")
+            exit_pc = "t"
+            break
+        else:
+            cond = _BRANCHES[h].format(a=x(rs1), b=x(rs2))
+            exit_pc = f"{(ipc + imm) & 0xFFFFFFFF} if {cond} else {ipc + 4}"
+            break
+
+    ninstr = index - start
+    if ninstr == 0:
+        # halt loop or an encoding the table does not know: single-step it
+        sim.blocks[pc] = _NO_BLOCK
+        sim.block_owners.setdefault(start, set()).add(pc)
+        return _NO_BLOCK
+    if exit_pc is None:
+        exit_pc = str(sim.imem_base + index * 4)
+    wb = "".join(f"reg[{n}] = x{n}; " for n in sorted(written))
+    loads = any(ln.startswith("sim.steps = ") for ln in body)
+    if loads:
+        # the runner adds the block's count to the steps it started with
+        wb += "sim.steps = s0; "
+    lines = [f"def block(sim, reg, ld, st):"]
+    if loads: lines.append("    s0 = sim.steps")
+    lines += [f"    x{n} = reg[{n}]" for n in sorted(used)]
+    if "if sim.code_gen != gen or sim.halted:" in body:
+        lines.append("    gen = sim.code_gen")
+    lines += ["    " + ln.replace("@WB@", wb) for ln in body]
+    lines.append(f"    pc = {exit_pc}")
+    if wb: lines.append("    " + wb)
+    lines.append(f"    return pc, {ninstr}")
+    ns = {"_div": _div, "_rem": _rem}
+    exec(compile("\n".join(lines) + "\n", f"<rv32 block 0x{pc:08X}>", "exec"), ns)
+    b = (ns["block"], ninstr)
+    sim.blocks[pc] = b
+    for i in range(start, index):
+        sim.block_owners.setdefault(i, set()).add(pc)
+    return b
+
+class Profile:
+    # per-instruction execution counts indexed like imem (pc >> 2 from
+    # imem_base), plus how often each one did not fall through to pc + 4;
+    # opcode-class and branch totals are derived from these at report time
+    def __init__(self, n):
+        self.counts = array.array("Q", bytes(8 * n))
+        self.jumps = array.array("Q", bytes(8 * n))
+
+    def report(self, sim, top=20):
+        total = sum(self.counts) or 1
+        by_class = {}
+        taken = not_taken = 0
+        for index, c in enumerate(self.counts):
+            if not c: continue
+            opcode = sim.imem[index] & 0x7F
+            cls = OPCODE_CLASS.get(opcode, "OTHER")
+            by_class[cls] = by_class.get(cls, 0) + c
+            if opcode == OPC_BRANCH:
+                taken += self.jumps[index]
+                not_taken += c - self.jumps[index]
+        lines = [f"\nProfile: {total} steps in {sum(1 for c in self.counts if c)} distinct instructions"]
+        lines.append(f"  {'pc':<10}  {'count':>10}  {'%':>6}  {'taken/not':>13}  disassembly")
+        hot = sorted(range(len(self.counts)), key=lambda i: (-self.counts[i], i))[:top]
+        for index in hot:
+            c = self.counts[index]
+            if not c: break
+            instr = sim.imem[index]
+            tn = ""
+            if instr & 0x7F == OPC_BRANCH:
+                tn = f"{self.jumps[index]}/{c - self.jumps[index]}"
+            lines.append(f"  0x{sim.imem_base + index * 4:08X}  {c:>10}  {100 * c / total:>5.1f}%  {tn:>13}  {disasm(instr)}")
+        lines.append("\nBy opcode class:")
+        for cls, c in sorted(by_class.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {cls:<8} {c:>10}  {100 * c / total:>5.1f}%")
+        lines.append(f"\nBranches: {taken} taken, {not_taken} not taken")
+        return "\n".join(lines)
 
 def load_hex_words(path):
     words = []
@@ -201,31 +988,133 @@ def load_hex_words(path):
             words.append(w)
     return words
 
+def map_image(path):
+    # copy-on-write mapping: the simulator may write into it, the file never
+    # changes, and only pages actually touched are read from disk
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return memoryview(bytearray())
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+
+def as_words(image):
+    # view little-endian bytes as 32-bit words in place
+    image = memoryview(image).cast("B")
+    image = image[:len(image) - len(image) % 4]
+    if sys.byteorder != "little":
+        words = array.array("I", image)
+        words.byteswap()
+        return words
+    return image.cast("I")
+
+def load_bin_words(path):
+    # raw little-endian instruction image
+    return as_words(map_image(path))
+
+def load_elf(path, **kwargs):
+    # executable segments become imem (one span from the lowest to the
+    # highest), every PT_LOAD is copied into data memory in bulk, and the
+    # simulator starts at e_entry
+    entry, segments = read_elf32(map_image(path))
+    code = [seg for seg in segments if seg.flags & PF_X]
+    if not code:
+        raise ValueError(f"{path}: no executable segment")
+    base = min(seg.vaddr for seg in code) & ~3
+    end = max(seg.vaddr + seg.memsz for seg in code)
+    text = bytearray((end - base + 3) & ~3)
+    for seg in code:
+        off = seg.vaddr - base
+        text[off:off + len(seg.data)] = seg.data
+    sim = RV32ISim(as_words(text), imem_base=base, **kwargs)
+    for seg in segments:
+        sim.dmem.write(seg.vaddr, seg.data)
+        if seg.memsz > len(seg.data):
+            sim.dmem.write(seg.vaddr + len(seg.data), bytes(seg.memsz - len(seg.data)))
+    sim.pc = entry
+    return sim
+
+def load_checkpoint(path, **kwargs):
+    # a fresh simulator in the saved state; kwargs as for RV32ISim
+    snap = read_checkpoint(map_image(path))
+    kwargs["dmem_size"] = snap.meta["areas"][0][2]  # the saved flat region wins
+    sim = RV32ISim(snap.imem, imem_base=snap.meta["imem_base"], **kwargs)
+    snap.restore(sim)
+    return sim
+
+def load_program(path, **kwargs):
+    # ELF or checkpoint by magic number, raw image by .bin extension, hex
+    # list otherwise
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == b"\x7fELF":
+        return load_elf(path, **kwargs)
+    if magic == CKPT_MAGIC:
+        return load_checkpoint(path, **kwargs)
+    if path.endswith(".bin"):
+        return RV32ISim(load_bin_words(path), **kwargs)
+    return RV32ISim(load_hex_words(path), **kwargs)
+
 def main():
     ap = argparse.ArgumentParser(description="RV32I Python simulator (with extras)")
-    ap.add_argument("hex", help="path to prog.hex")
+    ap.add_argument("hex", nargs="?",
+                    help="path to prog.hex, a raw little-endian .bin code image, an ELF32 executable or a checkpoint")
     ap.add_argument("--max-steps", type=int, default=1000)
     ap.add_argument("--trace", action="store_true")
+    ap.add_argument("--engine", choices=ENGINES, default="interp")
+    ap.add_argument("--dmem-size", type=lambda s: int(s, 0), default=DMEM_SIZE,
+                    help="bytes in the flat data region at DMEM_BASE")
+    ap.add_argument("--tx-buffer", type=int, default=4096,
+                    help="console bytes buffered before a forced flush (newline always flushes)")
+    ap.add_argument("--profile", action="store_true", help="count executions per PC and print a hot-spot report")
+    ap.add_argument("--profile-top", type=int, default=20)
+    ap.add_argument("--trace-file", help="record a binary trace here (decode with tracebuf.py)")
+    ap.add_argument("--trace-last", type=int, default=0, metavar="N",
+                    help="keep the last N instructions in a ring and print them at the end")
+    ap.add_argument("--resume", metavar="CHECKPOINT", help="continue from a saved checkpoint instead of a program")
+    ap.add_argument("--save-checkpoint", metavar="PATH", help="snapshot the simulator here when the run stops")
+    ap.add_argument("--data", help="raw data image mapped into memory")
+    ap.add_argument("--data-addr", type=lambda s: int(s, 0), default=DMEM_BASE)
     args = ap.parse_args()
-    imem = load_hex_words(args.hex)
-    sim = RV32ISim(imem, max_steps=args.max_steps, trace=args.trace)
-    steps = 0
-    while not sim.halted and steps < sim.max_steps:
-        sim.step()
-        steps += 1
+    if (args.hex is None) == (args.resume is None):
+        ap.error("give either a program or --resume CHECKPOINT")
+    opts = dict(max_steps=args.max_steps, trace=args.trace, engine=args.engine,
+                dmem_size=args.dmem_size, console=Console(bufsize=args.tx_buffer),
+                profile=args.profile)
+    if args.trace_file or args.trace_last:
+        nrec = max(args.trace_last, 65536) if args.trace_file else args.trace_last
+        opts["tracer"] = TraceBuffer(args.trace_file, nrec)
+    sim = load_checkpoint(args.resume, **opts) if args.resume else load_program(args.hex, **opts)
+    if args.data:
+        sim.dmem.map(args.data_addr, map_image(args.data))
+    try:
+        steps = sim.run()
+    finally:
+        if sim.tracer is not None:
+            sim.tracer.close()
+            if args.trace_last:
+                print(f"\nLast {args.trace_last} instructions:")
+                for rec in sim.tracer.last(args.trace_last):
+                    print("  " + format_text(rec))
+    if args.save_checkpoint:
+        save_checkpoint(sim, args.save_checkpoint)
     print(f"\nExecuted {steps} steps. Final PC=0x{sim.pc:08X}")
+    if sim.halt_reason == "exit":
+        print(f"Exit code: {sim.exit_code}")
     print("Registers:")
     for i in range(0, 32, 8):
         print(" ".join([f"x{j:02d}=0x{sim.reg[j]:08X}" for j in range(i, i+8)]))
+    if any(sim.freg) or sim.fcsr:
+        print(f"FP registers (fcsr=0x{sim.fcsr:02X}):")
+        for i in range(0, 32, 8):
+            print(" ".join([f"f{j:02d}=0x{sim.freg[j]:08X}" for j in range(i, i+8)]))
     base = DMEM_BASE
     print("\nDMEM snapshot (0x00010000..0x0001000F):")
     for off in range(0, 16, 4):
         addr = base + off
-        val = ((sim.dmem.get(addr, 0) & 0xFF)
-              | ((sim.dmem.get(addr + 1, 0) & 0xFF) << 8)
-              | ((sim.dmem.get(addr + 2, 0) & 0xFF) << 16)
-              | ((sim.dmem.get(addr + 3, 0) & 0xFF) << 24))
+        val = sim.dmem.load(addr, 4)
         print(f"  [0x{addr:08X}] = 0x{val:08X}")
+    if sim.profile is not None:
+        print(sim.profile.report(sim, args.profile_top))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# simt.py
+# many-hart RV32ISim: N copies of the architectural state held in NumPy
+# arrays, one shared instruction stream. Each round picks the lowest PC
+# among live harts, decodes that instruction once and executes it for every
+# hart sitting at that PC; the others are masked off until they reconverge.
+
+import argparse
+import numpy as np
+from riv32 import (load_hex_words, decode, OPC_LOAD, OPC_STORE, OPC_OPIMM, OPC_OP, OPC_BRANCH,
+                   OPC_JAL, OPC_JALR, OPC_LUI, OPC_AUIPC, DMEM_BASE, DMEM_SIZE, MMIO_TX)
+
+class SIMTSim:
+    def __init__(self, imem_words, nharts, max_steps=1000, imem_base=0, dmem_size=DMEM_SIZE):
+        self.imem = list(imem_words)
+        self.imem_base = imem_base
+        self.n = nharts
+        self.max_steps = max_steps
+        self.reg = np.zeros((nharts, 32), dtype=np.uint32)
+        self.pc = np.full(nharts, imem_base, dtype=np.uint32)
+        self.dmem = np.zeros((nharts, dmem_size), dtype=np.uint8)  # at DMEM_BASE
+        self.halted = np.zeros(nharts, dtype=bool)
+        self.steps = np.zeros(nharts, dtype=np.int64)
+        self.output = [bytearray() for _ in range(nharts)]
+        self.decoded = [None] * len(self.imem)
+
+    def run(self):
+        while True:
+            live = ~self.halted & (self.steps < self.max_steps)
+            if not live.any():
+                return self.steps
+            pc = int(self.pc[live].min())
+            self.step_at(pc, np.nonzero(live & (self.pc == pc))[0])
+
+    def step_at(self, pc, idx):
+        # execute the instruction at pc for harts idx (all of which are there)
+        self.steps[idx] += 1
+        index = (pc - self.imem_base) >> 2
+        if pc % 4 != 0:
+            raise RuntimeError(f"PC not aligned: 0x{pc:08X}")
+        if index < 0 or index >= len(self.imem):
+            self.halted[idx] = True
+            return
+        d = self.decoded[index]
+        if d is None:
+            d = self.decoded[index] = decode(self.imem[index])
+        opcode, rd, funct3, rs1, rs2, funct7, imm = d
+        if opcode == OPC_JAL and rd == 0 and imm == 0:
+            self.halted[idx] = True
+            return
+
+        reg = self.reg
+        a = reg[idx, rs1]
+        b = reg[idx, rs2]
+        imm32 = np.uint32(imm & 0xFFFFFFFF)
+        pc_next = np.full(len(idx), (pc + 4) & 0xFFFFFFFF, dtype=np.uint32)
+        y = None
+
+        if opcode == OPC_OP and funct7 == 0b0000001:
+            y = _mext(funct3, a, b)
+        elif opcode == OPC_OP:
+            y = _alu(funct3, (funct7 >> 5) & 1, a, b, True)
+        elif opcode == OPC_OPIMM:
+            y = _alu(funct3, (funct7 >> 5) & 1, a, np.full_like(a, imm32), False)
+        elif opcode == OPC_LOAD:
+            nbytes = (1, 2, 4, 0, 1, 2, 0, 0)[funct3]
+            y = self._load(idx, a + imm32, nbytes) if nbytes else np.zeros_like(a)
+            if funct3 == 0b000: y = (y.astype(np.int8)).astype(np.int32).view(np.uint32)
+            elif funct3 == 0b001: y = (y.astype(np.int16)).astype(np.int32).view(np.uint32)
+        elif opcode == OPC_STORE:
+            if funct3 <= 0b010:
+                self._store(idx, a + imm32, b, 1 << funct3)
+        elif opcode == OPC_BRANCH:
+            sa, sb = a.view(np.int32), b.view(np.int32)
+            take = {0b000: a == b, 0b001: a != b, 0b100: sa < sb,
+                    0b101: sa >= sb, 0b110: a < b, 0b111: a >= b}.get(funct3)
+            if take is not None:
+                pc_next = np.where(take, np.uint32((pc + imm) & 0xFFFFFFFF), pc_next)
+        elif opcode == OPC_JAL:
+            y = pc_next.copy()
+            pc_next[:] = (pc + imm) & 0xFFFFFFFF
+        elif opcode == OPC_JALR:
+            y = pc_next.copy()
+            pc_next = (a + imm32) & np.uint32(0xFFFFFFFE)
+        elif opcode == OPC_LUI:
+            y = np.full_like(a, imm32)
+        elif opcode == OPC_AUIPC:
+            y = np.full_like(a, (pc + imm) & 0xFFFFFFFF)
+
+        if y is not None and rd:
+            reg[idx, rd] = y
+        self.pc[idx] = pc_next
+
+    def _offsets(self, addr, nbytes):
+        off = addr.astype(np.int64) - DMEM_BASE
+        if ((off < 0) | (off > self.dmem.shape[1] - nbytes)).any():
+            bad = int(addr[(off < 0) | (off > self.dmem.shape[1] - nbytes)][0])
+            raise RuntimeError(f"SIMT access outside the per-hart data region: 0x{bad:08X}")
+        return off
+
+    def _load(self, idx, addr, nbytes):
+        off = self._offsets(addr, nbytes)
+        val = np.zeros(len(idx), dtype=np.uint32)
+        for k in range(nbytes):
+            val |= self.dmem[idx, off + k].astype(np.uint32) << np.uint32(8 * k)
+        return val
+
+    def _store(self, idx, addr, data, nbytes):
+        tx = addr == MMIO_TX
+        for h, v in zip(idx[tx], data[tx]):
+            self.output[h].append(int(v) & 0xFF)
+        idx, addr, data = idx[~tx], addr[~tx], data[~tx]
+        if len(idx) == 0:
+            return
+        off = self._offsets(addr, nbytes)
+        for k in range(nbytes):
+            self.dmem[idx, off + k] = (data >> np.uint32(8 * k)).astype(np.uint8)
+
+def _alu(funct3, funct7b5, a, b, reg_form):
+    # same results as RV32ISim._x_op / _x_opimm, on uint32 vectors
+    sh = b & np.uint32(0x1F)
+    if funct3 == 0b000:
+        return a - b if (reg_form and funct7b5) else a + b
+    if funct3 == 0b010:
+        return (a.view(np.int32) < b.view(np.int32)).astype(np.uint32)
+    if funct3 == 0b011:
+        return (a < b).astype(np.uint32)
+    if funct3 == 0b101:
+        if funct7b5:
+            return (a.view(np.int32) >> sh.astype(np.int32)).view(np.uint32)
+        return a >> sh
+    if reg_form and funct7b5:
+        return np.zeros_like(a)
+    if funct3 == 0b111: return a & b
+    if funct3 == 0b110: return a | b
+    if funct3 == 0b100: return a ^ b
+    return a << sh
+
+def _mext(funct3, a, b):
+    # same results as riv32.mext, on uint32 vectors
+    if funct3 == 0b000:
+        return a * b
+    sa = a.view(np.int32).astype(np.int64)
+    sb = b.view(np.int32).astype(np.int64)
+    if funct3 == 0b001: hi = (sa * sb) >> 32
+    elif funct3 == 0b010: hi = (sa * b.astype(np.int64)) >> 32
+    elif funct3 == 0b011: hi = (a.astype(np.uint64) * b) >> np.uint64(32)
+    else: hi = None
+    if hi is not None:
+        return (hi & 0xFFFFFFFF).astype(np.uint32)
+    zero = b == 0
+    if funct3 == 0b101:
+        return np.where(zero, np.uint32(0xFFFFFFFF), a // np.where(zero, 1, b).astype(np.uint32))
+    if funct3 == 0b111:
+        return np.where(zero, a, a % np.where(zero, 1, b).astype(np.uint32))
+    d = np.abs(np.where(zero, 1, sb))
+    if funct3 == 0b100:
+        q = np.abs(sa) // d
+        y = np.where(zero, -1, np.where((sa < 0) != (sb < 0), -q, q))
+    else:
+        r = np.abs(sa) % d
+        y = np.where(zero, sa, np.where(sa < 0, -r, r))
+    return (y & 0xFFFFFFFF).astype(np.uint32)
+
+def main():
+    ap = argparse.ArgumentParser(description="RV32I many-hart (SIMT) simulator")
+    ap.add_argument("hex", help="path to prog.hex")
+    ap.add_argument("--harts", type=int, default=8)
+    ap.add_argument("--max-steps", type=int, default=1000)
+    ap.add_argument("--sweep", action="append", default=[], metavar="xN=START:STEP",
+                    help="start register xN at START + hart*STEP (repeatable)")
+    ap.add_argument("--show", default="x1,x2,x3", help="registers to print per hart")
+    args = ap.parse_args()
+    sim = SIMTSim(load_hex_words(args.hex), args.harts, max_steps=args.max_steps)
+    for spec in args.sweep:
+        r, rng = spec.split("=")
+        start, step = (int(v, 0) for v in rng.split(":"))
+        vals = (start + step * np.arange(args.harts, dtype=np.int64)) & 0xFFFFFFFF
+        sim.reg[:, int(r.lstrip("x"))] = vals.astype(np.uint32)
+    sim.run()
+    show = [int(r.strip().lstrip("x")) for r in args.show.split(",")]
+    print("hart    steps  pc          " + " ".join(f"x{r:02d}      " for r in show))
+    for h in range(args.harts):
+        regs = " ".join(f"0x{int(sim.reg[h, r]):08X}" for r in show)
+        print(f"{h:<6} {int(sim.steps[h]):>7}  0x{int(sim.pc[h]):08X}  {regs}")
+
+if __name__ == "__main__":
+    main()
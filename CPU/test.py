@@ -0,0 +1,525 @@
+import contextlib
+import io
+import os
+import sys
+import random
+import struct
+import tempfile
+from riv32 import (RV32ISim, ENGINES, DMEM_BASE, load_hex_words, load_bin_words, map_image, load_elf,
+                   load_checkpoint, load_program)
+from memory import Memory
+from batch import run_batch
+from mmio import Console
+from checkpoint import dumps, read_checkpoint
+from tracebuf import TraceBuffer, read_trace, format_text, TR_RD, TR_STORE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MIDTERM = os.path.join(HERE, "..", "Midterm", "Helper Functions", "Midterm")
+
+# every RV32I op the simulator implements, ending in the JAL x0,0 halt loop
+ALU_PROG = [
+    0xFF900093,  # addi x1, x0, -7
+    0x00300113,  # addi x2, x0, 3
+    0x002081B3,  # add  x3, x1, x2
+    0x40208233,  # sub  x4, x1, x2
+    0x002092B3,  # sll  x5, x1, x2
+    0x0020A333,  # slt  x6, x1, x2
+    0x0020B3B3,  # sltu x7, x1, x2
+    0x0020C433,  # xor  x8, x1, x2
+    0x0020D4B3,  # srl  x9, x1, x2
+    0x4020D533,  # sra  x10, x1, x2
+    0x0020E5B3,  # or   x11, x1, x2
+    0x0020F633,  # and  x12, x1, x2
+    0xFFF0A693,  # slti x13, x1, -1
+    0xFFF0B713,  # sltiu x14, x1, -1
+    0xFFF0C793,  # xori x15, x1, -1
+    0x0700E813,  # ori  x16, x1, 0x70
+    0x7F00F893,  # andi x17, x1, 0x7F0
+    0x00409913,  # slli x18, x1, 4
+    0x0040D993,  # srli x19, x1, 4
+    0x4040DA13,  # srai x20, x1, 4
+    0x00010AB7,  # lui  x21, 0x10
+    0x001AA023,  # sw   x1, 0(x21)
+    0x002A9223,  # sh   x2, 4(x21)
+    0x001A8323,  # sb   x1, 6(x21)
+    0x004AAB03,  # lw   x22, 4(x21)
+    0x000A9B83,  # lh   x23, 0(x21)
+    0x000ADC03,  # lhu  x24, 0(x21)
+    0x000A8C83,  # lb   x25, 0(x21)
+    0x000ACD03,  # lbu  x26, 0(x21)
+    0x00001D97,  # auipc x27, 0x1
+    0x00800E6F,  # jal  x28, +8
+    0x00100E93,  # addi x29, x0, 1
+    0x00108463,  # beq  x1, x1, +8
+    0x00200E93,  # addi x29, x0, 2
+    0x00109463,  # bne  x1, x1, +8
+    0x00400F13,  # addi x30, x0, 4
+    0x01CE0FE7,  # jalr x31, 28(x28)
+    0x00300E93,  # addi x29, x0, 3
+    0x0000006F,  # jal  x0, 0
+]
+
+# stores a new instruction over one it is about to execute
+SMC_PROG = [
+    0x002001B7,  # lui  x3, 0x200
+    0x21318193,  # addi x3, x3, 0x213
+    0x00302A23,  # sw   x3, 20(x0)
+    0x00700293,  # addi x5, x0, 7
+    0x00800313,  # addi x6, x0, 8
+    0x00100213,  # addi x4, x0, 1  (patched to addi x4, x0, 2)
+    0x0000006F,  # jal  x0, 0
+]
+
+# prints "hi\n" through MMIO_TX
+HELLO_PROG = [
+    0x000200B7,  # lui  x1, 0x20  (MMIO_TX)
+    0x06800113,  # addi x2, x0, 104
+    0x0020A023,  # sw   x2, 0(x1)
+    0x06900113,  # addi x2, x0, 105
+    0x0020A023,  # sw   x2, 0(x1)
+    0x00A00113,  # addi x2, x0, 10
+    0x0020A023,  # sw   x2, 0(x1)
+    0x0000006F,  # jal  x0, 0
+]
+
+# reads the cycle counter, then halts through the exit-code register
+EXIT_PROG = [
+    0x000200B7,  # lui  x1, 0x20  (MMIO base)
+    0x0080A283,  # lw   x5, 8(x1)  (cycle counter)
+    0x02A00113,  # addi x2, x0, 42
+    0x0020A823,  # sw   x2, 16(x1)  (exit 42)
+    0x00100193,  # addi x3, x0, 1
+    0x0000006F,  # jal  x0, 0
+]
+
+# counts x1 up by 3 until it passes x10, so harts with different x10 diverge
+SWEEP_PROG = [
+    0x00308093,  # addi x1, x1, 3
+    0xFEA0CEE3,  # blt  x1, x10, -4
+    0x000102B7,  # lui  x5, 0x10
+    0x0012A023,  # sw   x1, 0(x5)
+    0x00028303,  # lb   x6, 0(x5)
+    0x0000006F,  # jal  x0, 0
+]
+
+# linked at 0x00100000 with e_entry one word in; data segment at 0x00011000
+ELF_TEXT = [
+    0x00100F93,  # addi x31, x0, 1  (before e_entry, never runs)
+    0x000110B7,  # lui  x1, 0x11
+    0x0000A103,  # lw   x2, 0(x1)
+    0x0040A183,  # lw   x3, 4(x1)  (.bss)
+    0xFFF00213,  # addi x4, x0, -1
+    0x00224463,  # blt  x4, x2, +8
+    0x00200F93,  # addi x31, x0, 2
+    0x00226463,  # bltu x4, x2, +8
+    0x00900293,  # addi x5, x0, 9
+    0x00415463,  # bge  x2, x4, +8
+    0x00300F93,  # addi x31, x0, 3
+    0x00227463,  # bgeu x4, x2, +8
+    0x00400F93,  # addi x31, x0, 4
+    0x0020A423,  # sw   x2, 8(x1)
+    0x0000006F,  # jal  x0, 0
+]
+
+# RV32F: int <-> float, arithmetic, FP load/store, rounding modes, fflags
+FP_PROG = [
+    0x00300093,  # addi x1, x0, 3
+    0x00700113,  # addi x2, x0, 7
+    0xD00080D3,  # fcvt.s.w f1, x1
+    0xD0010153,  # fcvt.s.w f2, x2
+    0x102081D3,  # fmul.s f3, f1, f2
+    0x000102B7,  # lui x5, 0x10
+    0x0032A027,  # fsw f3, 0(x5)
+    0x0002A207,  # flw f4, 0(x5)
+    0x001202D3,  # fadd.s f5, f4, f1
+    0x40200237,  # lui x4, 0x40200  (2.5)
+    0xF00203D3,  # fmv.w.x f7, x4
+    0xC0039353,  # fcvt.w.s x6, f7, rtz
+    0xC00383D3,  # fcvt.w.s x7, f7, rne
+    0xE0028453,  # fmv.x.w x8, f5
+    0xA02094D3,  # flt.s x9, f1, f2
+    0x00102573,  # csrrs x10, fflags, x0
+    0x0000006F,  # jal x0, 0
+]
+
+# RV32M: "<op> x3, x1, x2" for each funct3, and operands that hit the edge cases
+M_OPS = ("MUL", "MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM", "REMU")
+M_EDGES = [0, 1, 2, 3, 7, 0x7FFFFFFF, 0x80000000, 0x80000001, 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFF9]
+M_PAIRS = [(a, b) for a in M_EDGES for b in M_EDGES]
+
+def m_prog(funct3):
+    return [0x02000000 | (2 << 20) | (1 << 15) | (funct3 << 12) | (3 << 7) | 0x33, 0x0000006F]
+
+def run_m(funct3, a, b, engine="interp"):
+    sim = RV32ISim(m_prog(funct3), engine=engine)
+    sim.reg[1], sim.reg[2] = a, b
+    sim.run()
+    return sim.reg[3]
+
+def make_elf(entry, segments):
+    # segments: (vaddr, flags, data, memsz); ELF32 LE RISC-V, ET_EXEC
+    phoff = 52
+    off = phoff + 32 * len(segments)
+    phdrs = b""
+    body = b""
+    for vaddr, flags, data, memsz in segments:
+        phdrs += struct.pack("<IIIIIIII", 1, off + len(body), vaddr, vaddr, len(data), memsz, flags, 4)
+        body += data
+    ident = b"\x7fELF" + bytes([1, 1, 1]) + bytes(9)
+    ehdr = ident + struct.pack("<HHIIIIIHHHHHH", 2, 243, 1, entry, phoff, 0, 0, 52, 32, len(segments), 0, 0, 0)
+    return ehdr + phdrs + body
+
+# Simple check helper
+def check(name, expected, got):
+    if expected == got:
+        print(f"[PASS] {name} -> {got}")
+    else:
+        print(f"[FAIL] {name}: expected {expected}, got {got}")
+
+def run(words, engine="interp", max_steps=1000):
+    sim = RV32ISim(words, max_steps=max_steps, engine=engine)
+    steps = sim.run()
+    return sim, steps
+
+def state(sim, steps):
+    return (steps, sim.pc, tuple(sim.reg), sim.dmem.read(DMEM_BASE, 16))
+
+def test_prog_hex():
+    print("\n=== Testing prog.hex ===")
+    sim, steps = run(load_hex_words(os.path.join(HERE, "prog.hex")))
+    check("prog.hex steps", 10, steps)
+    check("prog.hex x4", 0x0F, sim.reg[4])
+    check("prog.hex x6", 0x02, sim.reg[6])
+
+def test_alu_prog():
+    print("\n=== Testing RV32I ops (interp) ===")
+    sim, steps = run(ALU_PROG)
+    r = sim.reg
+    check("SUB -7-3", 0xFFFFFFF6, r[4])
+    check("SRA -7>>3", 0xFFFFFFFF, r[10])
+    check("SLTI -7<-1", 1, r[13])
+    check("SLTIU -7<0xFFFFFFFF", 1, r[14])
+    check("SRAI -7>>4", 0xFFFFFFFF, r[20])
+    check("LW after SH/SB", 0x00F90003, r[22])
+    check("LB -7", 0xFFFFFFF9, r[25])
+    check("branches/jumps skipped x29", 0, r[29])
+    check("JALR link", 0x94, r[31])
+
+def test_engines_match():
+    print("\n=== Testing engines against interp ===")
+    for name, words in (("prog.hex", load_hex_words(os.path.join(HERE, "prog.hex"))), ("ALU_PROG", ALU_PROG)):
+        ref = state(*run(words))
+        for engine in ENGINES:
+            check(f"{name} [{engine}]", ref, state(*run(words, engine)))
+
+def test_self_modifying_code():
+    print("\n=== Testing stores into the code region ===")
+    for engine in ENGINES:
+        sim, steps = run(SMC_PROG, engine)
+        check(f"patched addi [{engine}]", 2, sim.reg[4])
+
+def test_max_steps_exact():
+    print("\n=== Testing --max-steps cut-off per engine ===")
+    for engine in ENGINES:
+        same = all(state(*run(ALU_PROG, engine, n)) == state(*run(ALU_PROG, "interp", n))
+                   for n in range(1, 40))
+        check(f"ALU_PROG max_steps 1..39 [{engine}]", True, same)
+
+def test_memory():
+    print("\n=== Testing Memory (flat region + pages) ===")
+    m = Memory(0x1000, 0x100)
+    m.store(0x10FE, 0x11223344, 4)   # straddles the end of the flat region
+    check("word across region end", 0x11223344, m.load(0x10FE, 4))
+    check("page holds the tail", [0x1100 >> 12], sorted(m.pages))
+    m.store(0xFFFFFFFE, 0xAABBCCDD, 4)   # wraps past the top of memory
+    check("wrapping word", 0xAABBCCDD, m.load(0xFFFFFFFE, 4))
+    check("unwritten reads 0", 0, m.load(0x80000000, 4))
+    m.write(0x0FFE, bytes(range(8)))
+    check("bulk write/read", bytes(range(8)), m.read(0x0FFE, 8))
+
+def test_mapped_images():
+    print("\n=== Testing mmap'd code/data images ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        code = os.path.join(tmp, "smc.bin")
+        data = os.path.join(tmp, "data.bin")
+        with open(code, "wb") as f:
+            f.write(struct.pack(f"<{len(SMC_PROG)}I", *SMC_PROG))
+        with open(data, "wb") as f:
+            f.write(struct.pack("<4I", 1, 2, 3, 4))
+        sim = RV32ISim(load_bin_words(code))
+        sim.dmem.map(DMEM_BASE, map_image(data))
+        sim.run()
+        check("bin image runs (patched addi)", 2, sim.reg[4])
+        check("data image word 2", 3, sim.dmem.load(DMEM_BASE + 8, 4))
+        sim.dmem.store(DMEM_BASE, 0xFFFF, 4)
+        sim.dmem.store(DMEM_BASE + 16, 7, 4)   # past the image -> pages
+        check("store past image", 7, sim.dmem.load(DMEM_BASE + 16, 4))
+        with open(code, "rb") as f:
+            check("code file untouched", list(SMC_PROG), list(struct.unpack(f"<{len(SMC_PROG)}I", f.read())))
+        with open(data, "rb") as f:
+            check("data file untouched", (1, 2, 3, 4), struct.unpack("<4I", f.read()))
+
+def test_elf_loader():
+    print("\n=== Testing ELF32 loader ===")
+    text = struct.pack(f"<{len(ELF_TEXT)}I", *ELF_TEXT)
+    image = make_elf(0x00100004, [(0x00100000, 5, text, len(text)),
+                                  (0x00011000, 6, struct.pack("<I", 40), 64)])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prog.elf")
+        with open(path, "wb") as f:
+            f.write(image)
+        for engine in ENGINES:
+            sim = load_elf(path, engine=engine)
+            check(f"entry pc [{engine}]", 0x00100004, sim.pc)
+            steps = sim.run()
+            check(f"branches/.data/.bss [{engine}]", (0, 40, 0, 9), (sim.reg[31], sim.reg[2], sim.reg[3], sim.reg[5]))
+            check(f"store to .bss [{engine}]", 40, sim.dmem.load(0x00011008, 4))
+            check(f"halt pc [{engine}]", 0x00100038, sim.pc)
+            # lui, 2 loads, addi, 4 branches (3 taken), addi x5, sw, jal
+            check(f"steps from e_entry [{engine}]", 11, steps)
+
+def write_hex(path, words):
+    with open(path, "w") as f:
+        f.write("".join(f"{w:08X}\n" for w in words))
+
+def test_batch_runner():
+    print("\n=== Testing batch runner ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        progs = [("a_hello.hex", HELLO_PROG), ("b_alu.hex", ALU_PROG), ("c_smc.hex", SMC_PROG)] * 4
+        paths = []
+        for n, (name, words) in enumerate(progs):
+            paths.append(os.path.join(tmp, f"{n:02d}_{name}"))
+            write_hex(paths[-1], words)
+        paths.append(os.path.join(tmp, "missing.hex"))
+        recs = list(run_batch(paths, dict(max_steps=1000), jobs=2))
+        check("one record per program, in order", True, paths == [r["program"] for r in recs])
+        check("captured MMIO output", ["hi\n", "", ""] * 4, [r["output"] for r in recs[:-1]])
+        check("ALU_PROG regs", list(run(ALU_PROG)[0].reg), recs[1]["regs"])
+        check("halt reasons", {"halt-loop"}, {r["halt"] for r in recs[:-1]})
+        check("missing file", "error", recs[-1]["halt"])
+        again = list(run_batch(paths, dict(max_steps=1000), jobs=1))
+        strip = lambda rs: [{k: v for k, v in r.items() if k != "wall"} for r in rs]
+        check("deterministic across job counts", True, strip(recs) == strip(again))
+
+def test_simt():
+    print("\n=== Testing SIMT (NumPy many-hart) mode ===")
+    try:
+        from simt import SIMTSim
+    except ImportError:
+        print("[SKIP] numpy not installed")
+        return
+    n = 64
+    x10 = [(h * 37 - 500) & 0xFFFFFFFF for h in range(n)]
+    simt = SIMTSim(SWEEP_PROG, n, max_steps=60)
+    simt.reg[:, 10] = x10
+    simt.run()
+    same = True
+    for h in range(n):
+        sim = RV32ISim(SWEEP_PROG, max_steps=60)
+        sim.reg[10] = x10[h]
+        steps = sim.run()
+        same &= (steps, sim.pc, sim.reg) == (int(simt.steps[h]), int(simt.pc[h]), [int(v) for v in simt.reg[h]])
+        same &= sim.dmem.read(DMEM_BASE, 4) == simt.dmem[h, :4].tobytes()
+    check("divergent sweep matches scalar per hart", True, same)
+    simt = SIMTSim(ALU_PROG, 3)
+    simt.run()
+    ref = run(ALU_PROG)[0]
+    check("ALU_PROG on every hart", True, all([int(v) for v in simt.reg[h]] == ref.reg for h in range(3)))
+    simt = SIMTSim(HELLO_PROG, 2)
+    simt.run()
+    check("per-hart MMIO output", [b"hi\n", b"hi\n"], [bytes(o) for o in simt.output])
+    same = True
+    for funct3 in range(8):
+        simt = SIMTSim(m_prog(funct3), len(M_PAIRS))
+        simt.reg[:, 1] = [a for a, _ in M_PAIRS]
+        simt.reg[:, 2] = [b for _, b in M_PAIRS]
+        simt.run()
+        same &= [int(v) for v in simt.reg[:, 3]] == [run_m(funct3, a, b) for a, b in M_PAIRS]
+    check("RV32M per hart matches scalar", True, same)
+
+def test_mmio_devices():
+    print("\n=== Testing MMIO devices ===")
+    con = Console(capture=True, bufsize=2)
+    sim = RV32ISim(HELLO_PROG, console=con)
+    sim.step(); sim.step(); sim.step()
+    check("console buffers below bufsize", b"", con.out.getvalue())
+    sim.step(); sim.step()
+    check("console flushes at bufsize", b"hi", con.out.getvalue())
+    sim.run()
+    check("console flushes on newline", b"hi\n", con.getvalue())
+    for engine in ENGINES:
+        sim = RV32ISim(EXIT_PROG, engine=engine)
+        steps = sim.run()
+        check(f"exit device [{engine}]", ("exit", 42, 4, 0), (sim.halt_reason, sim.exit_code, steps, sim.reg[3]))
+        check(f"cycle counter [{engine}]", 1, sim.reg[5])
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        RV32ISim(HELLO_PROG).run()
+    check("default console on a text-only stdout", "hi\n", out.getvalue())
+    sim = RV32ISim(HELLO_PROG, dmem_size=0x20000, console=Console(capture=True))
+    sim.run()
+    check("device inside a large flat region", b"hi\n", sim.console.getvalue())
+
+def test_profiler():
+    print("\n=== Testing per-PC profiler ===")
+    sim = RV32ISim(SWEEP_PROG, profile=True)
+    sim.reg[10] = 30
+    steps = sim.run()
+    p = sim.profile
+    check("counts add up to steps", steps, sum(p.counts))
+    check("loop body count", 10, p.counts[0])
+    check("blt taken/not taken", (9, 1), (p.jumps[1], p.counts[1] - p.jumps[1]))
+    report = p.report(sim, top=3)
+    check("report lists the hot branch", True, "blt x1, x10, -4" in report and "9/1" in report)
+    check("profiling off allocates nothing", None, RV32ISim(SWEEP_PROG).profile)
+
+def test_trace_buffer():
+    print("\n=== Testing binary trace buffer ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "t.bin")
+        sim = RV32ISim(SWEEP_PROG, tracer=TraceBuffer(path, nrec=4))
+        sim.reg[10] = 30
+        steps = sim.run()
+        sim.tracer.close()
+        recs = read_trace(path)
+    check("one record per step, across ring flushes", steps, len(recs))
+    check("first record", (0, SWEEP_PROG[0], TR_RD | 1, 3, 0), recs[0])
+    check("record pcs follow the run", [0, 4] * 10 + [8], [r[0] for r in recs][:21])
+    sim = RV32ISim(HELLO_PROG, tracer=TraceBuffer(nrec=3), console=Console(capture=True))
+    sim.run()
+    last = sim.tracer.last()
+    check("ring keeps only the last N", 3, len(last))
+    check("store record", (TR_STORE, 0x20000, 0x0A), (last[-2][2], last[-2][4], last[-2][3]))
+    check("decoded text", True, format_text(last[-1]).endswith("jal x0, +0"))
+
+def test_checkpoint():
+    print("\n=== Testing checkpoint/restore ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "warm.ckpt")
+        for engine in ENGINES:
+            sim = RV32ISim(SMC_PROG, max_steps=5, engine=engine)
+            sim.run()
+            with open(path, "wb") as f:
+                f.write(dumps(sim))
+            resumed = load_checkpoint(path, engine=engine)
+            resumed.run()
+            ref, steps = run(SMC_PROG, engine)
+            check(f"resume matches an uninterrupted run [{engine}]", state(ref, steps),
+                  state(resumed, resumed.steps))
+        sim = RV32ISim(SWEEP_PROG)
+        for page in (0x80000000, 0x80001000, 0x90000000):
+            sim.dmem.write(page, b"\x5a" * 4096)
+        sim.dmem.write(0xA0000000, bytes(16))
+        with open(path, "wb") as f:
+            f.write(dumps(sim))
+        snap = read_checkpoint(map_image(path))
+        check("identical pages stored once, zero pages skipped", (1, 4), (snap.meta["n_chunks"], len(snap.meta["areas"])))
+        back = load_program(path)
+        check("pages restored", b"\x5a" * 8, back.dmem.read(0x80000FFC, 8))
+        sim = RV32ISim(FP_PROG, max_steps=12)
+        sim.run()
+        with open(path, "wb") as f:
+            f.write(dumps(sim))
+        back = load_checkpoint(path)
+        back.run()
+        ref, _ = run(FP_PROG)
+        check("FP registers and fcsr restored", (ref.freg, ref.fcsr, ref.reg), (back.freg, back.fcsr, back.reg))
+
+def test_rv32m_against_mdu():
+    print("\n=== Testing RV32M against mdu.mdu ===")
+    sys.path.insert(0, MIDTERM)
+    from mdu import mdu
+    rnd = random.Random(13)
+    pairs = M_PAIRS + [(rnd.getrandbits(32), rnd.getrandbits(32)) for _ in range(100)]
+    for funct3, op in enumerate(M_OPS):
+        for engine in ENGINES:
+            bad = []
+            for a, b in pairs:
+                ref = mdu(op, [(a >> i) & 1 for i in range(31, -1, -1)], [(b >> i) & 1 for i in range(31, -1, -1)])
+                if run_m(funct3, a, b, engine) != int(ref["hex"], 16):
+                    bad.append((hex(a), hex(b)))
+            check(f"{op} [{engine}] over {len(pairs)} operand pairs", [], bad[:3])
+
+def f32_patterns(rnd, n):
+    # random normals, subnormals near the edges, specials, and pairs with
+    # close exponents so subtraction cancels
+    specials = [0, 0x80000000, 0x7F800000, 0xFF800000, 0x7FC00000, 0x7F800001, 0x7F7FFFFF,
+                0x00800000, 0x007FFFFF, 0x00000001, 0x3F800000, 0xBF800000]
+    out = [(a, b) for a in specials for b in specials]
+    for _ in range(n):
+        e = rnd.choice([rnd.randint(0, 254), rnd.randint(110, 140), rnd.randint(0, 24), rnd.randint(230, 254)])
+        a = (rnd.getrandbits(1) << 31) | (e << 23) | rnd.getrandbits(23)
+        if rnd.random() < 0.3:
+            b = (a & 0x7F800000) | (rnd.getrandbits(1) << 31) | rnd.getrandbits(23)
+        else:
+            e = rnd.choice([rnd.randint(0, 254), e, max(0, e - rnd.randint(0, 30))])
+            b = (rnd.getrandbits(1) << 31) | (e << 23) | rnd.getrandbits(23)
+        out.append((a, b))
+    return out
+
+def test_rv32f():
+    print("\n=== Testing RV32F ===")
+    sim, _ = run(FP_PROG)
+    check("fcvt/fmul/fsw/flw/fadd", 0x41C00000, sim.reg[8])
+    check("stored product 21.0", 0x41A80000, sim.dmem.load(DMEM_BASE, 4))
+    check("fcvt.w.s 2.5 rtz, rne", (2, 2), (sim.reg[6], sim.reg[7]))
+    check("flt.s", 1, sim.reg[9])
+    check("fflags read back (NX)", 1, sim.reg[10])
+    for engine in ENGINES[1:]:
+        other, _ = run(FP_PROG, engine)
+        check(f"FP_PROG [{engine}]", (sim.reg, sim.freg, sim.fcsr), (other.reg, other.freg, other.fcsr))
+
+    sys.path.insert(0, MIDTERM)
+    from fpu import FPU
+    names = ("inexact", "underflow", "overflow", None, "invalid")
+    ops = ((0x00, "FADD.S", FPU.f32_add), (0x04, "FSUB.S", FPU.f32_sub), (0x08, "FMUL.S", FPU.f32_mul))
+    pairs = f32_patterns(random.Random(14), 400)
+    for funct7, name, ref in ops:
+        prog = [(funct7 << 25) | (2 << 20) | (1 << 15) | (3 << 7) | 0x53, 0x0000006F]  # op f3, f1, f2
+        bad = []
+        for a, b in pairs:
+            sim = RV32ISim(prog)
+            sim.freg[1], sim.freg[2] = a, b
+            sim.run()
+            bits, flags, _ = ref(FPU(), [(a >> i) & 1 for i in range(31, -1, -1)], [(b >> i) & 1 for i in range(31, -1, -1)])
+            want = (int("".join(map(str, bits)), 2), sum(1 << i for i, f in enumerate(names) if f and flags[f]))
+            if (sim.freg[3], sim.fcsr) != want:
+                bad.append((hex(a), hex(b)))
+        check(f"{name} bits and fflags match FPU over {len(pairs)} pairs", [], bad[:3])
+
+    conv = [0, 1, -1, 7, 0x7FFFFFFF, -0x80000000, 16777217, -16777219, 123456789]
+    got = []
+    for v in conv:
+        sim = RV32ISim([0xD00080D3, 0xC0009153, 0x0000006F])  # fcvt.s.w f1, x1; fcvt.w.s x2, f1, rtz
+        sim.reg[1] = v & 0xFFFFFFFF
+        sim.run()
+        got.append((sim.freg[1], sim.reg[2]))
+    want = [(struct.unpack("<I", struct.pack("<f", v))[0], int(struct.unpack("<f", struct.pack("<f", v))[0]))
+            for v in conv]
+    want = [(f, min(i, 0x7FFFFFFF) & 0xFFFFFFFF) for f, i in want]
+    check("fcvt.s.w / fcvt.w.s round trip", want, got)
+
+def main():
+    print("\n==============================")
+    print(" RUNNING CPU SIMULATOR TESTS ")
+    print("==============================")
+    test_prog_hex()
+    test_alu_prog()
+    test_engines_match()
+    test_self_modifying_code()
+    test_max_steps_exact()
+    test_memory()
+    test_mapped_images()
+    test_elf_loader()
+    test_batch_runner()
+    test_simt()
+    test_mmio_devices()
+    test_profiler()
+    test_trace_buffer()
+    test_checkpoint()
+    test_rv32m_against_mdu()
+    test_rv32f()
+    print("\n=== ALL TESTS COMPLETE ===\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# tracebuf.py
+# binary execution trace for RV32ISim. Every retired instruction is one
+# fixed-width record of five uint32 words:
+#   pc, instr, info (rd in bits 0-4 plus TR_* flags), value, mem addr
+# held in a preallocated array('I') ring. With a file, each time the ring
+# fills it is written out with one tofile() call; without one only the
+# last nrec records survive (what led up to a halt or a crash).
+# Run this module on a trace file to decode it to text or JSON lines.
+
+import sys
+import json
+import array
+import argparse
+
+MAGIC = b"RVTR"
+REC_WORDS = 5
+
+TR_RD    = 0x100  # value is the new contents of rd
+TR_LOAD  = 0x200  # addr is the load address
+TR_STORE = 0x400  # addr is the store address, value the data stored
+
+class TraceBuffer:
+    def __init__(self, path=None, nrec=65536):
+        self.buf = array.array("I", bytes(4 * REC_WORDS * nrec))
+        self.pos = 0        # next word to fill
+        self.written = 0    # words of the ring already in the file
+        self.wrapped = False
+        self.f = None
+        if path is not None:
+            self.f = open(path, "wb")
+            self.f.write(MAGIC + REC_WORDS.to_bytes(4, "little"))
+
+    def record(self, pc, instr, info, value, addr):
+        buf = self.buf
+        p = self.pos
+        buf[p] = pc
+        buf[p + 1] = instr
+        buf[p + 2] = info
+        buf[p + 3] = value
+        buf[p + 4] = addr
+        p += REC_WORDS
+        if p == len(buf):
+            self.flush(p)
+            self.written = p = 0
+            self.wrapped = True
+        self.pos = p
+
+    def flush(self, end=None):
+        # write out whatever of the ring the file has not seen yet
+        end = self.pos if end is None else end
+        if self.f is not None and end > self.written:
+            _tofile(self.buf[self.written:end], self.f)
+            self.f.flush()
+        self.written = end
+
+    def close(self):
+        self.flush()
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def last(self, n=None):
+        # the newest n records still in the ring, oldest first
+        p = self.pos
+        words = self.buf[p:] + self.buf[:p] if self.wrapped else self.buf[:p]
+        recs = _records(words)
+        return recs if n is None else recs[max(0, len(recs) - n):]
+
+def _tofile(words, f):
+    if sys.byteorder != "little":
+        words = array.array("I", words)
+        words.byteswap()
+    words.tofile(f)
+
+def _records(words):
+    return [tuple(words[i:i + REC_WORDS]) for i in range(0, len(words) - REC_WORDS + 1, REC_WORDS)]
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if len(head) < 8 or head[:4] != MAGIC:
+            raise ValueError(f"{path}: not a trace file")
+        if int.from_bytes(head[4:], "little") != REC_WORDS:
+            raise ValueError(f"{path}: unsupported record size")
+        data = f.read()
+    words = array.array("I")
+    words.frombytes(data[:len(data) - len(data) % 4])
+    if sys.byteorder != "little":
+        words.byteswap()
+    return _records(words)
+
+def format_text(rec):
+    # imported here: riv32 imports this module for TraceBuffer
+    from riv32 import disasm
+    pc, instr, info, value, addr = rec
+    s = f"0x{pc:08X}  {instr:08X}  {disasm(instr):<24}"
+    if info & TR_RD:
+        s += f"  x{info & 0x1F}=0x{value:08X}"
+    if info & TR_LOAD:
+        s += f"  load [0x{addr:08X}]"
+    if info & TR_STORE:
+        s += f"  store [0x{addr:08X}] <- 0x{value:08X}"
+    return s.rstrip()
+
+def as_dict(rec):
+    pc, instr, info, value, addr = rec
+    d = {"pc": pc, "instr": instr}
+    if info & TR_RD:
+        d["rd"] = info & 0x1F
+        d["value"] = value
+    if info & TR_LOAD:
+        d["load"] = addr
+    if info & TR_STORE:
+        d["store"] = addr
+        d["value"] = value
+    return d
+
+def main():
+    ap = argparse.ArgumentParser(description="Decode an RV32ISim binary trace")
+    ap.add_argument("trace", help="file written with riv32.py --trace-file")
+    ap.add_argument("--json", action="store_true", help="one JSON object per line")
+    ap.add_argument("--last", type=int, default=None, help="only the last N records")
+    args = ap.parse_args()
+    recs = read_trace(args.trace)
+    if args.last is not None:
+        recs = recs[max(0, len(recs) - args.last):]
+    for rec in recs:
+        sys.stdout.write((json.dumps(as_dict(rec)) if args.json else format_text(rec)) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from bitsfunc import leftpad
+from bitvector import BitVector
  
 def adder_full (a, b, Cin):
     s = (a ^ b) ^ Cin
@@ -45,3 +46,180 @@ def flagadder(rs1, rs2, res, out):
     v = 1 if (s1 == s2 and sres != s1) else 0
     
     return (n, z, c, v)
+
+
+# other adder engines. All take the same arguments as addripple and give
+# the same (sum bits, carry out); the prefix adders and native work
+# word-parallel on ints, the way the hardware computes every bit at once.
+
+ENGINES = ("ripple", "cla", "kogge_stone", "brent_kung", "native")
+ENGINE = "ripple"  # what adder() uses when no engine is given
+
+def set_engine(name):
+    global ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Bad adder engine: {name}")
+    ENGINE = name
+
+def _to_int(b):
+    if isinstance(b, BitVector):
+        return b.value
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+def _from_int(v, width, like):
+    if isinstance(like, BitVector):
+        return BitVector(v, width)
+    return [(v >> i) & 1 for i in range(width - 1, -1, -1)]
+
+def addcla(a_bits, b_bits, cin=0, width=None):
+    # 4-bit carry-lookahead blocks, group carry rippled between blocks
+    if width is None:
+        width = max(len(a_bits), len(b_bits))
+    aL = leftpad(list(a_bits), width)[::-1]
+    bL = leftpad(list(b_bits), width)[::-1]
+    outL = []
+    c = cin
+    for i in range(0, width, 4):
+        g = [x & y for x, y in zip(aL[i:i + 4], bL[i:i + 4])]
+        p = [x ^ y for x, y in zip(aL[i:i + 4], bL[i:i + 4])]
+        # c[k+1] = g[k] | p[k]g[k-1] | ... | p[k]..p[0]c, all from the block inputs
+        carries = [c]
+        for k in range(len(g)):
+            ck = g[k]
+            run = p[k]
+            for j in range(k - 1, -1, -1):
+                ck |= run & g[j]
+                run &= p[j]
+            ck |= run & c
+            carries.append(ck)
+        outL += [pk ^ ck for pk, ck in zip(p, carries)]
+        c = carries[-1]
+    out = outL[::-1]
+    return (BitVector.from_bits(out) if isinstance(a_bits, BitVector) else out), c
+
+def _ks_levels(width):
+    d, levels = 1, []
+    while d < width:
+        levels.append(d)
+        d <<= 1
+    return levels
+
+_bk_cache = {}
+
+def _bk_masks(width):
+    # (distance, mask of nodes) for the up-sweep then the down-sweep
+    if width not in _bk_cache:
+        up, down = [], []
+        d = 1
+        while d < width:
+            m = 0
+            for i in range(width):
+                if (i + 1) % (2 * d) == 0:
+                    m |= 1 << i
+            if m:
+                up.append((d, m))
+            d <<= 1
+        d >>= 1
+        while d >= 1:
+            m = 0
+            for i in range(width):
+                if (i + 1) % (2 * d) == d and i + 1 > d:
+                    m |= 1 << i
+            if m:
+                down.append((d, m))
+            d >>= 1
+        _bk_cache[width] = (up, down)
+    return _bk_cache[width]
+
+def _prefix_add(a_bits, b_bits, cin, width, brent_kung):
+    if width is None:
+        width = max(len(a_bits), len(b_bits))
+    mask = (1 << width) - 1
+    a, b = _to_int(a_bits) & mask, _to_int(b_bits) & mask
+    p0 = a ^ b
+    g = (a & b) | (p0 & cin)  # fold cin into bit 0's generate
+    p = p0
+    if brent_kung:
+        up, down = _bk_masks(width)
+        for d, m in up:
+            g |= p & (g << d) & m
+            p &= (p << d) | ~m
+        for d, m in down:
+            g |= p & (g << d) & m
+    else:
+        for d in _ks_levels(width):
+            g |= p & (g << d)
+            p &= (p << d) | ((1 << d) - 1)
+        g &= mask
+    s = p0 ^ (((g << 1) | cin) & mask)
+    return _from_int(s, width, a_bits), (g >> (width - 1)) & 1
+
+def addkogge(a_bits, b_bits, cin=0, width=None):
+    return _prefix_add(a_bits, b_bits, cin, width, brent_kung=False)
+
+def addbrent(a_bits, b_bits, cin=0, width=None):
+    return _prefix_add(a_bits, b_bits, cin, width, brent_kung=True)
+
+def addnative(a_bits, b_bits, cin=0, width=None):
+    if width is None:
+        width = max(len(a_bits), len(b_bits))
+    s = _to_int(a_bits) + _to_int(b_bits) + cin
+    return _from_int(s, width, a_bits), (s >> width) & 1
+
+_ADDERS = {"ripple": addripple, "cla": addcla, "kogge_stone": addkogge,
+           "brent_kung": addbrent, "native": addnative}
+
+def adder(a_bits, b_bits, cin=0, width=None, engine=None):
+    return _ADDERS[engine or ENGINE](a_bits, b_bits, cin=cin, width=width)
+
+def adder_cost(engine, width=32):
+    # modelled 2-input gate depth and gate count (and/or/xor) of a
+    # width-bit add with carry in; the CLA carry terms are counted as
+    # one and-or level per 4-bit block, like the textbook 74x182 block
+    if engine == "ripple":
+        # p = a^b, c' = ab | p.c, s = p^c: two levels per bit on the carry chain
+        return {"depth": 2 * width + 1, "ops": 5 * width}
+    if engine == "cla":
+        ops, blocks = 3 * width, 0
+        for i in range(0, width, 4):
+            k = min(4, width - i)
+            ops += sum(2 * j + 1 for j in range(1, k + 1))
+            blocks += 1
+        return {"depth": 2 * blocks + 2, "ops": ops}
+    if engine == "kogge_stone":
+        levels = _ks_levels(width)
+        return {"depth": 2 * len(levels) + 2, "ops": 3 * width + sum(3 * (width - d) for d in levels)}
+    if engine == "brent_kung":
+        up, down = _bk_masks(width)
+        nodes = sum(bin(m).count("1") for _, m in up + down)
+        return {"depth": 2 * (len(up) + len(down)) + 2, "ops": 3 * width + 3 * nodes}
+    if engine == "native":
+        return {"depth": None, "ops": None}  # one Python int add
+    raise ValueError(f"Bad adder engine: {engine}")
+
+def adder_report(width=32, n=2000, seed=0):
+    # per engine: modelled depth/ops and measured adds per second
+    import time
+    import random
+    rnd = random.Random(seed)
+    pairs = [(_from_int(rnd.getrandbits(width), width, None), _from_int(rnd.getrandbits(width), width, None))
+             for _ in range(n)]
+    rows = []
+    for name in ENGINES:
+        f = _ADDERS[name]
+        t = time.perf_counter()
+        for a, b in pairs:
+            f(a, b, 0, width)
+        dt = time.perf_counter() - t
+        row = {"engine": name, "width": width}
+        row.update(adder_cost(name, width))
+        row["adds_per_s"] = n / dt if dt > 0 else float("inf")
+        rows.append(row)
+    return rows
+
+if __name__ == "__main__":
+    for r in adder_report():
+        print(f"{r['engine']:<12} depth={r['depth']!s:<5} ops={r['ops']!s:<5} {r['adds_per_s']:>10.0f} adds/s")
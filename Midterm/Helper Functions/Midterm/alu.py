@@ -1,7 +1,8 @@
 import ieee754
 from bitsfunc import leftpad
-from adderfunc import addripple, twonegation
-from shifter_func import shiftleftl, shiftrightl, shiftrighta
+from adderfunc import adder
+from shifter_func import shift
+from bitvector import BitVector
 
 # alu.py
 # Integer ALU (RISC-V style)
@@ -17,6 +18,7 @@ def bits_to_uint(b):
 
 # convert bit list to hex string
 def bits_to_hex(b):
+    if isinstance(b, BitVector): return b.hex()
     b = leftpad(b, ((len(b)+3)//4)*4)
     out = ""
     HEX = "0123456789ABCDEF"
@@ -28,7 +30,7 @@ def bits_to_hex(b):
 def alu_add(a, b, width=WIDTH):
     a = leftpad(a, width)
     b = leftpad(b, width)
-    res, c = addripple(a, b, cin=0, width=width)
+    res, c = adder(a, b, cin=0, width=width)
     n = res[0]
     z = 1 if all(bit == 0 for bit in res) else 0
     s1, s2, sres = a[0], b[0], res[0]
@@ -38,8 +40,9 @@ def alu_add(a, b, width=WIDTH):
 def alu_sub(a, b, width=WIDTH):
     a = leftpad(a, width)
     b = leftpad(b, width)
-    bneg = twonegation(b)
-    res, c = addripple(a, bneg, cin=0, width=width)
+    # a + ~b + 1, so C is "no borrow" (1 when a >= b unsigned, b = 0 included)
+    binv = [1 - x for x in b]
+    res, c = adder(a, binv, cin=1, width=width)
     n = res[0]
     z = 1 if all(bit == 0 for bit in res) else 0
     s1, s2, sres = a[0], b[0], res[0]
@@ -72,21 +75,21 @@ def alu_xor(a, b, width=WIDTH):
 
 def alu_sll(a, shamt_bits, width=WIDTH):
     shamt = bits_to_uint(leftpad(shamt_bits, width)[-5:])
-    res = shiftleftl(leftpad(a, width), shamt)
+    res = shift("SLL", leftpad(a, width), shamt)
     n = res[0]
     z = 1 if all(bit == 0 for bit in res) else 0
     return res, (n, z, 0, 0)
 
 def alu_srl(a, shamt_bits, width=WIDTH):
     shamt = bits_to_uint(leftpad(shamt_bits, width)[-5:])
-    res = shiftrightl(leftpad(a, width), shamt)
+    res = shift("SRL", leftpad(a, width), shamt)
     n = res[0]
     z = 1 if all(bit == 0 for bit in res) else 0
     return res, (n, z, 0, 0)
 
 def alu_sra(a, shamt_bits, width=WIDTH):
     shamt = bits_to_uint(leftpad(shamt_bits, width)[-5:])
-    res = shiftrighta(leftpad(a, width), shamt)
+    res = shift("SRA", leftpad(a, width), shamt)
     n = res[0]
     z = 1 if all(bit == 0 for bit in res) else 0
     return res, (n, z, 0, 0)
@@ -100,14 +103,48 @@ def alu_slt(a, b, width=WIDTH):
 def alu_sltu(a, b, width=WIDTH):
     a = leftpad(a, width)
     b = leftpad(b, width)
-    _, c = addripple(a, twonegation(b), cin=0, width=width)
+    _, c = adder(a, [1 - x for x in b], cin=1, width=width)
     lt = 1 if c == 0 else 0
     out = [0]*(width-1) + [lt]
     return out, (out[0], 1 if lt == 0 else 0, 0, 0)
 
+# same results and flags as the functions above, on the ints inside two
+# BitVectors
+def alu_int(op, a, b, width=WIDTH):
+    mask = (1 << width) - 1
+    top = width - 1
+    a &= mask; b &= mask
+    c = v = 0
+    if op == "ADD" or op == "SUB" or op == "SLT" or op == "SLTU":
+        if op == "ADD":
+            t = a + b
+        else:
+            t = a + (~b & mask) + 1
+        c = t >> width
+        res = t & mask
+        s1, s2, sres = a >> top, b >> top, res >> top
+        if op == "ADD": v = 1 if (s1 == s2 and sres != s1) else 0
+        else: v = 1 if (s1 != s2 and sres != s1) else 0
+        if op == "SLT" or op == "SLTU":
+            lt = (sres ^ v) if op == "SLT" else 1 - c
+            return lt, (lt >> top, 1 if lt == 0 else 0, 0, 0)
+    elif op == "AND": res = a & b
+    elif op == "OR": res = a | b
+    elif op == "XOR": res = a ^ b
+    elif op == "SLL": res = (a << (b & 0x1F)) & mask
+    elif op == "SRL": res = a >> (b & 0x1F)
+    elif op == "SRA":
+        sh = b & 0x1F
+        res = ((a - (1 << width) if a >> top else a) >> sh) & mask
+    else: raise ValueError(f"Bad ALU op: {op}")
+    return res, (res >> top, 1 if res == 0 else 0, c, v)
+
 def alu(op, rs1, rs2, width=WIDTH):
     op = op.upper()
-    if op == "ADD": res, f = alu_add(rs1, rs2, width)
+    if isinstance(rs1, BitVector) and isinstance(rs2, BitVector):
+        r, f = alu_int(op, rs1.value, rs2.value, width)
+        res = BitVector(r, width)
+    elif op == "ADD": res, f = alu_add(rs1, rs2, width)
     elif op == "SUB": res, f = alu_sub(rs1, rs2, width)
     elif op == "AND": res, f = alu_and(rs1, rs2, width)
     elif op == "OR": res, f = alu_or(rs1, rs2, width)
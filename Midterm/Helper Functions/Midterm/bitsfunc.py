@@ -1,6 +1,8 @@
 # bits.py
 # functions for manipulating bit lists
 
+from bitvector import BitVector
+
 def zbits(n):
     return [0] * n
 
@@ -14,6 +16,8 @@ def trim_msb(b):
     return b[i:]
 
 def leftpad(b, n):
+    if isinstance(b, BitVector):
+        return b.leftpad(n)
     if len(b) >= n:
         return b
     return [0] * (n - len(b)) + b
@@ -0,0 +1,103 @@
+# bitvector.py
+# fixed-width bit vector stored as one int. Reads like the bit lists used
+# everywhere else (index 0 is the MSB, slicing, + to concatenate, len,
+# iteration, == against a list) so it can be handed to code written for
+# lists, but ops on it never allocate one element per bit.
+
+class BitVector:
+    __slots__ = ("value", "width")
+
+    def __init__(self, value=0, width=32):
+        self.width = width
+        self.value = value & ((1 << width) - 1)
+
+    @classmethod
+    def from_bits(cls, bits):
+        if isinstance(bits, BitVector):
+            return bits
+        v = 0
+        for x in bits:
+            v = (v << 1) | x
+        return cls(v, len(bits))
+
+    @classmethod
+    def from_hex(cls, h, width=32):
+        h = h.strip().lower()
+        if h.startswith("0x"): h = h[2:]
+        return cls(int(h or "0", 16), width)
+
+    def to_list(self):
+        v, w = self.value, self.width
+        return [(v >> i) & 1 for i in range(w - 1, -1, -1)]
+
+    def hex(self):
+        return "0x" + format(self.value, "0%dX" % ((self.width + 3) // 4))
+
+    def leftpad(self, n):
+        return self if self.width >= n else BitVector(self.value, n)
+
+    def signed(self):
+        return self.value - (1 << self.width) if self.value >> (self.width - 1) else self.value
+
+    # list protocol
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        v = self.value
+        for i in range(self.width - 1, -1, -1):
+            yield (v >> i) & 1
+
+    def __getitem__(self, i):
+        w = self.width
+        if isinstance(i, slice):
+            start, stop, step = i.indices(w)
+            if step != 1:
+                return BitVector.from_bits(self.to_list()[i])
+            n = max(0, stop - start)
+            return BitVector(self.value >> (w - start - n), n)
+        if i < 0: i += w
+        if not 0 <= i < w:
+            raise IndexError("BitVector index out of range")
+        return (self.value >> (w - 1 - i)) & 1
+
+    def __add__(self, other):
+        if not isinstance(other, BitVector):
+            if not isinstance(other, list):
+                return NotImplemented
+            other = BitVector.from_bits(other)
+        return BitVector((self.value << other.width) | other.value, self.width + other.width)
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return BitVector.from_bits(other) + self
+
+    def __eq__(self, other):
+        if isinstance(other, BitVector):
+            return self.width == other.width and self.value == other.value
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.value, self.width))
+
+    def __int__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"BitVector({self.hex()}, {self.width})"
+
+    # bitwise, width of the left operand
+    def __and__(self, other):
+        return BitVector(self.value & int(other), self.width)
+
+    def __or__(self, other):
+        return BitVector(self.value | int(other), self.width)
+
+    def __xor__(self, other):
+        return BitVector(self.value ^ int(other), self.width)
+
+    def __invert__(self):
+        return BitVector(~self.value, self.width)
@@ -3,6 +3,7 @@ from bitsfunc import leftpad
 from alu import alu
 from mdu import mdu
 from fpu import FPU
+from bitvector import BitVector
 
 # coreapi.py
 # thin API for ALU/MDU/FPU
@@ -16,6 +17,7 @@ def hex_to_bits(h, width=WIDTH):
     return [(n >> i) & 1 for i in range(width - 1, -1, -1)]
 
 def bits_to_hex(b):
+    if isinstance(b, BitVector): return b.hex()
     b = leftpad(b, ((len(b)+3)//4)*4)
     out = ""
     HEX = "0123456789ABCDEF"
@@ -25,25 +27,51 @@ def bits_to_hex(b):
     return "0x" + out
 
 def core_alu(op, x_hex, y_hex, width=WIDTH):
-    x = hex_to_bits(x_hex, width)
-    y = hex_to_bits(y_hex, width)
+    x = BitVector.from_hex(x_hex, width)
+    y = BitVector.from_hex(y_hex, width)
     r = alu(op, x, y, width)
     return {"hex": bits_to_hex(r["bits"]), "flags": r["flags"]}
 
 def core_mdu(op, x_hex, y_hex, width=WIDTH):
-    x = hex_to_bits(x_hex, width)
-    y = hex_to_bits(y_hex, width)
+    x = BitVector.from_hex(x_hex, width)
+    y = BitVector.from_hex(y_hex, width)
     r = mdu(op, x, y, width)
     return {"hex": bits_to_hex(r["bits"]), "flags": r["flags"]}
 
-def core_fpu(op, ax_hex, bx_hex):
+# batch forms over NumPy uint32 arrays: {"result": array, "flags": {"N": array, ...}}
+# numpy is only needed by these, so it is imported on first use
+def core_alu_batch(op, xs, ys):
+    from vecops import alu_batch
+    return alu_batch(op, xs, ys)
+
+def core_mdu_batch(op, xs, ys):
+    from vecops import mdu_batch
+    return mdu_batch(op, xs, ys)
+
+def core_fpu_batch(op, xs, ys):
+    # ADD|SUB|MUL on float32 bit patterns; flags as in FPU().flags
+    from vecops import fpu_batch
+    return fpu_batch(op, xs, ys)
+
+def core_fpu_fma_batch(op, xs, ys, zs):
+    # MADD|MSUB|NMADD|NMSUB, x*y +- z rounded once
+    from vecops import fma_batch
+    return fma_batch(op, xs, ys, zs)
+
+def core_fpu(op, ax_hex, bx_hex, cx_hex="0x00000000"):
     f = FPU()
     a = hex_to_bits(ax_hex, 32)
     b = hex_to_bits(bx_hex, 32)
+    c = hex_to_bits(cx_hex, 32)
     opu = op.upper()
-    if   opu == "ADD": out, flags = f.f32_add(a, b)
-    elif opu == "SUB": out, flags = f.f32_sub(a, b)
-    elif opu == "MUL": out, flags = f.f32_mul(a, b)
-    elif opu == "DIV": out, flags = f.f32_div(a, b)
-    else: raise ValueError("FPU op: ADD|SUB|MUL|DIV")
+    if   opu == "ADD": out, flags, _ = f.f32_add(a, b)
+    elif opu == "SUB": out, flags, _ = f.f32_sub(a, b)
+    elif opu == "MUL": out, flags, _ = f.f32_mul(a, b)
+    elif opu == "DIV": out, flags, _ = f.f32_div(a, b)
+    elif opu == "SQRT": out, flags, _ = f.f32_sqrt(a)
+    elif opu == "MADD": out, flags, _ = f.f32_fma(a, b, c)
+    elif opu == "MSUB": out, flags, _ = f.f32_fmsub(a, b, c)
+    elif opu == "NMADD": out, flags, _ = f.f32_fnmadd(a, b, c)
+    elif opu == "NMSUB": out, flags, _ = f.f32_fnmsub(a, b, c)
+    else: raise ValueError("FPU op: ADD|SUB|MUL|DIV|SQRT|MADD|MSUB|NMADD|NMSUB")
     return {"hex": bits_to_hex(out), "flags": flags}
@@ -0,0 +1,137 @@
+# divider.py
+# width-bit integer divider for the MDU, quotient and remainder together.
+#   restoring    : one trial subtract per quotient bit, undone if negative
+#   nonrestoring : add or subtract by the sign of the partial remainder,
+#                  one correction step at the end
+#   srt          : radix-4 SRT, quotient digits -2..2 picked from a table
+#                  on the top bits of the remainder and divisor
+#   native       : host divmod
+# divide() applies the RISC-V rules (x/0 = all ones with remainder x,
+# signed MIN/-1 = MIN with remainder 0) and returns both results, so a
+# DIV/REM pair needs one call (mdu.mdu_divrem).
+
+ENGINES = ("restoring", "nonrestoring", "srt", "native")
+ENGINE = "nonrestoring"  # what divide() uses when no engine is given
+
+def set_engine(name):
+    global ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Bad divider engine: {name}")
+    ENGINE = name
+
+def restoring(n, d, width, stats=None):
+    r = q = 0
+    for i in range(width - 1, -1, -1):
+        r = (r << 1) | ((n >> i) & 1)
+        t = r - d
+        if t >= 0:
+            r = t
+            q |= 1 << i
+    if stats is not None:
+        stats["steps"] = width
+        stats["addsubs"] = width
+    return q, r
+
+def nonrestoring(n, d, width, stats=None):
+    # a negative partial remainder is the restoring one minus d, so its
+    # sign is the quotient bit and the next step adds d back instead
+    r = q = 0
+    for i in range(width - 1, -1, -1):
+        r = (r << 1) + ((n >> i) & 1)
+        r = r - d if r >= 0 else r + d
+        if r >= 0:
+            q |= 1 << i
+    fix = r < 0
+    if fix:
+        r += d
+    if stats is not None:
+        stats["steps"] = width
+        stats["addsubs"] = width + fix
+    return q, r
+
+# radix-4 SRT selection table, built once: with d in [1/2, 1) and the
+# partial remainder kept in |w| <= 2/3 d, a digit q must leave
+# |4w - q*d| <= 2/3 d. The table is indexed by 4w truncated to 1/8 and by
+# d truncated to 1/16 (its top 4 bits), and holds a q that is safe over
+# the whole cell.
+SRT_W_FRAC = 3
+SRT_D_BITS = 4
+_SRT_YMIN = -24  # 4w >= -8/3 > -3
+
+def _srt_table():
+    from fractions import Fraction as Fr
+    table = {}
+    for di in range(1 << (SRT_D_BITS - 1), 1 << SRT_D_BITS):
+        dlo = Fr(di, 1 << SRT_D_BITS)
+        dhi = Fr(di + 1, 1 << SRT_D_BITS)
+        row = []
+        for y in range(_SRT_YMIN, -_SRT_YMIN):
+            wlo = Fr(y, 1 << SRT_W_FRAC)
+            whi = Fr(y + 1, 1 << SRT_W_FRAC)
+            pick = None
+            for q in (0, 1, -1, 2, -2):
+                # need (q - 2/3) d <= 4w <= (q + 2/3) d over the cell; the
+                # outer digits get their outer bound from |4w| <= 8/3 d
+                lo, hi = q - Fr(2, 3), q + Fr(2, 3)
+                if (q == -2 or wlo >= max(lo * dlo, lo * dhi)) and \
+                   (q == 2 or whi <= min(hi * dlo, hi * dhi)):
+                    pick = q
+                    break
+            row.append(pick)
+        table[di] = row
+    return table
+
+SRT_TABLE = _srt_table()
+
+def srt(n, d, width, stats=None):
+    frame = max(width, SRT_D_BITS)
+    s = frame - d.bit_length()
+    dn = d << s                  # leading 1 at bit frame-1, i.e. d in [1/2, 1)
+    m = (s + 3) // 2             # enough digits that n/d <= 2/3 * 4**m
+    dm = dn << (2 * m)
+    w = n << s
+    shift = frame + 2 * m - SRT_W_FRAC
+    row = SRT_TABLE[dn >> (frame - SRT_D_BITS)]
+    q = 0
+    for _ in range(m):
+        w <<= 2
+        digit = row[(w >> shift) - _SRT_YMIN]
+        w -= digit * dm
+        q = 4 * q + digit
+    # w = 4**m * (n << s) - q * dm, so the remainder is w >> 2m, scaled by 2**s
+    r = w >> (2 * m)
+    fix = r < 0
+    if fix:
+        q -= 1
+        r += dn
+    if stats is not None:
+        stats["steps"] = m
+        stats["addsubs"] = m + fix
+    return q, r >> s
+
+def native(n, d, width, stats=None):
+    if stats is not None:
+        stats["steps"] = 1
+        stats["addsubs"] = 0
+    return divmod(n, d)
+
+_DIVIDERS = {"restoring": restoring, "nonrestoring": nonrestoring, "srt": srt, "native": native}
+
+def divide(a, b, width, signed=False, engine=None, stats=None):
+    # (quotient, remainder) as width-bit unsigned ints
+    engine = engine or ENGINE
+    mask = (1 << width) - 1
+    a &= mask
+    b &= mask
+    if b == 0:
+        return mask, a
+    if signed:
+        neg_a = a >> (width - 1)
+        neg_b = b >> (width - 1)
+        ua = (-a) & mask if neg_a else a
+        ub = (-b) & mask if neg_b else b
+        # MIN / -1 needs no special case: |MIN| = 2**(width-1) divides to
+        # itself and negates back to MIN
+        q, r = _DIVIDERS[engine](ua, ub, width, stats)
+        return (-q) & mask if neg_a != neg_b else q, (-r) & mask if neg_a else r
+    return _DIVIDERS[engine](a, b, width, stats)
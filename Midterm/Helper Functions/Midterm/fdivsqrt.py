@@ -0,0 +1,179 @@
+from divider import srt
+
+# fdivsqrt.py
+# significand division and square root for the FPU, on ints.
+#   restoring   : one quotient/root bit per iteration
+#   srt         : divide: radix-4 SRT from divider.py (two bits per step);
+#                 sqrt: non-restoring recurrence, root digits +-1
+#   newton      : Newton-Raphson on the reciprocal (1/d or 1/sqrt(m)),
+#                 seeded from a lookup table, then one multiply
+#   goldschmidt : numerator and denominator (or root and half reciprocal
+#                 root) scaled together by the same factors, same seed
+# The iterative ones finish with a remainder check that nudges the
+# estimate by an ulp or two, so every algorithm returns the exact
+# truncated quotient/root and whether anything was left over.
+# stats gets the algorithm, its iteration count and the correction steps.
+
+ALGS = ("restoring", "srt", "newton", "goldschmidt")
+ALG = "srt"  # what the FPU uses when no algorithm is given
+
+SEED_BITS = 8   # table index bits
+SEED_PREC = 10  # bits stored per table entry
+P = 64          # fixed-point fraction bits for the iterations
+TARGET = 32     # iterate until the estimate is good to this many bits
+
+def set_alg(name):
+    global ALG
+    if name not in ALGS:
+        raise ValueError(f"Bad divide/sqrt algorithm: {name}")
+    ALG = name
+
+def _isqrt(n):
+    # integer sqrt by Newton on ints (math.isqrt without the import)
+    if n < 2:
+        return n
+    x = 1 << ((n.bit_length() + 1) // 2)
+    while True:
+        y = (x + n // x) >> 1
+        if y >= x:
+            return x
+        x = y
+
+# 1/d for d in [1, 2), entry t covers [1 + t/2**SEED_BITS, 1 + (t+1)/2**SEED_BITS)
+RECIP_SEED = [(1 << (SEED_PREC + SEED_BITS + 1)) // ((1 << (SEED_BITS + 1)) + 2 * t + 1)
+              for t in range(1 << SEED_BITS)]
+# 1/sqrt(m) for m in [1, 4), entry t covers [(2**(SEED_BITS-1) + t) / 2**(SEED_BITS-1), ...)
+RSQRT_SEED = [_isqrt((1 << (SEED_BITS + 2 * SEED_PREC)) // ((1 << SEED_BITS) + 2 * t + 1))
+              for t in range(3 << (SEED_BITS - 1))]
+
+def _iterations():
+    # the seed is good to about SEED_BITS bits and each step doubles that
+    n, prec = 0, SEED_BITS
+    while prec < TARGET:
+        prec *= 2
+        n += 1
+    return n
+
+def _fix_div(q, n, d, stats):
+    r = n - q * d
+    steps = 0
+    while r < 0:
+        q -= 1; r += d; steps += 1
+    while r >= d:
+        q += 1; r -= d; steps += 1
+    if stats is not None: stats["corrections"] = steps
+    return q, r != 0
+
+def _fix_sqrt(q, m, stats):
+    steps = 0
+    while q * q > m:
+        q -= 1; steps += 1
+    while (q + 1) * (q + 1) <= m:
+        q += 1; steps += 1
+    if stats is not None: stats["corrections"] = steps
+    return q, q * q != m
+
+def sig_div(n, d, alg=None, stats=None):
+    # (n // d, n % d != 0) for n, d > 0
+    alg = alg or ALG
+    if stats is not None: stats["alg"] = alg
+    if alg == "restoring":
+        # only the quotient bits cost a step; the top of n starts as the remainder
+        qb = max(n.bit_length() - d.bit_length() + 1, 0)
+        q, r = 0, n >> qb
+        for i in range(qb - 1, -1, -1):
+            r = (r << 1) | ((n >> i) & 1)
+            if r >= d:
+                r -= d
+                q |= 1 << i
+        if stats is not None:
+            stats["iterations"] = qb
+            stats["corrections"] = 0
+        return q, r != 0
+    if alg == "srt":
+        st = {} if stats is not None else None
+        q, r = srt(n, d, n.bit_length(), st)
+        if stats is not None:
+            stats["iterations"] = st["steps"]
+            stats["corrections"] = st["addsubs"] - st["steps"]
+        return q, r != 0
+    if alg not in ALGS:
+        raise ValueError(f"Bad divide/sqrt algorithm: {alg}")
+    # d as a P-bit fixed-point value in [1, 2)
+    k = d.bit_length() - 1
+    D = d << (P - k) if P >= k else d >> (k - P)
+    one = 1 << P
+    x = RECIP_SEED[(D - one) >> (P - SEED_BITS)] << (P - SEED_PREC)
+    iters = _iterations()
+    if alg == "newton":
+        for _ in range(iters):
+            x = (x * ((2 << P) - ((D * x) >> P))) >> P
+        q = (n * x) >> (P + k)
+    else:
+        num, den = x, (D * x) >> P  # n/d scaled by the seed: num/den with den ~ 1
+        for _ in range(iters):
+            f = (2 << P) - den
+            num = (num * f) >> P
+            den = (den * f) >> P
+        q = (n * num) >> (P + k)
+    if stats is not None: stats["iterations"] = iters
+    return _fix_div(q, n, d, stats)
+
+def sig_sqrt(m, alg=None, stats=None):
+    # (isqrt(m), m is not a perfect square) for m > 0
+    alg = alg or ALG
+    if stats is not None: stats["alg"] = alg
+    if alg == "restoring":
+        q = r = 0
+        steps = (m.bit_length() + 1) // 2
+        for i in range(steps - 1, -1, -1):
+            r = (r << 2) | ((m >> (2 * i)) & 3)
+            t = (q << 2) | 1
+            if r >= t:
+                r -= t
+                q = (q << 1) | 1
+            else:
+                q <<= 1
+        if stats is not None:
+            stats["iterations"] = steps
+            stats["corrections"] = 0
+        return q, r != 0
+    if alg == "srt":
+        # the remainder may go negative; the next step adds instead of
+        # subtracting, and its sign is the next root bit
+        q = r = 0
+        steps = (m.bit_length() + 1) // 2
+        for i in range(steps - 1, -1, -1):
+            r = (r << 2) | ((m >> (2 * i)) & 3)
+            r = r - ((q << 2) | 1) if r >= 0 else r + ((q << 2) | 3)
+            q = (q << 1) | (1 if r >= 0 else 0)
+        fix = r < 0
+        if fix:
+            r += (q << 1) | 1
+        if stats is not None:
+            stats["iterations"] = steps
+            stats["corrections"] = int(fix)
+        return q, r != 0
+    if alg not in ALGS:
+        raise ValueError(f"Bad divide/sqrt algorithm: {alg}")
+    # m = mr * 4**k with mr in [1, 4), as a P-bit fixed-point value
+    k = (m.bit_length() - 1) // 2
+    M = m << (P - 2 * k) if P >= 2 * k else m >> (2 * k - P)
+    y = RSQRT_SEED[(M >> (P - SEED_BITS + 1)) - (1 << (SEED_BITS - 1))] << (P - SEED_PREC)
+    iters = _iterations()
+    if alg == "newton":
+        # y <- y * (3 - m*y*y) / 2
+        for _ in range(iters):
+            t = (((M * y) >> P) * y) >> P
+            y = (y * ((3 << P) - t)) >> (P + 1)
+        q = (m * y) >> (P + k)
+    else:
+        # g -> sqrt(m), h -> 1/(2 sqrt(m)), both corrected by 1/2 - g*h
+        g, h = (M * y) >> P, y >> 1
+        for _ in range(iters):
+            r = (1 << (P - 1)) - ((g * h) >> P)
+            g += (g * r) >> P
+            h += (h * r) >> P
+        q = g >> (P - k)
+    if stats is not None: stats["iterations"] = iters
+    return _fix_sqrt(q, m, stats)
@@ -1,12 +1,81 @@
+import json
+from collections import namedtuple
 import ieee754  # prefer ieee754 pack/unpack
 from bitsfunc import leftpad
-from adderfunc import addripple
 from shifter_func import shiftleftl, shiftrightl
+from multiplier import multiply
+from bitvector import BitVector
+import fdivsqrt
 
 # fpu.py
 # float32: add/sub/mul via bit steps (RNE). returns (bits, flags, trace)
+# FPU(engine="int") runs the same pipeline on native ints. f32_div and
+# f32_sqrt work on ints in both engines; FPU(alg=...) picks the
+# fdivsqrt algorithm and self.stats holds its iteration count.
+# f32_fma and its negated forms keep the whole 48-bit product, add the
+# aligned addend to it and round once.
+#
+# The trace is off unless asked for: trace="full" records every op,
+# trace="sampled" one op in every N of this FPU instance's ops, so the
+# sample does not depend on other instances. Each pipeline step becomes a
+# TraceRecord(seq, op, state, data); an op returns its own records, and
+# only when FPU(log=...) is given are they also kept in that TraceLog,
+# which can be written out as JSON lines. Nothing is kept otherwise.
 
 BIAS = 127
+ENGINES = ("bits", "int")
+ENGINE = "bits"  # what FPU() uses when no engine is given
+
+TRACE_MODES = ("off", "full", "sampled")
+TRACE = "off"    # what FPU() uses when no trace mode is given
+TRACE_EVERY = 1  # sampled mode traces op numbers divisible by this
+
+TraceRecord = namedtuple("TraceRecord", "seq op state data")
+
+class TraceLog:
+    def __init__(self):
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def clear(self):
+        self.records = []
+
+    def to_jsonl(self, f):
+        # f: path or text file; bit lists are written as binary strings
+        if isinstance(f, str):
+            with open(f, "w") as fh:
+                return self.to_jsonl(fh)
+        for r in self.records:
+            d = {"seq": r.seq, "op": r.op, "state": r.state}
+            for k, v in r.data.items():
+                d[k] = "".join(map(str, v)) if isinstance(v, list) else v
+            f.write(json.dumps(d) + "\n")
+
+class _OpTrace:
+    __slots__ = ("seq", "op", "records")
+
+    def __init__(self, seq, op):
+        self.seq = seq
+        self.op = op
+        self.records = []
+
+    def step(self, state, **data):
+        self.records.append(TraceRecord(self.seq, self.op, state, data))
+
+_NO_TRACE = ()
+
+def set_trace(mode, every=1):
+    global TRACE, TRACE_EVERY
+    if mode not in TRACE_MODES:
+        raise ValueError(f"Bad trace mode: {mode}")
+    if every < 1:
+        raise ValueError(f"Bad trace sample interval: {every}")
+    TRACE, TRACE_EVERY = mode, every
 
 class Class:
     NAN="NaN"; INF="Inf"; ZERO="Zero"; SUB="Subnormal"; NORM="Normal"
@@ -38,14 +107,45 @@ def _classify(x):
     ev=_bits_to_uint(e)-BIAS
     return (Class.NORM,s,ev,[1]+f)
 
+def _shr_sticky_bits(bits, d):
+    # shift right by d, OR everything shifted out into the last bit
+    out = bits[:]
+    sticky = 0
+    for _ in range(min(d, len(bits))):
+        sticky |= out[-1]
+        out = [0]+out[:-1]
+    out[-1] |= sticky
+    return out
+
 def _int_to_exp(w):
     w = 0 if w<0 else (255 if w>255 else w)
     return _uint_to_bits(w,8)
 
 def _pack(sign, e_unb, sig_bits, flags):
-    # sig_bits: 24 kept + tail (optional)
+    # sig_bits: 24 kept + tail (optional), leading 1 at index 0
     sig = sig_bits[:]
     if len(sig)<24: sig += [0]*(24-len(sig))
+
+    eb = e_unb + BIAS
+
+    if eb <= 0:
+        # subnormal/zero path: shift right until the exponent is 1 (stored
+        # as 0), then round once; rounding up may carry into a normal
+        shift = 1 - eb
+        ext = [0]*shift + sig
+        top24 = ext[:24]
+        tail  = ext[24:]
+        g2 = tail[0] if len(tail)>=1 else 0
+        r2 = tail[1] if len(tail)>=2 else 0
+        s2 = 1 if any(tail[2:]) else 0
+        if any(tail): flags["inexact"]=True
+
+        inc2 = 1 if (g2==1 and (r2==1 or s2==1 or top24[-1]==1)) else 0
+        if inc2:
+            top24, _ = _add1(top24)
+        flags["underflow"]=True
+        return [sign]+_int_to_exp(top24[0])+top24[1:24]
+
     kept = sig[:24]
     rest = sig[24:]
 
@@ -59,53 +159,114 @@ def _pack(sign, e_unb, sig_bits, flags):
         kept, c = _add1(kept)
         if c:
             kept = [1]+kept[:-1]
-            e_unb += 1
+            eb += 1
         flags["inexact"]=True
 
-    eb = e_unb + BIAS
-
     if eb >= 255:
         flags["overflow"]=True; flags["inexact"]=True
         return [sign]+[1]*8 + [0]*23
 
-    if eb <= 0:
-        # subnormal/zero path
-        shift = 1 - eb
-        ext = kept + rest
-        if shift >= len(ext):
-            shifted=[0]*len(ext); sticky = 1 if any(ext) else 0
-        else:
-            shifted = ext[:len(ext)-shift]
-            dropped = ext[len(ext)-shift:]
-            sticky = 1 if any(dropped) else 0
-
-        top24 = shifted[:24] if len(shifted)>=24 else ([0]*(24-len(shifted))+shifted)
-        tail  = shifted[24:] if len(shifted)>24 else []
-        g2 = tail[0] if len(tail)>=1 else 0
-        r2 = tail[1] if len(tail)>=2 else 0
-        s2 = 1 if sticky or any(tail[2:]) else 0
-
-        inc2 = 1 if (g2==1 and (r2==1 or s2==1 or top24[-1]==1)) else 0
-        if inc2:
-            top24, c2 = _add1(top24)
-            if c2:
-                eb = 1
-                frac = top24[1:24]
-                flags["inexact"]=True
-                return [sign]+_int_to_exp(eb)+frac
-            flags["inexact"]=True
-
-        flags["underflow"]=True
-        frac = top24[1:24]
-        return [sign]+[0]*8 + frac
-
     exp_bits = _int_to_exp(eb)
     frac = kept[1:24]
     return [sign]+exp_bits+frac
 
+# int engine helpers: patterns are uint32, significands plain ints
+
+NAN_BITS = 0x7FC00000
+
+def _as_uint(x):
+    if isinstance(x, int): return x & 0xFFFFFFFF
+    if isinstance(x, BitVector): return x.value & 0xFFFFFFFF
+    return _bits_to_uint(x) & 0xFFFFFFFF
+
+def _unpack_int(x):
+    # same (class, sign, exponent, significand) as ieee754.f32_unpack
+    s = x >> 31
+    e = (x >> 23) & 0xFF
+    f = x & 0x7FFFFF
+    if e == 0xFF: return (Class.NAN if f else Class.INF), s, 0, 1 << 23
+    if e == 0: return (Class.SUB if f else Class.ZERO), s, -126, f
+    return Class.NORM, s, e - BIAS, f | (1 << 23)
+
+def _normalize_sub(m, e):
+    # subnormal significand -> leading 1 at bit 23, exponent lowered to match
+    if m >> 23:
+        return m, e
+    sh = 24 - m.bit_length()
+    return m << sh, e - sh
+
+def _shr_sticky(m, d):
+    # shift right by d, OR everything shifted out into the last bit
+    if d >= m.bit_length():
+        return 1 if m else 0
+    return (m >> d) | (1 if m & ((1 << d) - 1) else 0)
+
+def _rne_int(sig, n):
+    kept = sig >> n
+    rest = sig & ((1 << n) - 1)
+    half = 1 << (n - 1)
+    if rest > half or (rest == half and kept & 1):
+        kept += 1
+    return kept, rest != 0
+
+def _pack_int(sign, e_unb, sig, width, flags):
+    # sig: width bits with the leading 1 at the top, worth 2**e_unb
+    sign <<= 31
+    eb = e_unb + BIAS
+    if eb <= 0:
+        # a carry into bit 23 lands in the exponent field as 1
+        kept, nx = _rne_int(sig, width - 24 + 1 - eb)
+        flags["underflow"] = True
+        if nx: flags["inexact"] = True
+        return sign | kept
+    kept, nx = _rne_int(sig, width - 24)
+    if nx: flags["inexact"] = True
+    if kept >> 24:
+        kept >>= 1
+        eb += 1
+    if eb >= 255:
+        flags["overflow"] = True; flags["inexact"] = True
+        return sign | 0x7F800000
+    return sign | (eb << 23) | (kept & 0x7FFFFF)
+
 class FPU:
-    def __init__(self):
-        self.flags = {"inexact":False,"overflow":False,"underflow":False,"invalid":False}
+    def __init__(self, engine=None, trace=None, every=None, log=None, alg=None):
+        self.engine = engine or ENGINE
+        if self.engine not in ENGINES:
+            raise ValueError(f"Bad FPU engine: {self.engine}")
+        self.alg = alg or fdivsqrt.ALG
+        if self.alg not in fdivsqrt.ALGS:
+            raise ValueError(f"Bad divide/sqrt algorithm: {self.alg}")
+        self.stats = {}
+        if trace is None: trace = TRACE
+        elif trace is True: trace = "full"
+        elif trace is False: trace = "off"
+        if trace not in TRACE_MODES:
+            raise ValueError(f"Bad trace mode: {trace}")
+        self.trace = trace
+        self.every = TRACE_EVERY if every is None else every
+        if self.every < 1:
+            raise ValueError(f"Bad trace sample interval: {self.every}")
+        self.seq = 0  # ops issued while tracing, numbers the records
+        self.log = log
+        self.flags = {"inexact":False,"overflow":False,"underflow":False,"invalid":False,"divbyzero":False}
+
+    # None when this op is not traced, so the steps cost one test each
+    def _trace(self, op):
+        if self.trace == "off":
+            return None
+        seq = self.seq
+        self.seq = seq + 1
+        if self.trace == "sampled" and seq % self.every:
+            return None
+        return _OpTrace(seq, op)
+
+    def _done(self, tr):
+        if tr is None:
+            return _NO_TRACE
+        if self.log is not None:
+            self.log.records.extend(tr.records)
+        return tr.records
 
     # unpack using ieee754 helpers if present
     def _unpack(self, x):
@@ -115,66 +276,64 @@ class FPU:
             return _classify(x)
 
     def _reset(self):
-        self.flags = {"inexact":False,"overflow":False,"underflow":False,"invalid":False}
+        self.flags = {"inexact":False,"overflow":False,"underflow":False,"invalid":False,"divbyzero":False}
 
     # add/sub (op = +1 for add, -1 for sub)
     def _addsub(self, a, b, sub=False):
-        tr=[]
+        tr = self._trace("SUB" if sub else "ADD")
         ca, sa, ea, ma = self._unpack(a)
         cb, sb, eb, mb = self._unpack(b)
-        tr.append({"state":"CLASS", "ca":ca, "cb":cb})
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb)
 
         # NaNs
         if ca==Class.NAN or cb==Class.NAN:
             self.flags["invalid"]=True
-            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, tr)
+            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, self._done(tr))
 
         # inf cases
         if ca==Class.INF and cb==Class.INF and (sa != (sb^sub)):
             self.flags["invalid"]=True
-            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, tr)
-        if ca==Class.INF: return ([sa]+[1]*8+[0]*23, self.flags, tr)
-        if cb==Class.INF: return ([(sb^sub)]+[1]*8+[0]*23, self.flags, tr)
+            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, self._done(tr))
+        if ca==Class.INF: return ([sa]+[1]*8+[0]*23, self.flags, self._done(tr))
+        if cb==Class.INF: return ([(sb^sub)]+[1]*8+[0]*23, self.flags, self._done(tr))
 
         # zeros/subnormals handled by align below; build aligned mantissas
-        # extend mantissas with 2-bit tail for guard/round
-        ia = _bits_to_uint(ma)
-        ib = _bits_to_uint(mb)
+        # extend mantissas with a 3-bit tail for guard/round/sticky
 
         # align exponents (right shift smaller mantissa)
         if ea > eb:
             d = ea - eb
-            tr.append({"state":"ALIGN","shift_b":d})
+            if tr is not None: tr.step("ALIGN", shift_b=d)
             # shift b by d with sticky
-            b_ext = mb[:] + [0,0]
+            b_ext = mb[:] + [0,0,0]
             sticky = 0
             for _ in range(d):
                 sticky |= b_ext[-1]
                 b_ext = [0]+b_ext[:-1]
             b_ext[-1] |= sticky
             mb_al = b_ext
-            ma_al = ma[:] + [0,0]
+            ma_al = ma[:] + [0,0,0]
             E = ea
         elif eb > ea:
             d = eb - ea
-            tr.append({"state":"ALIGN","shift_a":d})
-            a_ext = ma[:] + [0,0]
+            if tr is not None: tr.step("ALIGN", shift_a=d)
+            a_ext = ma[:] + [0,0,0]
             sticky = 0
             for _ in range(d):
                 sticky |= a_ext[-1]
                 a_ext = [0]+a_ext[:-1]
             a_ext[-1] |= sticky
             ma_al = a_ext
-            mb_al = mb[:] + [0,0]
+            mb_al = mb[:] + [0,0,0]
             E = eb
         else:
-            ma_al = ma[:] + [0,0]
-            mb_al = mb[:] + [0,0]
+            ma_al = ma[:] + [0,0,0]
+            mb_al = mb[:] + [0,0,0]
             E = ea
 
         # add or subtract mantissas
         sb_eff = sb ^ (1 if sub else 0)
-        tr.append({"state":"OP", "sa":sa, "sb":sb_eff})
+        if tr is not None: tr.step("OP", sa=sa, sb=sb_eff)
         ia = _bits_to_uint(ma_al); ib = _bits_to_uint(mb_al)
         if sa == sb_eff:
             # same sign -> add
@@ -190,105 +349,374 @@ class FPU:
                 sgn = sb_eff
             sum_bits = _uint_to_bits(diff, len(ma_al)+1)
 
-        tr.append({"state":"SUM", "sig":sum_bits[:28]})
+        if tr is not None: tr.step("SUM", sig=sum_bits[:28])
 
-        # normalize
+        # normalize: sum_bits[0] is worth 2, sum_bits[1] is worth 1
         # case: carry at top
         if sum_bits[0]==1:
-            # shift right 1, exponent++
-            gr = sum_bits[-2:]
-            kept24 = sum_bits[:-1]
+            # binary point moves left one, exponent++
             E += 1
-            sig_for_pack = kept24 + gr
+            sig_for_pack = sum_bits
         else:
             # shift left until leading 1 at index 0 (or zero)
             k = 0
             while k < len(sum_bits) and sum_bits[k]==0:
                 k += 1
             if k == len(sum_bits):
-                # zero
-                return ([sgn]+[0]*8+[0]*23, self.flags, tr)
+                # zero: x + (-x) is +0 under round-to-nearest
+                sgn = sa if sa == sb_eff else 0
+                return ([sgn]+[0]*8+[0]*23, self.flags, self._done(tr))
             # left shift by k
             shifted = sum_bits[k:] + [0]*k
-            E -= k
-            gr = [0,0]
-            kept24 = shifted[:24]
-            tail = shifted[24:26]
-            if len(tail)>=2: gr = tail[:2]
-            elif len(tail)==1: gr=[tail[0],0]
-            sig_for_pack = kept24 + gr
-
-        tr.append({"state":"NORM", "E":E, "kept":sig_for_pack[:24], "gr":sig_for_pack[24:]})
+            E -= k - 1
+            sig_for_pack = shifted
+
+        if tr is not None: tr.step("NORM", E=E, kept=sig_for_pack[:24], gr=sig_for_pack[24:])
         out = _pack(sgn, E, sig_for_pack, self.flags)
-        tr.append({"state":"PACK"})
-        return (out, self.flags, tr)
+        if tr is not None: tr.step("PACK")
+        return (out, self.flags, self._done(tr))
 
     def f32_add(self, a_bits, b_bits):
         self._reset()
-        return self._addsub(leftpad(a_bits,32), leftpad(b_bits,32), sub=False)
+        if self.engine == "int": return self._addsub_int(a_bits, b_bits, 0)
+        return self._addsub(leftpad(list(a_bits),32), leftpad(list(b_bits),32), sub=False)
 
     def f32_sub(self, a_bits, b_bits):
         self._reset()
-        return self._addsub(leftpad(a_bits,32), leftpad(b_bits,32), sub=True)
+        if self.engine == "int": return self._addsub_int(a_bits, b_bits, 1)
+        return self._addsub(leftpad(list(a_bits),32), leftpad(list(b_bits),32), sub=True)
 
     def f32_mul(self, a_bits, b_bits):
         self._reset()
-        tr=[]
-        ca, sa, ea, ma = self._unpack(leftpad(a_bits,32))
-        cb, sb, eb, mb = self._unpack(leftpad(b_bits,32))
-        tr.append({"state":"CLASS","ca":ca,"cb":cb})
+        if self.engine == "int": return self._mul_int(a_bits, b_bits)
+        tr = self._trace("MUL")
+        ca, sa, ea, ma = self._unpack(leftpad(list(a_bits),32))
+        cb, sb, eb, mb = self._unpack(leftpad(list(b_bits),32))
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb)
 
         # NaNs
         if ca==Class.NAN or cb==Class.NAN:
             self.flags["invalid"]=True
-            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, tr)
+            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, self._done(tr))
         # 0 * inf
-        if (ca in (Class.ZERO,Class.SUB) and cb==Class.INF) or (cb in (Class.ZERO,Class.SUB) and ca==Class.INF):
+        if (ca==Class.ZERO and cb==Class.INF) or (cb==Class.ZERO and ca==Class.INF):
             self.flags["invalid"]=True
-            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, tr)
+            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, self._done(tr))
         # propagate inf
         if ca==Class.INF or cb==Class.INF:
             s = sa ^ sb
-            return ([s]+[1]*8+[0]*23, self.flags, tr)
+            return ([s]+[1]*8+[0]*23, self.flags, self._done(tr))
         # zero shortcut
-        if ca in (Class.ZERO,Class.SUB) or cb in (Class.ZERO,Class.SUB):
+        if ca==Class.ZERO or cb==Class.ZERO:
             s = sa ^ sb
-            return ([s]+[0]*8+[0]*23, self.flags, tr)
+            return ([s]+[0]*8+[0]*23, self.flags, self._done(tr))
 
         s = sa ^ sb
         E = ea + eb
-        # 24x24 -> 48 via shift-add on bits (simple loop)
-        a24 = ma[:]   # [1] + frac
-        b24 = mb[:]
-        prod = [0]*48
-
-        # shift-add: for i from LSB of b24, add (a24 << (47-(i_pos)))
-        # we implement via integer-ish accumulation on bit arrays using addripple
-        for i in range(23,-1,-1):
-            if b24[i]==1:
-                # align a24 into 48
-                shift = 23 - i
-                left = a24 + [0]*shift
-                left = ([0]*(48-len(left))) + left
-                # add into prod
-                res, _ = addripple(prod, left, cin=0, width=48)
-                prod = res
-
-        tr.append({"state":"MUL48","sig48":prod[:28]})
-        # normalize: product in [1,4)
-        if prod[0]==1:
-            # >=2 -> shift right 1
-            gr = prod[-2:]
-            kept24 = prod[:24]
-            E += 1
-            sig_for_pack = kept24 + gr
-        else:
-            # already ~1.x
-            kept24 = prod[1:25]
-            gr = prod[25:27]
-            sig_for_pack = kept24 + (gr if len(gr)==2 else [0,0])
-
-        tr.append({"state":"NORM","E":E,"kept":sig_for_pack[:24],"gr":sig_for_pack[24:]})
+        # 24x24 -> 48 on the shared multiplier (Booth + carry-save by default)
+        st = {} if tr is not None else None
+        prod = _uint_to_bits(multiply(_bits_to_uint(ma), _bits_to_uint(mb), 24, stats=st), 48)
+
+        if tr is not None: tr.step("MUL48", sig48=prod[:28], mul=st)
+        # normalize: prod[0] is worth 2, prod[1] is worth 1; subnormal
+        # operands leave the leading 1 further down
+        k = 0
+        while prod[k]==0:
+            k += 1
+        E += 1 - k
+        sig_for_pack = prod[k:] + [0]*k
+
+        if tr is not None: tr.step("NORM", E=E, kept=sig_for_pack[:24], gr=sig_for_pack[24:])
         out = _pack(s, E, sig_for_pack, self.flags)
-        tr.append({"state":"PACK"})
-        return (out, self.flags, tr)
+        if tr is not None: tr.step("PACK")
+        return (out, self.flags, self._done(tr))
+
+    # int engine: one shift for alignment, bit_length for normalising
+    def _addsub_int(self, a_bits, b_bits, sub):
+        tr = self._trace("SUB" if sub else "ADD")
+        ca, sa, ea, ma = _unpack_int(_as_uint(a_bits))
+        cb, sb, eb, mb = _unpack_int(_as_uint(b_bits))
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb)
+        sb ^= sub
+        if ca==Class.NAN or cb==Class.NAN or (ca==Class.INF and cb==Class.INF and sa != sb):
+            self.flags["invalid"]=True
+            return (_uint_to_bits(NAN_BITS, 32), self.flags, self._done(tr))
+        if ca==Class.INF: return (_uint_to_bits((sa << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+        if cb==Class.INF: return (_uint_to_bits((sb << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+
+        # 3-bit guard/round/sticky tail
+        ma <<= 3; mb <<= 3
+        E = max(ea, eb)
+        if ea > eb:
+            if tr is not None: tr.step("ALIGN", shift_b=ea - eb)
+            mb = _shr_sticky(mb, ea - eb)
+        elif eb > ea:
+            if tr is not None: tr.step("ALIGN", shift_a=eb - ea)
+            ma = _shr_sticky(ma, eb - ea)
+        if tr is not None: tr.step("OP", sa=sa, sb=sb)
+        if sa == sb: m, sgn = ma + mb, sa
+        elif ma >= mb: m, sgn = ma - mb, sa
+        else: m, sgn = mb - ma, sb
+        if tr is not None: tr.step("SUM", sig=_uint_to_bits(m, 28))
+        if m == 0:
+            # x + (-x) is +0 under round-to-nearest
+            return (_uint_to_bits((sa if sa == sb else 0) << 31, 32), self.flags, self._done(tr))
+
+        # 28-bit sum, bit 27 worth 2: put the leading 1 there
+        k = 28 - m.bit_length()
+        E += 1 - k
+        m <<= k
+        if tr is not None:
+            sig = _uint_to_bits(m, 28)
+            tr.step("NORM", E=E, kept=sig[:24], gr=sig[24:])
+        out = _pack_int(sgn, E, m, 28, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (_uint_to_bits(out, 32), self.flags, self._done(tr))
+
+    def _mul_int(self, a_bits, b_bits):
+        tr = self._trace("MUL")
+        ca, sa, ea, ma = _unpack_int(_as_uint(a_bits))
+        cb, sb, eb, mb = _unpack_int(_as_uint(b_bits))
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb)
+        s = sa ^ sb
+        if ca==Class.NAN or cb==Class.NAN or \
+           (ca==Class.ZERO and cb==Class.INF) or (cb==Class.ZERO and ca==Class.INF):
+            self.flags["invalid"]=True
+            return (_uint_to_bits(NAN_BITS, 32), self.flags, self._done(tr))
+        if ca==Class.INF or cb==Class.INF:
+            return (_uint_to_bits((s << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+        if ca==Class.ZERO or cb==Class.ZERO:
+            return (_uint_to_bits(s << 31, 32), self.flags, self._done(tr))
+
+        st = {} if tr is not None else None
+        p = multiply(ma, mb, 24, engine="native", stats=st)
+        if tr is not None: tr.step("MUL48", sig48=_uint_to_bits(p, 48)[:28], mul=st)
+        k = 48 - p.bit_length()
+        E = ea + eb + 1 - k
+        p <<= k
+        if tr is not None:
+            sig = _uint_to_bits(p, 48)
+            tr.step("NORM", E=E, kept=sig[:24], gr=sig[24:])
+        out = _pack_int(s, E, p, 48, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (_uint_to_bits(out, 32), self.flags, self._done(tr))
+
+    # fused multiply-add (RISC-V FMADD/FMSUB/FNMADD/FNMSUB)
+    def f32_fma(self, a_bits, b_bits, c_bits):
+        return self._fused(a_bits, b_bits, c_bits, 0, 0, "FMADD")
+
+    def f32_fmsub(self, a_bits, b_bits, c_bits):
+        return self._fused(a_bits, b_bits, c_bits, 0, 1, "FMSUB")
+
+    def f32_fnmadd(self, a_bits, b_bits, c_bits):
+        return self._fused(a_bits, b_bits, c_bits, 1, 1, "FNMADD")
+
+    def f32_fnmsub(self, a_bits, b_bits, c_bits):
+        return self._fused(a_bits, b_bits, c_bits, 1, 0, "FNMSUB")
+
+    def _fused(self, a_bits, b_bits, c_bits, neg_p, neg_c, name):
+        self._reset()
+        if self.engine == "int": return self._fma_int(a_bits, b_bits, c_bits, neg_p, neg_c, name)
+        return self._fma(leftpad(list(a_bits),32), leftpad(list(b_bits),32), leftpad(list(c_bits),32),
+                         neg_p, neg_c, name)
+
+    # (-1)**neg_p * a*b + (-1)**neg_c * c with a single rounding
+    def _fma(self, a, b, c, neg_p, neg_c, name):
+        tr = self._trace(name)
+        ca, sa, ea, ma = self._unpack(a)
+        cb, sb, eb, mb = self._unpack(b)
+        cc, sc, ec, mc = self._unpack(c)
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb, cc=cc)
+        sp = sa ^ sb ^ neg_p
+        sc ^= neg_c
+        p_inf = ca==Class.INF or cb==Class.INF
+        if ca==Class.NAN or cb==Class.NAN or cc==Class.NAN or \
+           (ca==Class.ZERO and cb==Class.INF) or (cb==Class.ZERO and ca==Class.INF) or \
+           (p_inf and cc==Class.INF and sp != sc):
+            self.flags["invalid"]=True
+            return ([0,1,1,1,1,1,1,1,1]+[1]+[0]*22, self.flags, self._done(tr))
+        if p_inf: return ([sp]+[1]*8+[0]*23, self.flags, self._done(tr))
+        if cc==Class.INF: return ([sc]+[1]*8+[0]*23, self.flags, self._done(tr))
+        if ca==Class.ZERO or cb==Class.ZERO:
+            # exact: c itself, or a zero that is -0 only if both parts are
+            if cc==Class.ZERO: return ([sp & sc]+[0]*31, self.flags, self._done(tr))
+            # a subnormal c is still a tiny result, as in f32_add
+            if cc==Class.SUB: self.flags["underflow"]=True
+            return ([sc]+c[1:], self.flags, self._done(tr))
+
+        st = {} if tr is not None else None
+        prod = _uint_to_bits(multiply(_bits_to_uint(ma), _bits_to_uint(mb), 24, stats=st), 48)
+        if tr is not None: tr.step("MUL48", sig48=prod[:28], mul=st)
+
+        # product and addend as 48-bit significands, leading 1 at index 0
+        # and worth 2**Ep / 2**Ec, each with a 3-bit guard/round/sticky tail
+        k = 0
+        while prod[k]==0:
+            k += 1
+        Ep = ea + eb + 1 - k
+        p_ext = prod[k:] + [0]*k + [0,0,0]
+        if cc==Class.ZERO:
+            c_ext = [0]*51
+            Ec = Ep
+        else:
+            k = 0
+            while mc[k]==0:
+                k += 1
+            Ec = ec - k
+            c_ext = mc[k:] + [0]*(24+k) + [0,0,0]
+
+        # align to the larger one; when they are 2+ places apart the sum
+        # loses at most one leading bit, so the sticky tail is enough
+        E = max(Ep, Ec)
+        if Ep > Ec:
+            if tr is not None: tr.step("ALIGN", shift_c=Ep - Ec)
+            c_ext = _shr_sticky_bits(c_ext, Ep - Ec)
+        elif Ec > Ep:
+            if tr is not None: tr.step("ALIGN", shift_p=Ec - Ep)
+            p_ext = _shr_sticky_bits(p_ext, Ec - Ep)
+
+        if tr is not None: tr.step("OP", sp=sp, sc=sc)
+        ip = _bits_to_uint(p_ext); ic = _bits_to_uint(c_ext)
+        if sp == sc: m, sgn = ip + ic, sp
+        elif ip >= ic: m, sgn = ip - ic, sp
+        else: m, sgn = ic - ip, sc
+        sum_bits = _uint_to_bits(m, 52)
+        if tr is not None: tr.step("SUM", sig=sum_bits)
+
+        # sum_bits[0] is worth 2**(E+1)
+        k = 0
+        while k < 52 and sum_bits[k]==0:
+            k += 1
+        if k == 52:
+            # exact cancellation is +0 under round-to-nearest
+            return ([0]*32, self.flags, self._done(tr))
+        E += 1 - k
+        sig_for_pack = sum_bits[k:] + [0]*k
+
+        if tr is not None: tr.step("NORM", E=E, kept=sig_for_pack[:24], gr=sig_for_pack[24:])
+        out = _pack(sgn, E, sig_for_pack, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (out, self.flags, self._done(tr))
+
+    def _fma_int(self, a_bits, b_bits, c_bits, neg_p, neg_c, name):
+        tr = self._trace(name)
+        ca, sa, ea, ma = _unpack_int(_as_uint(a_bits))
+        cb, sb, eb, mb = _unpack_int(_as_uint(b_bits))
+        cc, sc, ec, mc = _unpack_int(_as_uint(c_bits))
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb, cc=cc)
+        sp = sa ^ sb ^ neg_p
+        sc ^= neg_c
+        p_inf = ca==Class.INF or cb==Class.INF
+        if ca==Class.NAN or cb==Class.NAN or cc==Class.NAN or \
+           (ca==Class.ZERO and cb==Class.INF) or (cb==Class.ZERO and ca==Class.INF) or \
+           (p_inf and cc==Class.INF and sp != sc):
+            self.flags["invalid"]=True
+            return (_uint_to_bits(NAN_BITS, 32), self.flags, self._done(tr))
+        if p_inf: return (_uint_to_bits((sp << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+        if cc==Class.INF: return (_uint_to_bits((sc << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+        if ca==Class.ZERO or cb==Class.ZERO:
+            if cc==Class.ZERO: return (_uint_to_bits((sp & sc) << 31, 32), self.flags, self._done(tr))
+            if cc==Class.SUB: self.flags["underflow"]=True
+            return (_uint_to_bits((sc << 31) | (_as_uint(c_bits) & 0x7FFFFFFF), 32), self.flags, self._done(tr))
+
+        st = {} if tr is not None else None
+        p = multiply(ma, mb, 24, engine="native", stats=st)
+        if tr is not None: tr.step("MUL48", sig48=_uint_to_bits(p, 48)[:28], mul=st)
+        k = 48 - p.bit_length()
+        Ep = ea + eb + 1 - k
+        p <<= k + 3
+        if cc==Class.ZERO:
+            Ec = Ep
+        else:
+            k = 48 - mc.bit_length()
+            Ec = ec + 24 - k
+            mc <<= k + 3
+
+        E = max(Ep, Ec)
+        if Ep > Ec:
+            if tr is not None: tr.step("ALIGN", shift_c=Ep - Ec)
+            mc = _shr_sticky(mc, Ep - Ec)
+        elif Ec > Ep:
+            if tr is not None: tr.step("ALIGN", shift_p=Ec - Ep)
+            p = _shr_sticky(p, Ec - Ep)
+        if tr is not None: tr.step("OP", sp=sp, sc=sc)
+        if sp == sc: m, sgn = p + mc, sp
+        elif p >= mc: m, sgn = p - mc, sp
+        else: m, sgn = mc - p, sc
+        if tr is not None: tr.step("SUM", sig=_uint_to_bits(m, 52))
+        if m == 0:
+            return (_uint_to_bits(0, 32), self.flags, self._done(tr))
+
+        k = 52 - m.bit_length()
+        E += 1 - k
+        m <<= k
+        if tr is not None:
+            sig = _uint_to_bits(m, 52)
+            tr.step("NORM", E=E, kept=sig[:24], gr=sig[24:])
+        out = _pack_int(sgn, E, m, 52, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (_uint_to_bits(out, 32), self.flags, self._done(tr))
+
+    def f32_div(self, a_bits, b_bits):
+        self._reset()
+        tr = self._trace("DIV")
+        ca, sa, ea, ma = _unpack_int(_as_uint(a_bits))
+        cb, sb, eb, mb = _unpack_int(_as_uint(b_bits))
+        if tr is not None: tr.step("CLASS", ca=ca, cb=cb)
+        s = sa ^ sb
+        if ca==Class.NAN or cb==Class.NAN or (ca==Class.INF and cb==Class.INF) or \
+           (ca==Class.ZERO and cb==Class.ZERO):
+            self.flags["invalid"]=True
+            return (_uint_to_bits(NAN_BITS, 32), self.flags, self._done(tr))
+        if ca==Class.INF or cb==Class.ZERO:
+            if cb==Class.ZERO: self.flags["divbyzero"]=True
+            return (_uint_to_bits((s << 31) | 0x7F800000, 32), self.flags, self._done(tr))
+        if ca==Class.ZERO or cb==Class.INF:
+            return (_uint_to_bits(s << 31, 32), self.flags, self._done(tr))
+
+        ma, ea = _normalize_sub(ma, ea)
+        mb, eb = _normalize_sub(mb, eb)
+        # 27-bit quotient (leading 1 at bit 25 or 26) plus a sticky bit
+        self.stats = {}
+        q, rest = fdivsqrt.sig_div(ma << 26, mb, self.alg, self.stats)
+        if tr is not None: tr.step("DIV", **self.stats)
+        sig = (q << 1) | rest
+        L = sig.bit_length()
+        E = ea - eb - 27 + L - 1
+        if tr is not None:
+            bits = _uint_to_bits(sig, L)
+            tr.step("NORM", E=E, kept=bits[:24], gr=bits[24:])
+        out = _pack_int(s, E, sig, L, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (_uint_to_bits(out, 32), self.flags, self._done(tr))
+
+    def f32_sqrt(self, a_bits, b_bits=None):
+        # b_bits is ignored, so sqrt fits the two-operand call shape
+        self._reset()
+        tr = self._trace("SQRT")
+        ca, sa, ea, ma = _unpack_int(_as_uint(a_bits))
+        if tr is not None: tr.step("CLASS", ca=ca)
+        if ca==Class.NAN or (sa and ca!=Class.ZERO):
+            self.flags["invalid"]=True
+            return (_uint_to_bits(NAN_BITS, 32), self.flags, self._done(tr))
+        if ca==Class.ZERO:
+            return (_uint_to_bits(sa << 31, 32), self.flags, self._done(tr))
+        if ca==Class.INF:
+            return (_uint_to_bits(0x7F800000, 32), self.flags, self._done(tr))
+
+        ma, ea = _normalize_sub(ma, ea)
+        # x = ma * 2**(ea-23); shift ma so the exponent left over is even
+        # and the root has 26+ bits
+        S = 27 if (ea - 23 - 27) % 2 == 0 else 28
+        self.stats = {}
+        q, rest = fdivsqrt.sig_sqrt(ma << S, self.alg, self.stats)
+        if tr is not None: tr.step("SQRT", **self.stats)
+        sig = (q << 1) | rest
+        L = sig.bit_length()
+        E = (ea - 23 - S) // 2 - 1 + L - 1
+        if tr is not None:
+            bits = _uint_to_bits(sig, L)
+            tr.step("NORM", E=E, kept=bits[:24], gr=bits[24:])
+        out = _pack_int(0, E, sig, L, self.flags)
+        if tr is not None: tr.step("PACK")
+        return (_uint_to_bits(out, 32), self.flags, self._done(tr))
@@ -5,7 +5,7 @@ def main():
     print("Type EXIT at any time to quit.")
 
     while True:
-        op = input("Operation (ADD, SUB, MUL, DIV, AND, OR, XOR, SLL, SRL, SRA, SLT, SLTU, DIVU, REM, REMU, FADD, FSUB, FMUL, FDIV): ").strip()
+        op = input("Operation (ADD, SUB, MUL, DIV, AND, OR, XOR, SLL, SRL, SRA, SLT, SLTU, DIVU, REM, REMU, FADD, FSUB, FMUL, FDIV, FSQRT, FMADD, FMSUB, FNMADD, FNMSUB): ").strip()
         if op.upper() == "EXIT":
             break
 
@@ -17,15 +17,20 @@ def main():
             break
 
         opu = op.upper()
+        z = "0x00000000"
+        if opu in ["FMADD","FMSUB","FNMADD","FNMSUB"]:
+            z = input("rs3 (hex): ").strip()
+            if z.upper() == "EXIT":
+                break
 
         try:
             if opu in ["ADD","SUB","AND","OR","XOR","SLL","SRL","SRA","SLT","SLTU"]:
                 out = core_alu(opu, x, y)
             elif opu in ["MUL","DIV","DIVU","REM","REMU"]:
                 out = core_mdu(opu, x, y)
-            elif opu in ["FADD","FSUB","FMUL","FDIV"]:
+            elif opu in ["FADD","FSUB","FMUL","FDIV","FSQRT","FMADD","FMSUB","FNMADD","FNMSUB"]:
                 # Map to core_fpu without the leading 'F'
-                out = core_fpu(opu[1:], x, y)
+                out = core_fpu(opu[1:], x, y, z)
             else:
                 print("Invalid op")
                 continue
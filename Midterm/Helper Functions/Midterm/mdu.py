@@ -1,6 +1,8 @@
 from bitsfunc import leftpad
 from adderfunc import addripple
-from twos import decode_twos_complement, encode_twos_complement
+from bitvector import BitVector
+from multiplier import multiply
+from divider import divide
 
 # mdu.py
 # Multiplier/Divider Unit (RISC-V style)
@@ -16,6 +18,7 @@ def bits_to_uint(b):
 
 def bits_to_hex(b):
     """Convert bit list to hex string"""
+    if isinstance(b, BitVector): return b.hex()
     b = leftpad(b, ((len(b)+3)//4)*4)
     out = ""
     HEX = "0123456789ABCDEF"
@@ -26,19 +29,13 @@ def bits_to_hex(b):
 
 def bits_to_signed(b, width=WIDTH):
     """Convert bit list to signed int"""
-    b_padded = leftpad(b, width)
-    return decode_twos_complement(b_padded)["value"]
+    val = bits_to_uint(leftpad(b, width))
+    return val - (1 << width) if val >> (width - 1) else val
 
 def signed_to_bits(val, width=WIDTH):
     """Convert signed int to bit list"""
-    enc = encode_twos_complement(val)
-    hex_str = enc["hex"][2:]  # Remove '0x'
-    bits = []
-    for ch in hex_str:
-        nib = int(ch, 16)
-        for i in range(3, -1, -1):
-            bits.append((nib >> i) & 1)
-    return bits[:width]
+    val &= (1 << width) - 1
+    return [(val >> i) & 1 for i in range(width - 1, -1, -1)]
 
 def mdu_mul(a, b, width=WIDTH):
     """Multiply two numbers (32-bit x 32-bit -> 32-bit lower half)"""
@@ -46,84 +43,107 @@ def mdu_mul(a, b, width=WIDTH):
     b = leftpad(b, width)
     a_val = bits_to_uint(a)
     b_val = bits_to_uint(b)
-    result = (a_val * b_val) & ((1 << width) - 1)  # Keep lower 32 bits
+    result = multiply(a_val, b_val, width) & ((1 << width) - 1)  # Keep lower 32 bits
     res_bits = [(result >> i) & 1 for i in range(width - 1, -1, -1)]
     z = 1 if result == 0 else 0
     return res_bits, (0, z, 0, 0)
 
-def mdu_div(a, b, width=WIDTH):
-    """Divide two signed numbers (signed division)"""
+def mdu_mulh(a, b, width=WIDTH):
+    """Multiply two signed numbers (upper half of the 2*width-bit product)"""
     a = leftpad(a, width)
     b = leftpad(b, width)
-    a_signed = bits_to_signed(a, width)
-    b_signed = bits_to_signed(b, width)
-    
-    if b_signed == 0:
-        # Division by zero: return all 1s for signed divide
-        res_bits = [1] * width
-        return res_bits, (1, 0, 0, 1)
-    
-    result = abs(a_signed) // abs(b_signed)
-    if (a_signed < 0) != (b_signed < 0):
-        result = -result
-    
-    res_bits = signed_to_bits(result, width)
+    result = multiply(bits_to_uint(a), bits_to_uint(b), width, signed_a=True, signed_b=True) >> width
+    res_bits = [(result >> i) & 1 for i in range(width - 1, -1, -1)]
     z = 1 if result == 0 else 0
     return res_bits, (0, z, 0, 0)
 
-def mdu_divu(a, b, width=WIDTH):
-    """Divide two unsigned numbers"""
+def mdu_mulhsu(a, b, width=WIDTH):
+    """Multiply signed a by unsigned b (upper half)"""
     a = leftpad(a, width)
     b = leftpad(b, width)
-    a_val = bits_to_uint(a)
-    b_val = bits_to_uint(b)
-    
-    if b_val == 0:
-        # Division by zero: return all 1s
-        res_bits = [1] * width
-        return res_bits, (1, 0, 0, 1)
-    
-    result = a_val // b_val
+    result = multiply(bits_to_uint(a), bits_to_uint(b), width, signed_a=True) >> width
     res_bits = [(result >> i) & 1 for i in range(width - 1, -1, -1)]
     z = 1 if result == 0 else 0
     return res_bits, (0, z, 0, 0)
 
-def mdu_rem(a, b, width=WIDTH):
-    """Remainder of signed division"""
+def mdu_mulhu(a, b, width=WIDTH):
+    """Multiply two unsigned numbers (upper half)"""
     a = leftpad(a, width)
     b = leftpad(b, width)
-    a_signed = bits_to_signed(a, width)
-    b_signed = bits_to_signed(b, width)
-    
-    if b_signed == 0:
-        # Division by zero: return dividend
-        return a, (1, 0, 0, 1)
-    
-    result = a_signed % b_signed
-    res_bits = signed_to_bits(result, width)
+    result = multiply(bits_to_uint(a), bits_to_uint(b), width) >> width
+    res_bits = [(result >> i) & 1 for i in range(width - 1, -1, -1)]
     z = 1 if result == 0 else 0
     return res_bits, (0, z, 0, 0)
 
+def _divrem_out(res, b, width):
+    res_bits = [(res >> i) & 1 for i in range(width - 1, -1, -1)]
+    if b == 0:
+        # Division by zero: all 1s for DIV/DIVU, the dividend for REM/REMU
+        return res_bits, (1, 0, 0, 1)
+    z = 1 if res == 0 else 0
+    return res_bits, (0, z, 0, 0)
+
+def _mdu_divrem(a, b, width, signed, want_rem):
+    a = bits_to_uint(leftpad(a, width))
+    b = bits_to_uint(leftpad(b, width))
+    q, r = divide(a, b, width, signed)
+    return _divrem_out(r if want_rem else q, b, width)
+
+def mdu_divrem(rs1, rs2, signed=True, width=WIDTH):
+    """DIV and REM (DIVU and REMU if not signed) of the same operands from one division"""
+    a = bits_to_uint(leftpad(rs1, width))
+    b = bits_to_uint(leftpad(rs2, width))
+    out = []
+    for res in divide(a, b, width, signed):
+        res_bits, (n, z, c, v) = _divrem_out(res, b, width)
+        out.append({"bits": res_bits, "hex": bits_to_hex(res_bits), "flags": {"N": n, "Z": z, "C": c, "V": v}})
+    return tuple(out)
+
+def mdu_div(a, b, width=WIDTH):
+    """Divide two signed numbers (signed division)"""
+    return _mdu_divrem(a, b, width, True, False)
+
+def mdu_divu(a, b, width=WIDTH):
+    """Divide two unsigned numbers"""
+    return _mdu_divrem(a, b, width, False, False)
+
+def mdu_rem(a, b, width=WIDTH):
+    """Remainder of signed division (sign follows the dividend)"""
+    return _mdu_divrem(a, b, width, True, True)
+
 def mdu_remu(a, b, width=WIDTH):
     """Remainder of unsigned division"""
-    a = leftpad(a, width)
-    b = leftpad(b, width)
-    a_val = bits_to_uint(a)
-    b_val = bits_to_uint(b)
-    
-    if b_val == 0:
-        # Division by zero: return dividend
-        return a, (1, 0, 0, 1)
-    
-    result = a_val % b_val
-    res_bits = [(result >> i) & 1 for i in range(width - 1, -1, -1)]
-    z = 1 if result == 0 else 0
-    return res_bits, (0, z, 0, 0)
+    return _mdu_divrem(a, b, width, False, True)
+
+def mdu_int(op, a, b, width=WIDTH):
+    """Same results and flags as the mdu_* functions, on ints"""
+    mask = (1 << width) - 1
+    a &= mask; b &= mask
+    sa = a - (1 << width) if a >> (width - 1) else a
+    sb = b - (1 << width) if b >> (width - 1) else b
+    if op == "MUL": r = a * b
+    elif op == "MULH": r = (sa * sb) >> width
+    elif op == "MULHSU": r = (sa * b) >> width
+    elif op == "MULHU": r = (a * b) >> width
+    elif op in ("DIV", "DIVU", "REM", "REMU"):
+        if b == 0:
+            return (mask if op in ("DIV", "DIVU") else a), (1, 0, 0, 1)
+        q, rem = divide(a, b, width, op in ("DIV", "REM"), engine="native")
+        r = q if op in ("DIV", "DIVU") else rem
+    else: raise ValueError(f"Bad MDU op: {op}")
+    r &= mask
+    return r, (0, 1 if r == 0 else 0, 0, 0)
 
 def mdu(op, rs1, rs2, width=WIDTH):
     """Main MDU dispatcher"""
     op = op.upper()
-    if op == "MUL": res, f = mdu_mul(rs1, rs2, width)
+    if isinstance(rs1, BitVector) and isinstance(rs2, BitVector):
+        r, f = mdu_int(op, rs1.value, rs2.value, width)
+        res = BitVector(r, width)
+    elif op == "MUL": res, f = mdu_mul(rs1, rs2, width)
+    elif op == "MULH": res, f = mdu_mulh(rs1, rs2, width)
+    elif op == "MULHSU": res, f = mdu_mulhsu(rs1, rs2, width)
+    elif op == "MULHU": res, f = mdu_mulhu(rs1, rs2, width)
     elif op == "DIV": res, f = mdu_div(rs1, rs2, width)
     elif op == "DIVU": res, f = mdu_divu(rs1, rs2, width)
     elif op == "REM": res, f = mdu_rem(rs1, rs2, width)
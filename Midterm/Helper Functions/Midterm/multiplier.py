@@ -0,0 +1,165 @@
+from adderfunc import adder
+from bitvector import BitVector
+
+# multiplier.py
+# width x width -> 2*width multiplier shared by the MDU and the FPU.
+#   shift_add : one full add per set multiplier bit (the original FPU loop)
+#   wallace   : radix-4 Booth partial products, 3:2 carry-save rows on ints
+#   dadda     : radix-4 Booth partial products, Dadda column reduction on bits
+#   native    : host int multiply
+# The Booth engines finish with one fast (prefix) add of the last two rows.
+# multiply() returns the product modulo 2**(2*width); pass stats={} to get
+# the partial-product count, reduction stages and adder cells used.
+
+ENGINES = ("shift_add", "wallace", "dadda", "native")
+ENGINE = "wallace"  # what multiply() uses when no engine is given
+FINAL_ADDER = "kogge_stone"
+
+def set_engine(name):
+    global ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Bad multiplier engine: {name}")
+    ENGINE = name
+
+def _bits(v, w):
+    return [(v >> i) & 1 for i in range(w - 1, -1, -1)]
+
+def _uint(b):
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+def booth_digits(b, width, signed=False):
+    # radix-4 Booth recoding of the multiplier, LSB digit first; each digit
+    # is in -2..2 and looks at bits (2j+1, 2j, 2j-1). An unsigned multiplier
+    # gets one more digit so its top bit reads as positive.
+    n = width + (0 if signed else 2)
+    n += n & 1
+    if signed and b >> (width - 1) & 1:
+        b |= ((1 << n) - 1) ^ ((1 << width) - 1)  # sign-extend to n bits
+    digits = []
+    prev = 0
+    for j in range(0, n, 2):
+        b0 = (b >> j) & 1
+        b1 = (b >> (j + 1)) & 1
+        digits.append(-2 * b1 + b0 + prev)
+        prev = b1
+    return digits
+
+def booth_partials(a, b, width, signed_a=False, signed_b=False):
+    # one row per Booth digit, already shifted, as 2*width-bit words
+    mask = (1 << (2 * width)) - 1
+    if signed_a and a >> (width - 1) & 1:
+        a -= 1 << width
+    return [((d * a) << (2 * j)) & mask for j, d in enumerate(booth_digits(b, width, signed_b))]
+
+def _csa(x, y, z, mask):
+    # one row of full adders: three words in, sum and carry words out
+    return x ^ y ^ z, (((x & y) | (x & z) | (y & z)) << 1) & mask
+
+def wallace_reduce(rows, width2, stats=None):
+    mask = (1 << width2) - 1
+    stages = cells = 0
+    while len(rows) > 2:
+        nxt = []
+        for i in range(0, len(rows) - 2, 3):
+            s, c = _csa(rows[i], rows[i + 1], rows[i + 2], mask)
+            nxt += [s, c]
+            cells += width2
+        nxt += rows[len(rows) - len(rows) % 3:]
+        rows = nxt
+        stages += 1
+    if stats is not None:
+        stats["stages"] = stages
+        stats["full_adders"] = cells
+        stats["half_adders"] = 0
+    return rows + [0] * (2 - len(rows))
+
+def _dadda_heights(h):
+    d = [2]
+    while d[-1] < h:
+        d.append(d[-1] * 3 // 2)
+    return d[-2::-1] if len(d) > 1 else []
+
+def dadda_reduce(rows, width2, stats=None):
+    # column heights are brought down to 13, 9, 6, 4, 3, 2 with as few
+    # full/half adders as each stage allows
+    cols = [[] for _ in range(width2)]
+    for r in rows:
+        for i in range(width2):
+            cols[i].append(r >> i & 1)
+    fa = ha = 0
+    targets = _dadda_heights(max(len(c) for c in cols))
+    for d in targets:
+        for i in range(width2):
+            col = cols[i]
+            while len(col) > d:
+                if len(col) == d + 1:
+                    x, y = col.pop(), col.pop()
+                    col.insert(0, x ^ y)
+                    carry = x & y
+                    ha += 1
+                else:
+                    x, y, z = col.pop(), col.pop(), col.pop()
+                    col.insert(0, x ^ y ^ z)
+                    carry = (x & y) | (x & z) | (y & z)
+                    fa += 1
+                if i + 1 < width2:
+                    cols[i + 1].append(carry)
+    if stats is not None:
+        stats["stages"] = len(targets)
+        stats["full_adders"] = fa
+        stats["half_adders"] = ha
+    r0 = r1 = 0
+    for i, col in enumerate(cols):
+        if len(col) > 0: r0 |= col[0] << i
+        if len(col) > 1: r1 |= col[1] << i
+    return [r0, r1]
+
+def shift_add(a, b, width, stats=None):
+    # unsigned, one 2*width-bit add per set bit of b
+    w2 = 2 * width
+    prod = [0] * w2
+    a_bits = _bits(a, width)
+    adds = 0
+    for i in range(width):
+        if b >> i & 1:
+            left = [0] * (width - i) + a_bits + [0] * i
+            prod, _ = adder(prod, left, cin=0, width=w2)
+            adds += 1
+    if stats is not None:
+        stats["partial_products"] = adds
+        stats["stages"] = adds
+    return _uint(prod)
+
+def multiply(a, b, width, signed_a=False, signed_b=False, engine=None, stats=None):
+    engine = engine or ENGINE
+    w2 = 2 * width
+    mask = (1 << w2) - 1
+    a &= (1 << width) - 1
+    b &= (1 << width) - 1
+    if stats is not None:
+        stats["engine"] = engine
+    if engine == "native":
+        sa = a - (1 << width) if signed_a and a >> (width - 1) else a
+        sb = b - (1 << width) if signed_b and b >> (width - 1) else b
+        if stats is not None:
+            stats["partial_products"] = 1
+            stats["stages"] = 0
+        return (sa * sb) & mask
+    if engine == "shift_add":
+        p = shift_add(a, b, width, stats)
+        # a signed operand with its top bit set was read as x + 2**width
+        if signed_a and a >> (width - 1): p -= b << width
+        if signed_b and b >> (width - 1): p -= a << width
+        return p & mask
+    if engine not in ENGINES:
+        raise ValueError(f"Bad multiplier engine: {engine}")
+    rows = booth_partials(a, b, width, signed_a, signed_b)
+    if stats is not None:
+        stats["partial_products"] = len(rows)
+    reduce = wallace_reduce if engine == "wallace" else dadda_reduce
+    x, y = reduce(rows, w2, stats)
+    s, _ = adder(BitVector(x, w2), BitVector(y, w2), cin=0, width=w2, engine=FINAL_ADDER)
+    return s.value if isinstance(s, BitVector) else _uint(s)
@@ -19,3 +19,56 @@ def shiftrighta(bits, shamt):
     for _ in range(shamt):
         b = [sign] + b[:-1]
     return b
+
+# barrel shifter: one mux level per shamt bit (5 for 32-bit words),
+# level k moves everything by 2**k or passes it through
+def _barrel(bits, shamt, fill, left):
+    b = bits[:]
+    w = len(b)
+    k = 0
+    while shamt >> k:
+        if (shamt >> k) & 1:
+            d = min(1 << k, w)
+            b = b[d:] + [fill] * d if left else [fill] * d + b[:w - d]
+        k += 1
+    return b
+
+def barrelleftl(bits, shamt):
+    return _barrel(bits, shamt, 0, True)
+
+def barrelrightl(bits, shamt):
+    return _barrel(bits, shamt, 0, False)
+
+def barrelrighta(bits, shamt):
+    return _barrel(bits, shamt, bits[0] if len(bits) else 0, False)
+
+# direct fast path: one slice, one concatenation
+def sliceleftl(bits, shamt):
+    d = min(shamt, len(bits))
+    return bits[d:] + [0] * d
+
+def slicerightl(bits, shamt):
+    d = min(shamt, len(bits))
+    return [0] * d + bits[:len(bits) - d]
+
+def slicerighta(bits, shamt):
+    d = min(shamt, len(bits))
+    return [bits[0] if len(bits) else 0] * d + bits[:len(bits) - d]
+
+ENGINES = ("step", "barrel", "slice")
+ENGINE = "barrel"  # what shift() uses when no engine is given
+
+_SHIFTERS = {
+    "step":   {"SLL": shiftleftl, "SRL": shiftrightl, "SRA": shiftrighta},
+    "barrel": {"SLL": barrelleftl, "SRL": barrelrightl, "SRA": barrelrighta},
+    "slice":  {"SLL": sliceleftl, "SRL": slicerightl, "SRA": slicerighta},
+}
+
+def set_engine(name):
+    global ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Bad shifter engine: {name}")
+    ENGINE = name
+
+def shift(op, bits, shamt, engine=None):
+    return _SHIFTERS[engine or ENGINE][op](bits, shamt)
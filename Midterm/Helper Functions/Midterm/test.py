@@ -1,6 +1,16 @@
-from coreapi import core_alu, core_mdu, hex_to_bits, bits_to_hex
-from fpu import FPU
+from coreapi import core_alu, core_mdu, core_fpu, core_alu_batch, core_mdu_batch, core_fpu_batch, core_fpu_fma_batch, hex_to_bits, bits_to_hex
+from fpu import FPU, TraceLog
 from twos import encode_twos_complement, decode_twos_complement
+from bitvector import BitVector
+import alu, mdu
+import adderfunc
+import shifter_func
+import multiplier
+import divider
+import fdivsqrt
+import random
+import json
+from fractions import Fraction
 
 # Simple check helper
 def check(name, expected, got):
@@ -9,6 +19,21 @@ def check(name, expected, got):
     else:
         print(f"[FAIL] {name}: expected {expected}, got {got}")
 
+# float32 patterns every FPU test starts from: signed zeros and infinities,
+# a quiet and a signalling NaN, the extreme subnormals, the largest finite
+# value, +-1.0 and the smallest normal
+F32_SPECIALS = [0, 0x80000000, 0x7F800000, 0xFF800000, 0x7FC00000, 0x7F800001, 1, 0x807FFFFF,
+                0x7F7FFFFF, 0x3F800000, 0xBF800000, 0x00800000]
+
+# random float32 pattern; most of the time the biased exponent is drawn
+# from one of exp_ranges (default: near underflow and near overflow)
+def rand_f32(rnd, exp_ranges=((0, 24), (232, 255))):
+    x = rnd.getrandbits(32)
+    kind = rnd.randrange(len(exp_ranges) + 1)
+    if kind < len(exp_ranges):
+        x = (x & 0x807FFFFF) | (rnd.randrange(*exp_ranges[kind]) << 23)
+    return x
+
 def test_twos_complement():
     print("\n=== Testing Two's Complement (WIDTH=32) ===")
     # encode -> hex checks (32-bit fixed width)
@@ -36,6 +61,13 @@ def test_m_extension():
     check("REMU 10%3", "0x00000001", core_mdu("REMU", "0x0000000A", "0x00000003")["hex"])
     # Signed DIV negative case (implementation choice: two's-quotient in hex)
     check("DIV -10/3", "0xFFFFFFFD", core_mdu("DIV", "0xFFFFFFF6", "0x00000003")["hex"])
+    # REM takes the sign of the dividend
+    check("REM -10%3", "0xFFFFFFFF", core_mdu("REM", "0xFFFFFFF6", "0x00000003")["hex"])
+    check("REM 10%-3", "0x00000001", core_mdu("REM", "0x0000000A", "0xFFFFFFFD")["hex"])
+    # upper halves
+    check("MULH -1*-1", "0x00000000", core_mdu("MULH", "0xFFFFFFFF", "0xFFFFFFFF")["hex"])
+    check("MULHSU -1*0xFFFFFFFF", "0xFFFFFFFF", core_mdu("MULHSU", "0xFFFFFFFF", "0xFFFFFFFF")["hex"])
+    check("MULHU 0xFFFFFFFF^2", "0xFFFFFFFE", core_mdu("MULHU", "0xFFFFFFFF", "0xFFFFFFFF")["hex"])
 
 
 def test_float32():
@@ -49,6 +81,430 @@ def test_float32():
     bits, flags, trace = FPU().f32_mul(hex_to_bits("0x40400000", 32), hex_to_bits("0x40000000", 32))
     check("FMUL 3.0*2.0", "0x40C00000", bits_to_hex(bits))
 
+    # no carry out of the significand: 1.0 + 0.5 = 1.5, 3.0 - 1.0 = 2.0
+    bits, flags, trace = FPU().f32_add(hex_to_bits("0x3F800000", 32), hex_to_bits("0x3F000000", 32))
+    check("FADD 1.0+0.5", "0x3FC00000", bits_to_hex(bits))
+    bits, flags, trace = FPU().f32_sub(hex_to_bits("0x40400000", 32), hex_to_bits("0x3F800000", 32))
+    check("FSUB 3.0-1.0", "0x40000000", bits_to_hex(bits))
+
+    # subnormals: min subnormal doubled, and a product that rounds up from below
+    bits, flags, trace = FPU().f32_add(hex_to_bits("0x00000001", 32), hex_to_bits("0x00000001", 32))
+    check("FADD tiny+tiny", "0x00000002", bits_to_hex(bits))
+    bits, flags, trace = FPU().f32_mul(hex_to_bits("0x00400000", 32), hex_to_bits("0x40000000", 32))
+    check("FMUL subnormal*2.0", "0x00800000", bits_to_hex(bits))
+
+    # 1.0000001 * 1.0000001 rounds on the low product bits (inexact)
+    bits, flags, trace = FPU().f32_mul(hex_to_bits("0x3F800001", 32), hex_to_bits("0x3F800001", 32))
+    check("FMUL rounding", ("0x3F800002", True), (bits_to_hex(bits), flags["inexact"]))
+
+
+def test_bitvector():
+    print("\n=== Testing BitVector against the bit-list path ===")
+    v = BitVector.from_hex("0x8000000F", 32)
+    check("BitVector list view", hex_to_bits("0x8000000F", 32), v)
+    check("BitVector index/slice", (1, 0, [1, 1, 1, 1]), (v[0], v[1], v[-4:].to_list()))
+    check("BitVector concat", "0x0000000F", bits_to_hex([0] * 28 + v[-4:]))
+
+    rnd = random.Random(15)
+    edges = [0, 1, 2, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF, 0xFFFFFFFE, 31, 32]
+    pairs = [(x, y) for x in edges for y in edges]
+    pairs += [(rnd.getrandbits(32), rnd.getrandbits(32)) for _ in range(40)]
+    alu_ops = ["ADD", "SUB", "AND", "OR", "XOR", "SLL", "SRL", "SRA", "SLT", "SLTU"]
+    mdu_ops = ["MUL", "MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM", "REMU"]
+    for unit, ops in ((alu.alu, alu_ops), (mdu.mdu, mdu_ops)):
+        bad = []
+        for op in ops:
+            for x, y in pairs:
+                bx, by = BitVector(x, 32), BitVector(y, 32)
+                slow = unit(op, bx.to_list(), by.to_list())
+                fast = unit(op, bx, by)
+                if (slow["hex"], slow["flags"]) != (fast["hex"], fast["flags"]):
+                    bad.append((op, hex(x), hex(y)))
+        check(f"{unit.__module__} fast path == bit lists", [], bad[:3])
+
+
+def test_adders():
+    print("\n=== Testing adder engines against addripple ===")
+    rnd = random.Random(16)
+    bad = []
+    for width in (1, 5, 24, 32, 48):
+        for _ in range(60):
+            a = [rnd.getrandbits(1) for _ in range(width)]
+            b = [rnd.getrandbits(1) for _ in range(width)]
+            if rnd.random() < 0.25:
+                b = [1 - x for x in a]  # longest carry chain
+            cin = rnd.getrandbits(1)
+            ref, c = adderfunc.addripple(a, b, cin, width)
+            ref_flags = adderfunc.flagadder(a, b, ref, c)
+            for eng in adderfunc.ENGINES:
+                s, c2 = adderfunc.adder(a, b, cin, width, engine=eng)
+                if (s, c2, adderfunc.flagadder(a, b, s, c2)) != (ref, c, ref_flags):
+                    bad.append((eng, width))
+    check("all engines == addripple (sum, carry, flags)", [], bad[:3])
+
+    # the default engine drives the ALU
+    old = adderfunc.ENGINE
+    outs = []
+    for eng in adderfunc.ENGINES:
+        adderfunc.set_engine(eng)
+        outs.append(alu.alu("SUB", hex_to_bits("0x00000000", 32), hex_to_bits("0x00000001", 32))["hex"])
+    adderfunc.set_engine(old)
+    check("ALU SUB same under every engine", [outs[0]] * len(outs), outs)
+
+    cost = {e: adderfunc.adder_cost(e, 32) for e in adderfunc.ENGINES}
+    check("32-bit depth ripple > cla, ripple > brent_kung > kogge_stone", True,
+          cost["ripple"]["depth"] > cost["cla"]["depth"] and
+          cost["ripple"]["depth"] > cost["brent_kung"]["depth"] > cost["kogge_stone"]["depth"])
+    check("32-bit ops kogge_stone > brent_kung", True, cost["kogge_stone"]["ops"] > cost["brent_kung"]["ops"])
+
+
+def test_shifters():
+    print("\n=== Testing barrel/slice shifters against the per-step shifter ===")
+    rnd = random.Random(17)
+    bad = []
+    for width in (1, 8, 32):
+        for _ in range(40):
+            bits = [rnd.getrandbits(1) for _ in range(width)]
+            shamt = rnd.randrange(0, 2 * width + 1)
+            for op in ("SLL", "SRL", "SRA"):
+                ref = shifter_func.shift(op, bits, shamt, engine="step")
+                for eng in shifter_func.ENGINES:
+                    if shifter_func.shift(op, bits, shamt, engine=eng) != ref:
+                        bad.append((eng, op, width, shamt))
+    check("all shifter engines agree", [], bad[:3])
+    x = hex_to_bits("0x80000001", 32)
+    check("ALU SRA by 31 (barrel)", "0xFFFFFFFF", alu.alu("SRA", x, hex_to_bits("0x1F", 32))["hex"])
+    check("ALU SLL by 31 (barrel)", "0x80000000", alu.alu("SLL", x, hex_to_bits("0x1F", 32))["hex"])
+
+
+def test_multiplier():
+    print("\n=== Testing multiplier engines (Booth/Wallace/Dadda) ===")
+    rnd = random.Random(18)
+    bad = []
+    for width in (3, 24, 32):
+        vals = [0, 1, (1 << width) - 1, 1 << (width - 1)] + [rnd.getrandbits(width) for _ in range(12)]
+        for a in vals:
+            b = rnd.choice(vals)
+            for sa, sb in ((False, False), (True, True), (True, False)):
+                ref = multiplier.multiply(a, b, width, sa, sb, engine="native")
+                for eng in multiplier.ENGINES:
+                    if multiplier.multiply(a, b, width, sa, sb, engine=eng) != ref:
+                        bad.append((eng, width, a, b, sa, sb))
+    check("all multiplier engines == native", [], bad[:3])
+
+    st = {}
+    multiplier.multiply(0xFFFFFF, 0xFFFFFF, 24, engine="dadda", stats=st)
+    check("24-bit Booth rows / Dadda stages", (13, 5), (st["partial_products"], st["stages"]))
+
+    # MDU and FPU go through the shared multiplier
+    old = multiplier.ENGINE
+    outs = []
+    for eng in multiplier.ENGINES:
+        multiplier.set_engine(eng)
+        m = mdu.mdu("MULH", hex_to_bits("0x80000000", 32), hex_to_bits("0x7FFFFFFF", 32))["hex"]
+        bits, flags, trace = FPU().f32_mul(hex_to_bits("0x3F800001", 32), hex_to_bits("0x3F800001", 32))
+        outs.append((m, bits_to_hex(bits)))
+    multiplier.set_engine(old)
+    check("MULH / FMUL same under every engine", [("0xC0000000", "0x3F800002")] * len(outs), outs)
+
+
+def test_divider():
+    print("\n=== Testing divider engines (restoring/non-restoring/SRT) ===")
+    rnd = random.Random(19)
+    bad = []
+    for width in (4, 32):
+        vals = [0, 1, 2, 3, (1 << width) - 1, 1 << (width - 1), (1 << (width - 1)) - 1]
+        vals += [rnd.getrandbits(width) for _ in range(10)] + [rnd.getrandbits(width // 2) for _ in range(5)]
+        for a in vals:
+            for b in vals:
+                for signed in (False, True):
+                    ref = divider.divide(a, b, width, signed, engine="native")
+                    for eng in divider.ENGINES:
+                        if divider.divide(a, b, width, signed, engine=eng) != ref:
+                            bad.append((eng, width, a, b, signed))
+    check("all divider engines == native", [], bad[:3])
+
+    # RISC-V edge cases on the bit-list path under every engine
+    old = divider.ENGINE
+    outs = []
+    for eng in divider.ENGINES:
+        divider.set_engine(eng)
+        row = []
+        for op, x, y in (("DIV", "0x80000000", "0xFFFFFFFF"), ("REM", "0x80000000", "0xFFFFFFFF"),
+                         ("DIVU", "0x00000007", "0x00000000"), ("REM", "0xFFFFFFF9", "0x00000000")):
+            row.append(mdu.mdu(op, hex_to_bits(x, 32), hex_to_bits(y, 32))["hex"])
+        outs.append(row)
+    divider.set_engine(old)
+    check("MIN/-1 and x/0 under every engine", [["0x80000000", "0x00000000", "0xFFFFFFFF", "0xFFFFFFF9"]] * len(outs), outs)
+
+    # DIV and REM of the same operands from one division
+    calls = []
+    real = divider._DIVIDERS["nonrestoring"]
+    divider._DIVIDERS["nonrestoring"] = lambda *args: calls.append(1) or real(*args)
+    x, y = hex_to_bits("0x0000BEEF", 32), hex_to_bits("0x00000013", 32)
+    q, r = mdu.mdu_divrem(x, y)
+    divider._DIVIDERS["nonrestoring"] = real
+    check("DIV+REM pair costs one division", ("0x00000A0C", "0x0000000B", 1), (q["hex"], r["hex"], len(calls)))
+    q, r = mdu.mdu_divrem(hex_to_bits("0xFFFFFFF9", 32), hex_to_bits("0x00000000", 32), signed=False)
+    check("DIVU/REMU x/0 from mdu_divrem", ("0xFFFFFFFF", "0xFFFFFFF9", {"N": 1, "Z": 0, "C": 0, "V": 1}), (q["hex"], r["hex"], r["flags"]))
+
+
+def test_batch():
+    print("\n=== Testing NumPy batch ALU/MDU/FPU against the scalar units ===")
+    try:
+        import numpy as np
+    except ImportError:
+        print("[SKIP] numpy not installed")
+        return
+    rnd = random.Random(20)
+    edges = [0, 1, 2, 31, 32, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF, 0xFFFFFFFE]
+    pairs = [(x, y) for x in edges for y in edges]
+    pairs += [(rnd.getrandbits(32), rnd.getrandbits(32)) for _ in range(40)]
+    xs = np.array([p[0] for p in pairs], dtype=np.uint32)
+    ys = np.array([p[1] for p in pairs], dtype=np.uint32)
+    for unit, batch, ops in ((alu.alu, core_alu_batch, ["ADD", "SUB", "AND", "OR", "XOR", "SLL", "SRL", "SRA", "SLT", "SLTU"]),
+                             (mdu.mdu, core_mdu_batch, ["MUL", "MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM", "REMU"])):
+        bad = []
+        for op in ops:
+            out = batch(op, xs, ys)
+            for i, (x, y) in enumerate(pairs):
+                ref = unit(op, hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32))
+                got = {k: int(out["flags"][k][i]) for k in "NZCV"}
+                if (int(out["result"][i]), got) != (int(ref["hex"], 16), ref["flags"]):
+                    bad.append((op, hex(x), hex(y)))
+        check(f"{batch.__name__} == {unit.__module__}.{unit.__name__}", [], bad[:3])
+
+    # FPU: special values, subnormals, near-overflow and same-exponent pairs
+    fa = F32_SPECIALS[:]
+    fb = F32_SPECIALS[::-1]
+    for _ in range(150):
+        x = rand_f32(rnd)
+        y = rnd.getrandbits(32)
+        if rnd.random() < 0.3: y = (y & 0x807FFFFF) | (x & 0x7F800000)
+        fa.append(x); fb.append(y)
+    xs = np.array(fa, dtype=np.uint32)
+    ys = np.array(fb, dtype=np.uint32)
+    for op in ("ADD", "SUB", "MUL"):
+        out = core_fpu_batch(op, xs, ys)
+        bad = []
+        for i, (x, y) in enumerate(zip(fa, fb)):
+            f = FPU()
+            bits, flags, trace = {"ADD": f.f32_add, "SUB": f.f32_sub, "MUL": f.f32_mul}[op](
+                hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32))
+            got = {k: bool(out["flags"][k][i]) for k in flags}
+            if (int(out["result"][i]), got) != (int(bits_to_hex(bits), 16), flags):
+                bad.append(hex(x) + "," + hex(y))
+        check(f"core_fpu_batch {op} == FPU (bits, flags)", [], bad[:3])
+        with np.errstate(all="ignore"):
+            ref = {"ADD": np.add, "SUB": np.subtract, "MUL": np.multiply}[op](xs.view(np.float32), ys.view(np.float32))
+        nan = np.isnan(ref)
+        same = np.where(nan, out["result"] == 0x7FC00000, out["result"] == ref.view(np.uint32))
+        check(f"core_fpu_batch {op} == np.float32", len(fa), int(np.count_nonzero(same)))
+
+
+def test_fpu_int_engine():
+    print("\n=== Testing FPU int engine against the bit-list engine ===")
+    rnd = random.Random(22)
+    vals = F32_SPECIALS[:]
+    vals += [rand_f32(rnd, ((0, 2), (100, 128), (200, 255))) for _ in range(60)]
+    bad = []
+    for i, x in enumerate(vals):
+        y = vals[(i * 7 + 3) % len(vals)]
+        for op in ("f32_add", "f32_sub", "f32_mul"):
+            ref = getattr(FPU(trace="full"), op)(hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32))
+            got = getattr(FPU(engine="int", trace="full"), op)(hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32))
+            strip = lambda tr: [(r.state, {k: v for k, v in r.data.items() if k != "mul"}) for r in tr]
+            if (got[0], got[1], strip(got[2])) != (ref[0], ref[1], strip(ref[2])):
+                bad.append((op, hex(x), hex(y)))
+    check("int engine == bits engine (bits, flags, trace)", [], bad[:3])
+
+    bits, flags, trace = FPU(engine="int").f32_add(hex_to_bits("0x3F800000", 32), hex_to_bits("0x00000001", 32))
+    check("FADD 1.0+tiny, no trace unless asked", ("0x3F800000", True, 0), (bits_to_hex(bits), flags["inexact"], len(trace)))
+
+
+def test_fpu_trace():
+    print("\n=== Testing FPU trace modes ===")
+    one, half = hex_to_bits("0x3F800000", 32), hex_to_bits("0x3F000000", 32)
+    log = TraceLog()
+    bits, flags, trace = FPU(log=log).f32_add(one, half)
+    check("off by default", (0, 0), (len(trace), len(log)))
+    f = FPU(trace="full")
+    bits, flags, trace = f.f32_add(one, half)
+    check("records only returned without a log", (6, None), (len(trace), f.log))
+
+    for engine in ("bits", "int"):
+        log = TraceLog()
+        bits, flags, trace = FPU(engine=engine, trace="full", log=log).f32_add(one, half)
+        check(f"full trace steps ({engine})", ["CLASS", "ALIGN", "OP", "SUM", "NORM", "PACK"], [r.state for r in trace])
+        check(f"op records land in the log ({engine})", True, list(trace) == list(log))
+
+    log = TraceLog()
+    f = FPU(trace="sampled", every=4, log=log)
+    for _ in range(12):
+        f.f32_mul(one, half)
+    check("sampled 1 in 4 of 12 ops", 3, len({r.seq for r in log}))
+    # ops run by another instance do not move which ops this one samples
+    FPU(trace="sampled", every=4, log=TraceLog()).f32_add(one, half)
+    f = FPU(trace="sampled", every=4, log=TraceLog())
+    for _ in range(12):
+        f.f32_mul(one, half)
+    check("sample counter is per instance", [0, 4, 8], sorted({r.seq for r in f.log}))
+    rejected = []
+    for every in (0, -1):
+        try:
+            FPU(trace="sampled", every=every)
+        except ValueError:
+            rejected.append(every)
+    check("every < 1 is rejected", [0, -1], rejected)
+
+    import io
+    out = io.StringIO()
+    log.to_jsonl(out)
+    first = json.loads(out.getvalue().splitlines()[0])
+    check("JSON lines export", ("MUL", "CLASS", "Normal"), (first["op"], first["state"], first["ca"]))
+
+    check("core_fpu returns hex and flags", "0x3FC00000", core_fpu("ADD", "0x3F800000", "0x3F000000")["hex"])
+
+
+def test_fpu_divsqrt():
+    print("\n=== Testing FPU divide/sqrt algorithms ===")
+    try:
+        import numpy as np
+    except ImportError:
+        print("[SKIP] numpy not installed")
+        return
+    rnd = random.Random(24)
+    fa, fb = [], []
+    for x in F32_SPECIALS:
+        for y in F32_SPECIALS:
+            fa.append(x); fb.append(y)
+    for _ in range(200):
+        fa.append(rand_f32(rnd)); fb.append(rnd.getrandbits(32) & 0xFF7FFFFF)
+    # exact cases: 2**k squares and quotients with short significands
+    fa += [0x40800000, 0x41100000, 0x3E800000, 0x40400000]
+    fb += [0x40000000, 0x40400000, 0x3F000000, 0x3F000000]
+    xs = np.array(fa, dtype=np.uint32).view(np.float32)
+    ys = np.array(fb, dtype=np.uint32).view(np.float32)
+    with np.errstate(all="ignore"):
+        refs = {"f32_div": np.divide(xs, ys).view(np.uint32), "f32_sqrt": np.sqrt(xs).view(np.uint32)}
+    for alg in fdivsqrt.ALGS:
+        for op, ref in refs.items():
+            bad = []
+            for i, (x, y) in enumerate(zip(fa, fb)):
+                bits, flags, trace = getattr(FPU(alg=alg), op)(hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32))
+                want = 0x7FC00000 if ref[i] & 0x7FFFFFFF > 0x7F800000 else int(ref[i])
+                if int(bits_to_hex(bits), 16) != want:
+                    bad.append(hex(x) + "," + hex(y))
+            check(f"{op} ({alg}) == np.float32", [], bad[:3])
+
+    def flags_of(op, x, y="0x3F800000"):
+        bits, flags, trace = getattr(FPU(), op)(hex_to_bits(x, 32), hex_to_bits(y, 32))
+        return bits_to_hex(bits), sorted(k for k, v in flags.items() if v)
+    check("FDIV 1/0 -> +inf, divbyzero", ("0x7F800000", ["divbyzero"]), flags_of("f32_div", "0x3F800000", "0x00000000"))
+    check("FDIV 0/0 -> NaN, invalid", ("0x7FC00000", ["invalid"]), flags_of("f32_div", "0x00000000", "0x80000000"))
+    check("FDIV 1/3 inexact", ("0x3EAAAAAB", ["inexact"]), flags_of("f32_div", "0x3F800000", "0x40400000"))
+    check("FDIV 6/3 exact", ("0x40000000", []), flags_of("f32_div", "0x40C00000", "0x40400000"))
+    check("FDIV MAX/0.5 overflows", ("0x7F800000", ["inexact", "overflow"]), flags_of("f32_div", "0x7F7FFFFF", "0x3F000000"))
+    check("FDIV MINNORM/3 underflows", ("0x002AAAAB", ["inexact", "underflow"]), flags_of("f32_div", "0x00800000", "0x40400000"))
+    check("FSQRT -1 -> NaN, invalid", ("0x7FC00000", ["invalid"]), flags_of("f32_sqrt", "0xBF800000"))
+    check("FSQRT -0 -> -0", ("0x80000000", []), flags_of("f32_sqrt", "0x80000000"))
+    check("FSQRT 2 inexact", ("0x3FB504F3", ["inexact"]), flags_of("f32_sqrt", "0x40000000"))
+    check("FSQRT 4 exact", ("0x40000000", []), flags_of("f32_sqrt", "0x40800000"))
+
+    iters = {}
+    for alg in fdivsqrt.ALGS:
+        f = FPU(alg=alg)
+        f.f32_div(hex_to_bits("0x3F800000", 32), hex_to_bits("0x40400000", 32))
+        iters[alg] = f.stats["iterations"]
+    check("iterations newton < srt < restoring", True, iters["newton"] < iters["srt"] < iters["restoring"])
+    check("newton and goldschmidt take the same steps", iters["newton"], iters["goldschmidt"])
+
+    bits, flags, trace = FPU(trace="full").f32_sqrt(hex_to_bits("0x40000000", 32))
+    check("FSQRT trace steps", ["CLASS", "SQRT", "NORM", "PACK"], [r.state for r in trace])
+    check("core_fpu SQRT", "0x3FC00000", core_fpu("SQRT", "0x40100000", "0x00000000")["hex"])
+
+
+# exact value of a finite float32 pattern
+def f32_value(x):
+    e, f = (x >> 23) & 0xFF, x & 0x7FFFFF
+    v = Fraction(f, 1 << 23) * Fraction(2) ** -126 if e == 0 else (1 + Fraction(f, 1 << 23)) * Fraction(2) ** (e - 127)
+    return -v if x >> 31 else v
+
+# round an exact nonzero value to float32 (RNE); flags as the FPU sets them
+def f32_round(v):
+    sign, a = (1 if v < 0 else 0), abs(v)
+    e = a.numerator.bit_length() - a.denominator.bit_length()
+    if Fraction(2) ** e > a: e -= 1
+    if Fraction(2) ** (e + 1) <= a: e += 1
+    flags = {"inexact": False, "overflow": False, "underflow": e < -126, "invalid": False, "divbyzero": False}
+    e = max(e, -126)
+    scaled = a / Fraction(2) ** (e - 23)
+    q, r = divmod(scaled.numerator, scaled.denominator)
+    flags["inexact"] = r != 0
+    if 2 * r > scaled.denominator or (2 * r == scaled.denominator and q & 1): q += 1
+    if q >> 24: q >>= 1; e += 1
+    if e > 127:
+        flags["overflow"] = flags["inexact"] = True
+        return (sign << 31) | 0x7F800000, flags
+    return (sign << 31) | ((e + 127 if q >> 23 else 0) << 23) | (q & 0x7FFFFF), flags
+
+def test_fpu_fma():
+    print("\n=== Testing FPU fused multiply-add ===")
+    rnd = random.Random(25)
+    cases = []
+    while len(cases) < 300:
+        # tiny and mid-range exponents, so most products stay finite
+        xs = [rand_f32(rnd, ((0, 20), (100, 150))) for _ in range(3)]
+        if any((x >> 23) & 0xFF == 0xFF for x in xs): continue
+        if rnd.random() < 0.3:
+            # c close to -a*b, so most of the product cancels
+            c, _ = f32_round(-f32_value(xs[0]) * f32_value(xs[1]))
+            if (c >> 23) & 0xFF == 0xFF: continue
+            xs[2] = c ^ rnd.getrandbits(2)
+        cases.append(tuple(xs))
+    variants = (("f32_fma", 1, 1), ("f32_fmsub", 1, -1), ("f32_fnmadd", -1, -1), ("f32_fnmsub", -1, 1))
+    for engine in ("bits", "int"):
+        bad = []
+        for a, b, c in cases:
+            for op, kp, kc in variants:
+                v = kp * f32_value(a) * f32_value(b) + kc * f32_value(c)
+                if v == 0: continue
+                want = f32_round(v)
+                bits, flags, trace = getattr(FPU(engine=engine), op)(hex_to_bits(hex(a), 32), hex_to_bits(hex(b), 32), hex_to_bits(hex(c), 32))
+                if (int(bits_to_hex(bits), 16), flags) != want:
+                    bad.append((op, hex(a), hex(b), hex(c)))
+        check(f"FMA == exact fractions, rounded once ({engine})", [], bad[:3])
+
+    ref = FPU(trace="full").f32_fnmsub(hex_to_bits("0x3FC00000", 32), hex_to_bits("0x40000000", 32), hex_to_bits("0x00000001", 32))
+    got = FPU(engine="int", trace="full").f32_fnmsub(hex_to_bits("0x3FC00000", 32), hex_to_bits("0x40000000", 32), hex_to_bits("0x00000001", 32))
+    strip = lambda tr: [(r.state, {k: v for k, v in r.data.items() if k != "mul"}) for r in tr]
+    check("int engine == bits engine (FNMSUB bits, flags, trace)", True, (ref[0], ref[1], strip(ref[2])) == (got[0], got[1], strip(got[2])))
+
+    # (1+2**-12)**2 - (1+2**-11) is 2**-24, but the product alone rounds it away
+    a, c = "0x3F800800", "0xBF801000"
+    check("FMADD keeps the product's low bits", "0x33800000", core_fpu("MADD", a, a, c)["hex"])
+    check("FMUL then FADD loses them", "0x00000000", core_fpu("ADD", core_fpu("MUL", a, a)["hex"], c)["hex"])
+    check("FMADD inf*0+1 is invalid", ("0x7FC00000", True), (lambda r: (r["hex"], r["flags"]["invalid"]))(core_fpu("MADD", "0x7F800000", "0x00000000", "0x3F800000")))
+    check("FNMADD -0 from (+0*+0)", "0x80000000", core_fpu("NMADD", "0x00000000", "0x00000000", "0x00000000")["hex"])
+    check("FMSUB x*y - x*y is +0", "0x00000000", core_fpu("MSUB", "0x40400000", "0xC0000000", "0xC0C00000")["hex"])
+
+    try:
+        import numpy as np
+    except ImportError:
+        print("[SKIP] numpy not installed")
+        return
+    trip = [(x, y, z) for x in F32_SPECIALS for y in F32_SPECIALS for z in F32_SPECIALS] + cases
+    xs, ys, zs = (np.array(col, dtype=np.uint32) for col in zip(*trip))
+    for op, name in (("MADD", "f32_fma"), ("MSUB", "f32_fmsub"), ("NMADD", "f32_fnmadd"), ("NMSUB", "f32_fnmsub")):
+        out = core_fpu_fma_batch(op, xs, ys, zs)
+        bad = []
+        for i, (x, y, z) in enumerate(trip):
+            bits, flags, trace = getattr(FPU(), name)(hex_to_bits(hex(x), 32), hex_to_bits(hex(y), 32), hex_to_bits(hex(z), 32))
+            got = {k: bool(out["flags"][k][i]) for k in flags}
+            if (int(out["result"][i]), got) != (int(bits_to_hex(bits), 16), flags):
+                bad.append(hex(x) + "," + hex(y) + "," + hex(z))
+        check(f"core_fpu_fma_batch {op} == FPU (bits, flags)", [], bad[:3])
+
 
 def main():
     print("\n==============================")
@@ -57,6 +513,16 @@ def main():
     test_twos_complement()
     test_m_extension()
     test_float32()
+    test_bitvector()
+    test_adders()
+    test_shifters()
+    test_multiplier()
+    test_divider()
+    test_batch()
+    test_fpu_int_engine()
+    test_fpu_trace()
+    test_fpu_divsqrt()
+    test_fpu_fma()
     print("\n=== ALL TESTS COMPLETE ===\n")
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+import numpy as np
+
+# vecops.py
+# 32-bit ALU/MDU/FPU over NumPy uint32 arrays, one op applied to every pair.
+# Results and N/Z/C/V flags match alu.alu and mdu.mdu bit for bit; the
+# carry comes from widening to uint64 and overflow from the sign bits.
+# Flags come back as uint8 arrays of 0/1.
+
+ALU_OPS = ("ADD", "SUB", "AND", "OR", "XOR", "SLL", "SRL", "SRA", "SLT", "SLTU")
+MDU_OPS = ("MUL", "MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM", "REMU")
+
+U32 = np.uint32
+MASK = np.uint64(0xFFFFFFFF)
+
+def _u32(x):
+    return np.asarray(x).astype(U32, copy=False)
+
+def _sign(x):
+    return (x >> U32(31)).astype(np.uint8)
+
+def _out(res, n, z, c, v):
+    return {"result": res, "flags": {"N": n, "Z": z, "C": c, "V": v}}
+
+def alu_batch(op, a, b):
+    op = op.upper()
+    a, b = np.broadcast_arrays(_u32(a), _u32(b))
+    zeros = np.zeros(a.shape, dtype=np.uint8)
+    c = v = zeros
+    if op in ("ADD", "SUB", "SLT", "SLTU"):
+        bb = b if op == "ADD" else ~b
+        t = a.astype(np.uint64) + bb.astype(np.uint64) + np.uint64(op != "ADD")
+        c = (t >> np.uint64(32)).astype(np.uint8)
+        res = (t & MASK).astype(U32)
+        s1, s2, sres = _sign(a), _sign(b), _sign(res)
+        if op == "ADD":
+            v = ((s1 == s2) & (sres != s1)).astype(np.uint8)
+        else:
+            v = ((s1 != s2) & (sres != s1)).astype(np.uint8)
+        if op in ("SLT", "SLTU"):
+            lt = (sres ^ v) if op == "SLT" else (1 - c).astype(np.uint8)
+            return _out(lt.astype(U32), zeros, (lt == 0).astype(np.uint8), zeros, zeros)
+    elif op == "AND": res = a & b
+    elif op == "OR": res = a | b
+    elif op == "XOR": res = a ^ b
+    elif op in ("SLL", "SRL", "SRA"):
+        sh = b & U32(0x1F)
+        if op == "SLL": res = a << sh
+        elif op == "SRL": res = a >> sh
+        else: res = (a.view(np.int32) >> sh.astype(np.int32)).view(U32)
+    else: raise ValueError(f"Bad ALU op: {op}")
+    return _out(res, _sign(res), (res == 0).astype(np.uint8), c, v)
+
+def mdu_batch(op, a, b):
+    op = op.upper()
+    a, b = np.broadcast_arrays(_u32(a), _u32(b))
+    zeros = np.zeros(a.shape, dtype=np.uint8)
+    div0 = zeros
+    sa = a.view(np.int32).astype(np.int64)
+    sb = b.view(np.int32).astype(np.int64)
+    if op == "MUL": res = a * b
+    elif op == "MULH": res = ((sa * sb) >> 32).astype(U32)
+    elif op == "MULHSU": res = ((sa * b.astype(np.int64)) >> 32).astype(U32)
+    elif op == "MULHU": res = ((a.astype(np.uint64) * b.astype(np.uint64)) >> np.uint64(32)).astype(U32)
+    elif op in ("DIV", "DIVU", "REM", "REMU"):
+        zero = b == 0
+        div0 = zero.astype(np.uint8)
+        if op in ("DIVU", "REMU"):
+            n, d = a.astype(np.int64), b.astype(np.int64)
+        else:
+            n, d = np.abs(sa), np.abs(sb)  # |MIN| = 2**31 fits in int64
+        d = np.where(zero, 1, d)
+        if op in ("DIV", "DIVU"):
+            r = n // d
+            if op == "DIV": r = np.where((sa < 0) != (sb < 0), -r, r)
+            res = np.where(zero, U32(0xFFFFFFFF), r.astype(U32))
+        else:
+            r = n % d
+            if op == "REM": r = np.where(sa < 0, -r, r)
+            res = np.where(zero, a, r.astype(U32))
+    else: raise ValueError(f"Bad MDU op: {op}")
+    # x/0 reports N and V and clears Z, like mdu.mdu
+    z = np.where(div0 == 1, 0, res == 0).astype(np.uint8)
+    return _out(res.astype(U32), div0, z, zeros, div0)
+
+# float32 add/sub/mul on bit-pattern arrays, the same steps as fpu.FPU
+# (round-to-nearest-even, canonical NaN out, invalid on any NaN in,
+# underflow whenever the result is tiny before rounding) done on int64
+# sign/exponent/significand fields. Flags use the FPU's names.
+
+FPU_OPS = ("ADD", "SUB", "MUL")
+
+I64 = np.int64
+CANON_NAN = 0x7FC00000
+INF = 0x7F800000
+
+def _bitlen(m):
+    # exact for m < 2**53
+    return np.frexp(m.astype(np.float64))[1].astype(I64)
+
+def _unpack(x):
+    e = (x >> 23) & 0xFF
+    f = x & 0x7FFFFF
+    sub = e == 0
+    return np.where(sub, -126, e - 127), np.where(sub, f, f | 0x800000)
+
+def _rne(sig, n, width):
+    # drop the low n bits of sig (n >= 1), round to nearest even
+    n = np.minimum(n, width + 1)
+    kept = sig >> n
+    rest = sig & ((I64(1) << n) - 1)
+    half = I64(1) << (n - 1)
+    up = (rest > half) | ((rest == half) & (kept & 1 == 1))
+    return kept + up, rest != 0
+
+def _shr_sticky(m, d):
+    return (m >> d) | ((m & ((I64(1) << d) - 1)) != 0)
+
+def _fpack(sign, e, sig, width):
+    # sig: width bits with the leading 1 at the top, worth 2**e
+    eb = e + 127
+    tiny = eb <= 0
+    kept, nx = _rne(sig, np.where(tiny, width - 24 + 1 - eb, width - 24), width)
+    carry = ~tiny & (kept >> 24 == 1)
+    kept = np.where(carry, kept >> 1, kept)
+    eb = eb + carry
+    of = ~tiny & (eb >= 255)
+    bits = np.where(tiny, kept, (np.clip(eb, 0, 255) << 23) | (kept & 0x7FFFFF))
+    bits = np.where(of, INF, bits) | (sign << 31)
+    return bits, nx | of, of, tiny
+
+def fpu_batch(op, a, b):
+    op = op.upper()
+    if op not in FPU_OPS:
+        raise ValueError(f"Bad FPU op: {op}")
+    a, b = np.broadcast_arrays(_u32(a), _u32(b))
+    a = a.astype(I64)
+    b = b.astype(I64)
+    sa = a >> 31
+    sb = (b >> 31) ^ (op == "SUB")
+    mag_a, mag_b = a & 0x7FFFFFFF, b & 0x7FFFFFFF
+    nan = (mag_a > INF) | (mag_b > INF)
+    ainf, binf = mag_a == INF, mag_b == INF
+    ea, ma = _unpack(a)
+    eb, mb = _unpack(b)
+    if op == "MUL":
+        sign = sa ^ sb
+        invalid = nan | (ainf & (mag_b == 0)) | (binf & (mag_a == 0))
+        special = invalid | ainf | binf | (mag_a == 0) | (mag_b == 0)
+        special_bits = np.where(ainf | binf, (sign << 31) | INF, sign << 31)
+        p = ma * mb
+        p = np.where(special, I64(1) << 47, p)  # keep the dead lanes in range
+        k = 48 - _bitlen(p)
+        bits, nx, of, uf = _fpack(sign, ea + eb + 1 - k, p << k, 48)
+    else:
+        invalid = nan | (ainf & binf & (sa != sb))
+        special = invalid | ainf | binf
+        special_bits = np.where(ainf, (sa << 31) | INF, (sb << 31) | INF)
+        ma, mb = ma << 3, mb << 3
+        # align the smaller operand; past 27 places only the sticky bit is left
+        d = np.minimum(np.abs(ea - eb), 27)
+        a_big = ea > eb
+        mb = np.where(a_big, _shr_sticky(mb, d), mb)
+        ma = np.where(a_big, ma, _shr_sticky(ma, d))
+        e = np.maximum(ea, eb)
+        same = sa == sb
+        m = np.where(same, ma + mb, np.abs(ma - mb))
+        sign = np.where(same | (ma >= mb), sa, sb)
+        zero = ~special & (m == 0)
+        special = special | zero
+        special_bits = np.where(zero, (sa & sb) << 31, special_bits)
+        m = np.where(m == 0, I64(1) << 27, m)
+        k = 28 - _bitlen(m)
+        bits, nx, of, uf = _fpack(sign, e + 1 - k, m << k, 28)
+    bits = np.where(invalid, CANON_NAN, np.where(special, special_bits, bits))
+    live = ~special
+    flags = {"inexact": nx & live, "overflow": of & live, "underflow": uf & live,
+             "invalid": invalid, "divbyzero": np.zeros(a.shape, dtype=bool)}
+    return {"result": bits.astype(U32), "flags": {k: v.astype(np.uint8) for k, v in flags.items()}}
+
+# fused multiply-add a*b + c, rounded once. The 48-bit product and the
+# addend are lined up on their leading bits with a 3-bit guard tail, the
+# smaller one shifted right with sticky, as in fpu.FPU._fma_int.
+#   MADD a*b + c   MSUB a*b - c   NMADD -(a*b) - c   NMSUB -(a*b) + c
+
+FMA_OPS = ("MADD", "MSUB", "NMADD", "NMSUB")
+
+def fma_batch(op, a, b, c):
+    op = op.upper()
+    if op not in FMA_OPS:
+        raise ValueError(f"Bad FPU op: {op}")
+    a, b, c = np.broadcast_arrays(_u32(a), _u32(b), _u32(c))
+    a, b, c = a.astype(I64), b.astype(I64), c.astype(I64)
+    sp = (a >> 31) ^ (b >> 31) ^ (op in ("NMADD", "NMSUB"))
+    sc = (c >> 31) ^ (op in ("MSUB", "NMADD"))
+    mag_a, mag_b, mag_c = a & 0x7FFFFFFF, b & 0x7FFFFFFF, c & 0x7FFFFFFF
+    nan = (mag_a > INF) | (mag_b > INF) | (mag_c > INF)
+    pinf = (mag_a == INF) | (mag_b == INF)
+    pzero = (mag_a == 0) | (mag_b == 0)
+    cinf, czero = mag_c == INF, mag_c == 0
+    invalid = nan | (pinf & pzero) | (pinf & cinf & (sp != sc))
+    # zero product: c itself, or a zero that is -0 only if both parts are
+    special_bits = np.where(czero, (sp & sc) << 31, (sc << 31) | mag_c)
+    special_bits = np.where(cinf, (sc << 31) | INF, special_bits)
+    special_bits = np.where(pinf, (sp << 31) | INF, special_bits)
+    special = invalid | pinf | cinf | pzero
+    ea, ma = _unpack(a)
+    eb, mb = _unpack(b)
+    ec, mc = _unpack(c)
+    p = np.where(special, I64(1) << 47, ma * mb)  # keep the dead lanes in range
+    k = 48 - _bitlen(p)
+    ep = ea + eb + 1 - k
+    p = p << (k + 3)
+    mc = np.where(czero, I64(1) << 23, mc)
+    k = 48 - _bitlen(mc)
+    ec = np.where(czero, ep, ec + 24 - k)
+    mc = np.where(czero, 0, mc << (k + 3))
+    # past 51 places only the sticky bit is left
+    d = np.minimum(np.abs(ep - ec), 51)
+    p_big = ep > ec
+    mc = np.where(p_big, _shr_sticky(mc, d), mc)
+    p = np.where(p_big, p, _shr_sticky(p, d))
+    e = np.maximum(ep, ec)
+    same = sp == sc
+    m = np.where(same, p + mc, np.abs(p - mc))
+    sign = np.where(same | (p >= mc), sp, sc)
+    # exact cancellation is +0
+    zero = ~special & (m == 0)
+    special_bits = np.where(zero, 0, special_bits)
+    special = special | zero
+    m = np.where(m == 0, I64(1) << 51, m)
+    k = 52 - _bitlen(m)
+    bits, nx, of, uf = _fpack(sign, e + 1 - k, m << k, 52)
+    # a subnormal c passed through is still tiny, as in fpu.FPU
+    uf = np.where(special, pzero & ~invalid & ~czero & (mag_c < 0x800000), uf)
+    bits = np.where(invalid, CANON_NAN, np.where(special, special_bits, bits))
+    live = ~special
+    flags = {"inexact": nx & live, "overflow": of & live, "underflow": uf,
+             "invalid": invalid, "divbyzero": np.zeros(a.shape, dtype=bool)}
+    return {"result": bits.astype(U32), "flags": {k: v.astype(np.uint8) for k, v in flags.items()}}